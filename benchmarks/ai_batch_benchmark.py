@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Wall time of analysing many runs: one request at a time vs concurrent vs batched.
+
+Runs against benchmarks/ai_stub.py on localhost with synthetic runs, so no API key
+is needed. With a 1 s stub latency, 10 runs take ~10 s sequentially; the concurrent
+and batched modes should stay close to the time of a single request.
+
+Usage:
+    python benchmarks/ai_batch_benchmark.py [--runs 10] [--latency 1.0]
+"""
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import ai_stub  # noqa: E402
+import training_analyser_yolov7 as fishwell  # noqa: E402
+
+
+def synthetic_runs(count, epochs=120):
+    run_stats = {}
+    for r in range(count):
+        rows = []
+        for e in range(epochs):
+            peak = 0.5 + 0.03 * r
+            m = peak * (1 - 2.718 ** (-e / 30)) - (0.002 * (e - 90) if e > 90 and r % 3 == 0 else 0)
+            rows.append((e, 10.2, m, 0.05 + 0.5 * 2.718 ** (-e / 25), 0.02, 0.01, 0.01, 12, 0.5, 0.6))
+        run_stats[f"exp{r}"] = {key: [row[i] for row in rows] for i, key in enumerate(fishwell.RESULTS_KEYS)}
+    return run_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=1.0, help="stub seconds per request")
+    args = parser.parse_args()
+
+    server, state, url = ai_stub.start(latency=args.latency, per_run_latency=0.02)
+    fishwell.OPENAI_CHAT_URL = url
+    run_stats = synthetic_runs(args.runs)
+    modes = [
+        ("sequential", lambda: {run: fishwell.get_ai_analysis(stats) for run, stats in run_stats.items()}),
+        ("concurrent", lambda: fishwell.analyze_runs(run_stats, "concurrent", max_concurrency=args.runs)),
+        ("batch", lambda: fishwell.analyze_runs(run_stats, "batch")),
+    ]
+    try:
+        for name, analyse in modes:
+            state.requests.clear()
+            start = time.perf_counter()
+            results = analyse()
+            elapsed = time.perf_counter() - start
+            errors = sum(1 for a in results.values() if a.get("error"))
+            sent = sum(r[0] for r in state.requests)
+            tokens = sum(r[1] + r[2] for r in state.requests)
+            print(f"{name:<11} {elapsed:6.2f} s  {len(state.requests):3d} requests  {sent / 1024:7.1f} KiB sent  "
+                  f"{tokens:6d} tokens  {errors} errors")
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Per-call payload, tokens and latency of full-history prompts vs delta prompts.
+
+Replays a run epoch by epoch (300 synthetic epochs, or a real results.txt) and asks
+for an analysis every --every epochs, once with the whole history in each prompt
+(get_ai_analysis) and once with DeltaAnalysis. Runs against benchmarks/ai_stub.py,
+which charges latency per prompt token, so no API key is needed.
+
+Usage:
+    python benchmarks/ai_delta_benchmark.py [--results runs/train/exp/results.txt] [--every 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import ai_stub  # noqa: E402
+import training_analyser_yolov7 as fishwell  # noqa: E402
+from ai_batch_benchmark import synthetic_runs  # noqa: E402
+
+
+def prefixes(stats, every):
+    """The history as the live view would have seen it every `every` epochs."""
+    for n in range(every, len(stats['epoch']) + 1, every):
+        yield {key: values[:n] for key, values in stats.items()}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--results", help="results.txt to replay instead of the synthetic run")
+    parser.add_argument("--epochs", type=int, default=300, help="length of the synthetic run")
+    parser.add_argument("--every", type=int, default=fishwell.AI_MIN_INTERVAL, help="epochs between analyses")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub seconds per request")
+    parser.add_argument("--per-1k-prompt-latency", type=float, default=0.05,
+                        help="stub seconds per 1000 prompt tokens")
+    args = parser.parse_args()
+
+    stats = fishwell.parse_results(args.results) if args.results else synthetic_runs(1, args.epochs)["exp0"]
+    server, state, url = ai_stub.start(latency=args.latency, per_1k_prompt_latency=args.per_1k_prompt_latency)
+    fishwell.OPENAI_CHAT_URL = url
+    modes = [("full", lambda: fishwell.get_ai_analysis), ("delta", lambda: fishwell.DeltaAnalysis().analyze)]
+    print(f"{len(stats['epoch'])} epochs, one analysis every {args.every}")
+    print(f"{'':<6} {'calls':>5} {'bytes/call p50':>14} {'p90':>7} {'max':>7} {'tokens total':>12} "
+          f"{'latency p50':>11} {'p90':>6} {'total':>6}")
+    try:
+        for name, make in modes:
+            analyse = make()
+            state.requests.clear()
+            latencies = []
+            for view in prefixes(stats, args.every):
+                start = time.perf_counter()
+                result = analyse(view)
+                latencies.append(time.perf_counter() - start)
+                if result.get("error"):
+                    raise RuntimeError(result["error"])
+            sent = [r[0] for r in state.requests]
+            tokens = sum(r[1] + r[2] for r in state.requests)
+            print(f"{name:<6} {len(sent):5d} {percentile(sent, 0.5):14d} {percentile(sent, 0.9):7d} {max(sent):7d} "
+                  f"{tokens:12d} {percentile(latencies, 0.5) * 1000:9.0f}ms {percentile(latencies, 0.9) * 1000:4.0f}ms "
+                  f"{sum(latencies):5.1f}s")
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Analysis latency with one provider vs hedged across two, when providers have slow tails.
+
+Starts two benchmarks/ai_stub.py servers, one answering as OpenAI and one as
+Anthropic, each slow (--tail-latency) on a share of requests and, optionally,
+answering with plain text a share of the time. Asks for --calls single-run
+analyses with AI_HEDGE off (OpenAI only) and on, and prints end-to-end latency
+percentiles, how many extra requests hedging sent and which provider won.
+
+Usage:
+    python benchmarks/ai_hedge_benchmark.py [--calls 100] [--tail-probability 0.1] [--invalid-probability 0.05]
+"""
+import argparse
+import collections
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import ai_stub  # noqa: E402
+import training_analyser_yolov7 as fishwell  # noqa: E402
+from ai_batch_benchmark import synthetic_runs  # noqa: E402
+from ai_delta_benchmark import percentile  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.1, help="stub seconds per request")
+    parser.add_argument("--tail-latency", type=float, default=2.0, help="extra seconds for a slow request")
+    parser.add_argument("--tail-probability", type=float, default=0.1, help="share of slow requests per provider")
+    parser.add_argument("--invalid-probability", type=float, default=0.0,
+                        help="share of non-JSON answers per provider")
+    args = parser.parse_args()
+
+    stubs = {}
+    for seed, name in enumerate(["openai", "anthropic"]):
+        stubs[name] = ai_stub.start(latency=args.latency, tail_latency=args.tail_latency,
+                                    tail_probability=args.tail_probability,
+                                    invalid_probability=args.invalid_probability, seed=seed)
+    fishwell.OPENAI_CHAT_URL = stubs["openai"][2]
+    fishwell.ANTHROPIC_MESSAGES_URL = stubs["anthropic"][2].replace("/v1/chat/completions", "/v1/messages")
+    fishwell.OPENAI_API_KEY = fishwell.ANTHROPIC_API_KEY = "stub"
+    fishwell.USE_CHATGPT = True
+    stats = synthetic_runs(1)["exp0"]
+    print(f"{args.calls} analyses, {args.latency * 1000:.0f}ms per request, {args.tail_probability:.0%} of requests "
+          f"+{args.tail_latency:.1f}s, {args.invalid_probability:.0%} invalid")
+    print(f"{'':<8} {'p50':>7} {'p90':>7} {'p99':>7} {'max':>7} {'errors':>6} {'requests':>8}  winners")
+    try:
+        for name, hedge in [("single", False), ("hedged", True)]:
+            fishwell.AI_HEDGE = hedge
+            for provider in fishwell.AI_PROVIDERS.values():
+                provider.latency = fishwell.LatencyHistogram()
+            for _, state, _ in stubs.values():
+                state.requests.clear()
+            latencies, errors, winners = [], 0, collections.Counter()
+            for _ in range(args.calls):
+                start = time.perf_counter()
+                result = fishwell.get_ai_analysis(stats)
+                latencies.append(time.perf_counter() - start)
+                if result.get("error"):
+                    errors += 1
+                else:
+                    winners[result["usage"]["provider"]] += 1
+            time.sleep(args.tail_latency + args.latency)  # let abandoned requests land in the stub counts
+            sent = sum(len(state.requests) for _, state, _ in stubs.values())
+            print(f"{name:<8} " + " ".join(f"{percentile(latencies, q) * 1000:5.0f}ms" for q in (0.5, 0.9, 0.99))
+                  + f" {max(latencies) * 1000:5.0f}ms {errors:6d} {sent:8d}  "
+                  + ", ".join(f"{k} {v}" for k, v in winners.most_common()))
+    finally:
+        for server, _, _ in stubs.values():
+            server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
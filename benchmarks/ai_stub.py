@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Local stand-in for OpenAI- and Anthropic-compatible chat endpoints.
+
+Answers POST /v1/chat/completions (and /v1/messages, in Anthropic's response
+shape) after a configurable delay with a well-formed
+analysis: a single-run analysis, or {"runs": {...}} with one entry per run id when
+the prompt is a batched one (a JSON object after a final "Runs:" line). Token usage
+is reported at ~4 characters per token and every request is counted, so benchmarks
+can compare payload sizes and latency without an API key. --per-1k-prompt-latency
+adds delay in proportion to the prompt, as reading a long prompt does on a real server.
+--tail-probability/--tail-latency make some requests slow and --invalid-probability
+makes some answers plain text instead of JSON, for the hedged-request benchmark.
+
+Usage:
+    python benchmarks/ai_stub.py --port 8765 --latency 1.0
+    python training_analyser_yolov7.py analyze --endpoint http://127.0.0.1:8765/v1/chat/completions
+"""
+import argparse
+import http.server
+import json
+import random
+import threading
+import time
+
+ANALYSIS = {
+    "summary": "🧪 Stub analysis. Training looks fine.",
+    "risks": ["🟡 This is a stub."],
+    "trends": ["📈 mAP trending up."],
+    "recommendations": ["▶️ Keep training."],
+    "metrics": ["mAP: n/a"],
+    "isoverfitted": False,
+}
+
+
+class StubState:
+    def __init__(self, latency, per_run_latency=0.0, per_1k_prompt_latency=0.0,
+                 tail_latency=0.0, tail_probability=0.0, invalid_probability=0.0, seed=None):
+        self.latency = latency
+        self.per_run_latency = per_run_latency
+        self.per_1k_prompt_latency = per_1k_prompt_latency
+        self.tail_latency = tail_latency
+        self.tail_probability = tail_probability
+        self.invalid_probability = invalid_probability
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = []  # (prompt bytes, prompt tokens, completion tokens)
+
+    def roll(self):
+        """(extra tail delay, answer is invalid) for the next request."""
+        with self.lock:
+            tail = self.tail_latency if self.random.random() < self.tail_probability else 0.0
+            return tail, self.random.random() < self.invalid_probability
+
+    def answer(self, prompt):
+        """(content, extra delay) for a prompt."""
+        head, sep, runs_json = prompt.rpartition("Runs:\n")
+        if sep:
+            try:
+                runs = json.loads(runs_json)
+            except ValueError:
+                runs = {}
+            return json.dumps({"runs": {run: ANALYSIS for run in runs}}), self.per_run_latency * len(runs)
+        return json.dumps(ANALYSIS), 0.0
+
+
+def make_handler(state):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            request = json.loads(body)
+            prompt = request.get("system", "") + "".join(m["content"] for m in request["messages"])
+            content, extra = state.answer(prompt)
+            tail, invalid = state.roll()
+            if invalid:
+                content = "Sorry, I can't analyse these metrics right now."
+            usage = {"prompt_tokens": (len(prompt) + 3) // 4, "completion_tokens": (len(content) + 3) // 4}
+            time.sleep(state.latency + extra + tail + state.per_1k_prompt_latency * usage["prompt_tokens"] / 1000)
+            with state.lock:
+                state.requests.append((len(body), usage["prompt_tokens"], usage["completion_tokens"]))
+            if self.path.endswith("/v1/messages"):
+                reply = {"type": "message", "role": "assistant", "content": [{"type": "text", "text": content}],
+                         "usage": {"input_tokens": usage["prompt_tokens"], "output_tokens": usage["completion_tokens"]}}
+            else:
+                reply = {"choices": [{"message": {"role": "assistant", "content": content}}], "usage": usage}
+            reply = json.dumps(reply).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start(port=0, latency=1.0, per_run_latency=0.0, per_1k_prompt_latency=0.0,
+          tail_latency=0.0, tail_probability=0.0, invalid_probability=0.0, seed=None):
+    """Serve the stub from a daemon thread. Returns (server, state, url).
+
+    url is the chat completions endpoint; the Anthropic one is the same host at /v1/messages.
+    """
+    state = StubState(latency, per_run_latency, per_1k_prompt_latency,
+                      tail_latency, tail_probability, invalid_probability, seed)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=1.0, help="seconds per request")
+    parser.add_argument("--per-run-latency", type=float, default=0.0, help="extra seconds per run in a batch")
+    parser.add_argument("--per-1k-prompt-latency", type=float, default=0.0,
+                        help="extra seconds per 1000 prompt tokens")
+    parser.add_argument("--tail-latency", type=float, default=0.0, help="extra seconds for a slow request")
+    parser.add_argument("--tail-probability", type=float, default=0.0, help="share of requests that are slow")
+    parser.add_argument("--invalid-probability", type=float, default=0.0, help="share of answers that are not JSON")
+    args = parser.parse_args()
+    server, _, url = start(args.port, args.latency, args.per_run_latency, args.per_1k_prompt_latency,
+                           args.tail_latency, args.tail_probability, args.invalid_probability)
+    print(f"Stub chat endpoint on {url} (Ctrl-C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Cost for an extra aquarium on the same run: its own parser vs a metrics-bus viewer.
+
+A standalone instance stats results.txt every RESULTS_POLL_INTERVAL and re-parses
+it when it changed; a bus viewer reads the shared header every frame and decodes
+the publisher's snapshot when it changed. Both are timed on a --epochs long
+results.txt, for the idle check and for a new epoch.
+
+Usage:
+    python benchmarks/bus_benchmark.py [--epochs 300] [--repeat 2000]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import training_analyser_yolov7 as fishwell  # noqa: E402
+
+STATE = {"best_map": 0.7, "run_plan": {"epochs": 300, "gpus": 1, "started": 0.0}, "forecast": None,
+         "forecast_line": "mAP → 0.702±0.004 plateau e212 3.4 GPU-h", "timing_line": "ETA 3h12m @62s/ep",
+         "throughput": {}, "ai_usage": {}, "ai_feedback": {"summary": "🚀 Fine. " * 40, "risks": ["r" * 80] * 4}}
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    root = tempfile.mkdtemp(prefix="fishwell_bus_")
+    results = os.path.join(root, "results.txt")
+    with open(results, "w") as f:
+        for e in range(args.epochs):
+            f.write(f"{e}/{args.epochs - 1} 10.2G {0.3 + e / 1000:.4f} 0.05 0.02 0.01 12 640 0.5 0.6\n")
+    publisher = fishwell.MetricsBus(os.path.join(root, "run.bus"))
+    viewer = fishwell.MetricsBus(publisher.path)
+    try:
+        publisher.claim()
+        viewer.claim()
+        stats = fishwell.parse_results(results)
+        publisher.publish(stats, STATE)
+        viewer.poll()
+
+        def new_snapshot():
+            publisher.publish(stats, STATE)
+            viewer.poll()
+
+        rows = [
+            ("own parser", timed(lambda: fishwell.results_signature(results), args.repeat),
+             timed(lambda: fishwell.parse_results(results), args.repeat // 10)),
+            ("bus viewer", timed(viewer.poll, args.repeat),
+             timed(new_snapshot, args.repeat // 10) - timed(lambda: publisher.publish(stats, STATE), args.repeat // 10)),
+        ]
+        print(f"{args.epochs} epochs in results.txt")
+        print(f"{'':<11} {'idle check':>11} {'new epoch':>10}")
+        for name, idle, update in rows:
+            print(f"{name:<11} {idle * 1e6:9.2f}us {update * 1e6:8.1f}us")
+        print(f"publish (once, on the owner): {timed(lambda: publisher.publish(stats, STATE), args.repeat // 10) * 1e6:.1f}us")
+    finally:
+        viewer.close()
+        publisher.close()
+        shutil.rmtree(root, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Time to learn a best.pt's epoch and fitness: the metadata reader vs hashing the file.
+
+Writes a YOLOv7-shaped checkpoint (zip layout of torch.save: archive/data.pkl
+with epoch, a numpy best_fitness, training_results, a model object holding a
+tensor, and the tensor's storage as a --size-mb member), without torch or numpy:
+stand-in classes, registered under a private prefix and renamed in the pickle,
+produce the same opcodes, and the storage is a sparse hole. Then times
+read_checkpoint_meta() against file_sha256(), the cheapest way to tell an
+unchanged file otherwise.
+
+Usage:
+    python benchmarks/checkpoint_benchmark.py [--size-mb 1024] [--repeat 50]
+"""
+import argparse
+import collections
+import io
+import os
+import pickle
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import types
+import zlib
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import training_analyser_yolov7 as fishwell  # noqa: E402
+
+
+STUB_PREFIX = "fishwell_stub_"
+
+
+def _module(name, **members):
+    """Register members under STUB_PREFIX + name; write_checkpoint() renames them to name in the pickle."""
+    parts = (STUB_PREFIX + name).split(".")
+    for i in range(1, len(parts) + 1):
+        sys.modules.setdefault(".".join(parts[:i]), types.ModuleType(".".join(parts[:i])))
+    module = sys.modules[STUB_PREFIX + name]
+    for key, value in members.items():
+        value.__module__, value.__qualname__ = module.__name__, key
+        setattr(module, key, value)
+
+
+class dtype:
+    def __init__(self, name):
+        self.name = name
+
+    def __reduce__(self):
+        return dtype, (self.name, False, True), (3, "<", None, None, None, -1, -1, 0)
+
+
+class ndarray:
+    def __init__(self, values):
+        self.values = values
+
+    def __reduce__(self):
+        return (_reconstruct, (ndarray, (0,), b"b"),
+                (1, (len(self.values),), dtype("f8"), False, struct.pack(f"<{len(self.values)}d", *self.values)))
+
+
+def _reconstruct(cls, shape, code):
+    raise NotImplementedError
+
+
+class HalfStorage:
+    def __init__(self, key, numel):
+        self.key, self.numel = key, numel
+
+
+class Tensor:
+    def __init__(self, storage):
+        self.storage = storage
+
+    def __reduce__(self):
+        return _rebuild_tensor_v2, (self.storage, 0, (self.storage.numel,), (1,), False, collections.OrderedDict())
+
+
+def _rebuild_tensor_v2(*args):
+    raise NotImplementedError
+
+
+class Model:
+    def __init__(self, weight):
+        self.training = False
+        self._parameters = collections.OrderedDict(weight=weight)
+        self._modules = collections.OrderedDict()
+
+
+class _TorchPickler(pickle.Pickler):
+    def persistent_id(self, obj):
+        if isinstance(obj, HalfStorage):
+            return "storage", HalfStorage, obj.key, "cpu", obj.numel
+        return None
+
+
+def write_checkpoint(path, size_mb, epoch=37, fitness=0.512):
+    """A YOLOv7 best.pt as torch.save would lay it out, with a size_mb storage member."""
+    numel = size_mb * (1 << 20) // 2
+    ckpt = {"epoch": epoch, "best_fitness": ndarray([fitness]), "training_results": "0/299 ...\n" * 300,
+            "model": Model(Tensor(HalfStorage("0", numel))), "optimizer": None, "wandb_id": None}
+    data = io.BytesIO()
+    _TorchPickler(data, protocol=2).dump(ckpt)
+    pickled = data.getvalue().replace(b"c" + STUB_PREFIX.encode(), b"c")  # protocol 2 GLOBAL: c<module>\n<name>\n
+    members = [("archive/data.pkl", pickled), ("archive/data/0", numel * 2), ("archive/version", b"3\n")]
+    central = []
+    with open(path, "wb") as f:
+        for name, content in members:
+            offset = f.tell()
+            size = content if isinstance(content, int) else len(content)
+            crc = 0 if isinstance(content, int) else zlib.crc32(content)
+            f.write(struct.pack("<IHHHHHIIIHH", 0x04034B50, 20, 0, 0, 0, 0, crc, size, size, len(name), 0))
+            f.write(name.encode())
+            if isinstance(content, int):
+                f.seek(size, 1)  # sparse: the weights are never read anyway
+            else:
+                f.write(content)
+            central.append(struct.pack("<IHHHHHHIIIHHHHHII", 0x02014B50, 20, 20, 0, 0, 0, 0, crc, size, size,
+                                       len(name), 0, 0, 0, 0, 0, offset) + name.encode())
+        cd_offset = f.tell()
+        cd = b"".join(central)
+        f.write(cd)
+        f.write(struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, len(members), len(members), len(cd), cd_offset, 0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    _module("numpy", dtype=dtype, ndarray=ndarray)
+    _module("numpy.core.multiarray", _reconstruct=_reconstruct)
+    _module("torch", HalfStorage=HalfStorage)
+    _module("torch._utils", _rebuild_tensor_v2=_rebuild_tensor_v2)
+    _module("models.yolo", Model=Model)
+    root = tempfile.mkdtemp(prefix="fishwell_ckpt_")
+    path = os.path.join(root, "best.pt")
+    try:
+        write_checkpoint(path, args.size_mb)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            meta = fishwell.read_checkpoint_meta(path)
+        reader = (time.perf_counter() - start) / args.repeat
+        start = time.perf_counter()
+        fishwell.file_sha256(path)
+        hashing = time.perf_counter() - start
+        print(f"{args.size_mb} MB checkpoint: {meta}")
+        print(f"read_checkpoint_meta {reader * 1e3:9.2f} ms")
+        print(f"file_sha256          {hashing * 1e3:9.2f} ms")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""End-to-end check of the early-stop controller against a dummy train.py.
+
+Starts a fake trainer (a train.py that appends a results.txt line every
+--interval seconds, mAP rising then falling, and rewrites best.pt on every new
+best) next to two decoys that must not be touched: a train.py for another
+--name, and one for the same --name under another --project. Then drives an
+EarlyStopController in auto mode the way the app's early_stop_worker does and
+asserts that /proc discovery found only the trainer, that nothing happened
+before the grace period was over, that the final backup matches best.pt, and
+that the trainer (and only the trainer) received EARLY_STOP_SIGNAL.
+
+Usage:
+    python benchmarks/early_stop_harness.py [--grace 2] [--interval 0.2] [--keep]
+"""
+import argparse
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import training_analyser_yolov7 as fishwell  # noqa: E402
+
+TRAINER = r'''
+import os, signal, sys, time
+opt = dict(zip(sys.argv[1::2], sys.argv[2::2]))
+run_dir = os.path.join(opt.get("--project", "runs/train"), opt.get("--name", "exp"))
+os.makedirs(os.path.join(run_dir, "weights"), exist_ok=True)
+
+def stopped(signum, frame):
+    with open(os.path.join(run_dir, "signal"), "w") as f:
+        f.write(str(signum))
+    sys.exit(0)
+
+signal.signal(signal.SIGINT, stopped)
+signal.signal(signal.SIGTERM, stopped)
+maps = [float(m) for m in opt.get("--maps", "").split(",") if m]
+best = -1.0
+for epoch, m in enumerate(maps):
+    if m > best:
+        best = m
+        with open(os.path.join(run_dir, "weights", "best.pt"), "wb") as f:
+            f.write(os.urandom(1 << 20))
+    with open(os.path.join(run_dir, "results.txt"), "a") as f:
+        f.write(f"{epoch}/{len(maps) - 1} 10.2G {m:.4f} 0.05 0.02 0.01 12 640 0.5 0.6\n")
+    time.sleep(float(opt.get("--interval", "0.2")))
+time.sleep(float(opt.get("--linger", "60")))
+'''
+
+
+def learning_curve(rise=8, fall=25):
+    return [0.30 + 0.04 * e for e in range(rise)] + [0.58 - 0.01 * e for e in range(1, fall + 1)]
+
+
+def received(run_dir):
+    try:
+        with open(os.path.join(run_dir, "signal")) as f:
+            return int(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--grace", type=float, default=2.0, help="EARLY_STOP_GRACE_SECONDS for the test")
+    parser.add_argument("--interval", type=float, default=0.2, help="seconds per fake epoch")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary directory")
+    args = parser.parse_args()
+    root = tempfile.mkdtemp(prefix="fishwell_earlystop_")
+    yolo_dir, other_dir = os.path.join(root, "yolov7-main"), os.path.join(root, "elsewhere")
+    for path in (yolo_dir, other_dir):
+        os.makedirs(path)
+        with open(os.path.join(path, fishwell.TRAIN_SCRIPT), "w") as f:
+            f.write(TRAINER)
+    fishwell.RUNS_BASE_PATH = os.path.join(yolo_dir, "runs", "train")
+    fishwell.set_paths("exp")
+    run_dir = os.path.dirname(fishwell.RESULTS_FILE)
+    maps = ",".join(f"{m:.4f}" for m in learning_curve())
+    command = [sys.executable, fishwell.TRAIN_SCRIPT, "--interval", str(args.interval)]
+    children = {
+        "trainer": (subprocess.Popen(command + ["--name", "exp", "--maps", maps], cwd=yolo_dir), run_dir),
+        "other name": (subprocess.Popen(command + ["--name", "other"], cwd=yolo_dir),
+                       os.path.join(yolo_dir, "runs", "train", "other")),
+        "other project": (subprocess.Popen(command + ["--name", "exp"], cwd=other_dir),
+                          os.path.join(other_dir, "runs", "train", "exp")),
+    }
+    trainer = children["trainer"][0]
+    try:
+        controller = fishwell.EarlyStopController("exp", run_dir, mode="auto", grace=args.grace)
+        start = time.monotonic()
+        armed_at = None
+        while True:
+            time.sleep(args.interval / 2)
+            assert trainer.poll() is None, "trainer exited on its own"
+            stats = fishwell.parse_results(fishwell.RESULTS_FILE)
+            due = controller.observe(stats["map"], False)
+            if controller.state == "armed" and armed_at is None:
+                armed_at = time.monotonic()
+                print(f"armed after {armed_at - start:.1f}s at epoch {stats['epoch'][-1]} ({controller.reason})")
+            if due:
+                break
+            assert time.monotonic() - start < 60, "overfitting was never acted on"
+        waited = time.monotonic() - armed_at
+        assert waited >= args.grace, f"acted after {waited:.1f}s, before the {args.grace}s grace period"
+        pids = fishwell.find_training_processes("exp", run_dir)
+        assert pids == [trainer.pid], f"/proc discovery found {pids}, expected [{trainer.pid}]"
+        state = controller.stop_training(stats["epoch"][-1])
+        assert state == "stopped", f"controller ended {state}: {controller.message}"
+        assert controller.pids == [trainer.pid], controller.pids
+        assert fishwell.file_sha256(controller.backup_path) == fishwell.file_sha256(fishwell.BEST_PT), \
+            "final backup does not match best.pt"
+        trainer.wait(10)
+        got = received(run_dir)
+        assert got == int(fishwell.EARLY_STOP_SIGNAL), f"trainer received {got}, expected {fishwell.EARLY_STOP_SIGNAL!r}"
+        for name, (child, child_dir) in children.items():
+            if name != "trainer":
+                assert child.poll() is None and received(child_dir) is None, f"decoy '{name}' was signalled"
+        print(f"acted {waited:.1f}s after arming (grace {args.grace}s), backup {os.path.basename(controller.backup_path)}")
+        print(f"trainer pid {trainer.pid} received {signal.Signals(got).name}, exit code {trainer.returncode}; "
+              f"decoys untouched")
+        print("OK")
+    finally:
+        for child, _ in children.values():
+            if child.poll() is None:
+                child.kill()
+                child.wait()
+        if args.keep:
+            print(f"kept {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
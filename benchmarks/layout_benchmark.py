@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Text-layout time per frame for the three info boxes, rebuilt every frame vs memoised.
+
+"every frame" calls the box builders on each frame, as draw_frame used to;
+"cached" goes through ViewModelCache with the same keys draw_frame uses. New
+metrics arrive every --epoch-frames frames and a new AI analysis every
+--analysis-frames frames (at FRAME_INTERVAL = 0.12 s, 500 frames is one minute).
+
+Usage:
+    python benchmarks/layout_benchmark.py [--frames 5000]
+"""
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import training_analyser_yolov7 as fishwell  # noqa: E402
+
+FEEDBACK = {
+    "summary": ("🚀 Training is progressing steadily with mAP@.5 climbing past 0.62. 📉 Losses keep "
+                "falling without spikes. 🟢 No sign of overfitting yet, validation tracks training. "
+                "⏳ Expect gains to slow after epoch 200."),
+    "risks": ["⚠️ Learning rate may be too high for the late phase, watch for oscillation in mAP.",
+              "🧪 Validation set is small, so precision swings of ±0.02 are mostly noise.",
+              "🐢 Recall lags precision: small objects are probably under-detected.",
+              "💾 best.pt has not been backed up in the last 40 epochs."],
+    "trends": ["📈 mAP@.5 up 0.03 over the last 20 epochs.",
+               "📉 Box loss down 12% since epoch 100, class loss flat.",
+               "🎯 Precision stable around 0.71.",
+               "🔁 Recall slowly rising, +0.01 per 10 epochs."],
+    "recommendations": ["🔧 Drop the learning rate by 10x at epoch 250 if mAP stalls.",
+                        "🖼️ Add mosaic/mixup augmentation for small objects.",
+                        "💾 Press [S] to snapshot the current best weights.",
+                        "📊 Compare with the previous run via [C] before stopping."],
+    "metrics": ["Epoch: 180/300", "mAP@.5: 0.6231 (best 0.6240)", "Loss: 0.0412",
+                "P: 0.7104  R: 0.6588"],
+    "isoverfitted": False,
+}
+
+
+def make_stats(epochs):
+    rows = [(e, 10.2, 0.3 + e / (epochs * 3), 0.05 + 0.5 / (e + 1), 0.02, 0.01, 0.01, 12, 0.5, 0.6)
+            for e in range(epochs)]
+    return {key: [row[i] for row in rows] for i, key in enumerate(fishwell.RESULTS_KEYS)}
+
+
+def layout(frame, state, cache, box_w, box_h):
+    stats, feedback = state["stats"], state["feedback"]
+    best = max(stats["map"])
+    if cache is None:
+        fishwell.left_box_lines(stats, best, "", box_w - 4, box_h - 10)
+        list(fishwell.center_summary_lines(feedback, box_w, box_h))
+        fishwell.right_box_lines(feedback, box_w - 4)
+    else:
+        cache.get("left", (state["metrics_version"], "", box_w), fishwell.left_box_lines,
+                  stats, best, "", box_w - 4, box_h - 10)
+        list(cache.get("center", (state["analysis_version"], box_w, box_h), fishwell.center_summary_lines,
+                       feedback, box_w, box_h))
+        cache.get("right", (state["analysis_version"], box_w), fishwell.right_box_lines, feedback, box_w - 4)
+
+
+def run(frames, epoch_frames, analysis_frames, cached):
+    full = make_stats(300)
+    state = {"stats": make_stats(1), "feedback": dict(FEEDBACK), "metrics_version": 0, "analysis_version": 0}
+    cache = fishwell.ViewModelCache() if cached else None
+    box_w, box_h = fishwell.INFO_BOX_WIDTH, fishwell.INFO_BOX_HEIGHT
+    elapsed = 0.0
+    for frame in range(frames):
+        if frame % epoch_frames == 0:
+            n = min(300, frame // epoch_frames + 1)
+            state["stats"] = {key: values[:n] for key, values in full.items()}
+            state["metrics_version"] += 1
+        if frame % analysis_frames == 0:
+            state["feedback"] = dict(FEEDBACK)
+            state["analysis_version"] += 1
+        start = time.perf_counter()
+        layout(frame, state, cache, box_w, box_h)
+        elapsed += time.perf_counter() - start
+    return elapsed / frames, cache.builds if cache else frames * 3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=5000)
+    parser.add_argument("--epoch-frames", type=int, default=100, help="frames between new metrics")
+    parser.add_argument("--analysis-frames", type=int, default=500, help="frames between AI analyses")
+    args = parser.parse_args()
+    for name, cached in [("every frame", False), ("cached", True)]:
+        per_frame, builds = run(args.frames, args.epoch_frames, args.analysis_frames, cached)
+        print(f"{name:<12} {per_frame * 1e6:8.1f} us/frame  {builds:6d} box builds over {args.frames} frames")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
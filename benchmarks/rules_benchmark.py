@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Cost of checking training-feedback rules after every epoch, incremental vs from scratch.
+
+Grows --runs synthetic runs one epoch at a time and evaluates --rules rules (the
+built-in ones, repeated with different windows) after each epoch. One RuleEngine
+per run is fed only the new epoch; the from-scratch variant builds a new engine
+each time, which walks the whole history like the old hard-coded checks did.
+
+Usage:
+    python benchmarks/rules_benchmark.py [--runs 20] [--rules 200] [--epochs 300]
+"""
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import training_analyser_yolov7 as fishwell  # noqa: E402
+from ai_batch_benchmark import synthetic_runs  # noqa: E402
+
+
+def many_rules(count):
+    specs = []
+    for i in range(count):
+        spec = dict(fishwell.DEFAULT_RULES[i % len(fishwell.DEFAULT_RULES)])
+        spec["id"] = f"{spec['id']}_{i}"
+        spec["unless"] = [f"{other}_{i - i % len(fishwell.DEFAULT_RULES)}" for other in spec.get("unless", [])]
+        if "window" in spec:
+            spec["window"] = 4 + i % 20
+        specs.append(fishwell.compile_rule(spec))
+    return specs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--rules", type=int, default=200)
+    parser.add_argument("--epochs", type=int, default=300)
+    args = parser.parse_args()
+    rules = many_rules(args.rules)
+    runs = synthetic_runs(args.runs, args.epochs)
+    for name, incremental in [("from scratch", False), ("incremental", True)]:
+        engines = {run: fishwell.RuleEngine(rules) for run in runs}
+        views = {run: {key: [] for key in stats} for run, stats in runs.items()}
+        fired = 0
+        elapsed = 0.0
+        for n in range(args.epochs):
+            for run, stats in runs.items():
+                view = views[run]
+                for key, values in stats.items():
+                    view[key].append(values[n])
+                start = time.perf_counter()
+                engine = engines[run] if incremental else fishwell.RuleEngine(rules)
+                fired += len(engine.evaluate(view))
+                elapsed += time.perf_counter() - start
+        checks = args.epochs * args.runs
+        print(f"{name:<13} {elapsed:7.2f} s  {elapsed / checks * 1e3:7.3f} ms per run-epoch  {fired} firings")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""Cold-start benchmark for training_analyser_yolov7.py.
+
+Measures two things and compares them against startup_baseline.json:
+
+1. Import cost, from `python -X importtime -c "import training_analyser_yolov7"`.
+2. Time to first frame: the real script is started in a pseudo-terminal against a
+   throwaway runs/train tree, the run is picked through the menu, and the clock
+   runs from the final confirmation key until the metrics dashboard shows up.
+   No API key is needed: the dashboard must not wait for the AI.
+
+Usage:
+    python benchmarks/startup_benchmark.py                    # check against baseline
+    python benchmarks/startup_benchmark.py --update-baseline  # record a new baseline
+"""
+import argparse
+import json
+import os
+import pty
+import select
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(os.path.dirname(HERE), "training_analyser_yolov7.py")
+BASELINE_FILE = os.path.join(HERE, "startup_baseline.json")
+FIRST_FRAME_BUDGET_MS = 200
+# A measurement regresses when it exceeds baseline * TOLERANCE + SLACK_MS
+TOLERANCE = 1.5
+SLACK_MS = 20
+
+
+def measure_import_ms(repeats=5):
+    """Median cumulative import time of the module, in ms, plus its heaviest imports."""
+    samples = []
+    heaviest = []
+    for _ in range(repeats):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import training_analyser_yolov7"],
+            cwd=os.path.dirname(SCRIPT), capture_output=True, text=True, check=True,
+        )
+        rows = []
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+        total = next(c for c, _, name in rows if name.strip() == "training_analyser_yolov7")
+        samples.append(total / 1000)
+        # Direct children of the module are indented one level (two spaces) deeper than it
+        heaviest = sorted((r for r in rows if r[2].startswith("   ") and not r[2].startswith("    ")),
+                          reverse=True)[:5]
+    samples.sort()
+    return samples[len(samples) // 2], [(name.strip(), c / 1000) for c, _, name in heaviest]
+
+
+def make_fake_project(epochs=300):
+    """Create project/yolov7-main/runs/train/bench/results.txt and return the tool directory."""
+    root = tempfile.mkdtemp(prefix="fishwell_bench_")
+    run_dir = os.path.join(root, "yolov7-main", "runs", "train", "bench")
+    os.makedirs(os.path.join(run_dir, "weights"))
+    with open(os.path.join(run_dir, "results.txt"), "w") as f:
+        for e in range(epochs):
+            f.write(f"{e}/{epochs - 1} 10.2G {0.3 + e / (epochs * 3):.4f} 0.05 0.02 0.01 12 640 "
+                    f"0.5000 0.6000\n")
+    tool_dir = os.path.join(root, "tool")
+    os.makedirs(tool_dir)
+    return root, tool_dir
+
+
+def read_until(fd, needle, timeout):
+    """Read pty output until needle appears; return True if it did."""
+    buf = b""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        ready, _, _ = select.select([fd], [], [], 0.01)
+        if not ready:
+            continue
+        try:
+            chunk = os.read(fd, 65536)
+        except OSError:
+            return False
+        if not chunk:
+            return False
+        buf += chunk
+        if needle in buf:
+            return True
+        buf = buf[-len(needle):]
+    return False
+
+
+def measure_first_frame_ms(repeats=5):
+    """Median ms from confirming the run in the menu to the first dashboard frame."""
+    samples = []
+    root, tool_dir = make_fake_project()
+    try:
+        for _ in range(repeats):
+            pid, fd = pty.fork()
+            if pid == 0:
+                os.chdir(tool_dir)
+                os.environ["TERM"] = "xterm-256color"
+                os.environ["LINES"], os.environ["COLUMNS"] = "50", "200"
+                os.execv(sys.executable, [sys.executable, SCRIPT])
+            try:
+                # Menu defaults to auto-detect: Enter, Enter on the only run, then confirm
+                if not read_until(fd, b"Auto-detect", 10):
+                    raise RuntimeError("menu did not appear")
+                os.write(fd, b"\r")
+                if not read_until(fd, b"bench", 5):
+                    raise RuntimeError("run selector did not appear")
+                os.write(fd, b"\r")
+                if not read_until(fd, b"Is this correct", 5):
+                    raise RuntimeError("confirmation did not appear")
+                start = time.perf_counter()
+                os.write(fd, b"y")
+                if not read_until(fd, b"Epoch: 299", 10):
+                    raise RuntimeError("dashboard did not appear")
+                samples.append((time.perf_counter() - start) * 1000)
+                os.write(fd, b"q")
+                read_until(fd, b"\x00never", 1)
+            finally:
+                try:
+                    os.kill(pid, 9)
+                except OSError:
+                    pass
+                os.waitpid(pid, 0)
+                os.close(fd)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--update-baseline", action="store_true", help="write the measurements as the new baseline")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    import_ms, heaviest = measure_import_ms(args.repeats)
+    first_frame_ms = measure_first_frame_ms(args.repeats)
+    result = {"import_ms": round(import_ms, 1), "first_frame_ms": round(first_frame_ms, 1)}
+    print(f"import:      {import_ms:7.1f} ms")
+    for name, ms in heaviest:
+        print(f"  {name:<28} {ms:7.1f} ms")
+    print(f"first frame: {first_frame_ms:7.1f} ms (budget {FIRST_FRAME_BUDGET_MS} ms)")
+
+    if args.update_baseline:
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(result, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {BASELINE_FILE}")
+        return 0
+
+    failed = first_frame_ms > FIRST_FRAME_BUDGET_MS
+    if failed:
+        print(f"FAIL: first frame over the {FIRST_FRAME_BUDGET_MS} ms budget")
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            baseline = json.load(f)
+        for key, value in result.items():
+            limit = baseline[key] * TOLERANCE + SLACK_MS
+            if value > limit:
+                print(f"FAIL: {key} regressed: {value} ms > {limit:.1f} ms (baseline {baseline[key]} ms)")
+                failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
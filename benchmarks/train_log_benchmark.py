@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Cost of following a YOLOv7 console log: appended bytes only vs re-reading the whole file.
+
+Writes a synthetic train.py log (tqdm updates separated by carriage returns,
+--updates per epoch, with a validation bar after each epoch) for --epochs
+epochs, then appends --polls more updates one at a time. After each one,
+TrainLogTail decodes only the new bytes, while the naive reader reads the whole
+file and parses its last update.
+
+Usage:
+    python benchmarks/train_log_benchmark.py [--epochs 100] [--updates 463] [--polls 200]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import training_analyser_yolov7 as fishwell  # noqa: E402
+
+HEADER = ("     Epoch   gpu_mem       box       obj       cls     total    labels  img_size\n")
+VAL = ("               Class      Images      Labels           P           R      mAP@.5  mAP@.5:.95:"
+       " {pct:3d}%|{bar:<10}| {n}/{of} [00:05<00:06,  3.62it/s]")
+
+
+def train_update(epoch, epochs, n, total):
+    bar = "█" * (10 * n // total)
+    desc = ("%10s" * 2 + "%10.4g" * 6) % (f"{epoch}/{epochs - 1}", "10.2G", 0.05 - epoch * 1e-4, 0.02, 0.01,
+                                          0.08 - epoch * 1e-4, 91, 640)
+    return f"\r{desc}: {100 * n // total:3d}%|{bar:<10}| {n}/{total} [00:32<03:50,  {1.5 + n % 7 / 10:.2f}it/s]"
+
+
+def epoch_text(epoch, epochs, updates):
+    parts = [HEADER]
+    parts.extend(train_update(epoch, epochs, n, updates) for n in range(updates + 1))
+    parts.append("\n")
+    parts.extend("\r" + VAL.format(pct=100 * n // 44, bar="█" * (10 * n // 44), n=n, of=44) for n in range(45))
+    parts.append("\n                 all        5000       36335       0.712       0.659       0.702       0.481\n")
+    return "".join(parts)
+
+
+def last_update(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    for segment in reversed(data.replace(b"\n", b"\r").split(b"\r")):
+        progress = fishwell.parse_progress(segment.decode("utf-8", "replace")) if segment else None
+        if progress:
+            return progress
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--epochs", type=int, default=100)
+    parser.add_argument("--updates", type=int, default=463, help="tqdm updates (batches) per epoch")
+    parser.add_argument("--polls", type=int, default=200)
+    args = parser.parse_args()
+    root = tempfile.mkdtemp(prefix="fishwell_log_")
+    path = os.path.join(root, "train.log")
+    try:
+        with open(path, "w") as f:
+            for epoch in range(args.epochs):
+                f.write(epoch_text(epoch, args.epochs + 1, args.updates))
+            f.write(HEADER)
+        print(f"{os.path.getsize(path) / 1e6:.1f} MB log, {args.polls} polls")
+        tail = fishwell.TrainLogTail(path)
+        tail.read()
+        elapsed = {"appended bytes": 0.0, "whole file": 0.0}
+        for n in range(args.polls):
+            with open(path, "a") as f:
+                f.write(train_update(args.epochs, args.epochs + 1, n, args.polls))
+            start = time.perf_counter()
+            tail.read()
+            elapsed["appended bytes"] += time.perf_counter() - start
+            start = time.perf_counter()
+            naive = last_update(path)
+            elapsed["whole file"] += time.perf_counter() - start
+            assert naive == tail.progress, (naive, tail.progress)
+        for name, total in elapsed.items():
+            print(f"{name:<15} {total / args.polls * 1e3:8.3f} ms per poll")
+        print(f"last update: {tail.progress}")
+        print(f"bar: [{fishwell.progress_label(tail.progress, tail.rates, 44)}]")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,12 @@
 #!/usr/bin/env python3
+import asyncio
+import codecs
+import bisect
 import curses
+import collections
+import itertools
+import signal
+import threading
 import time
 import random
 import os
@@ -7,24 +14,173 @@ import shutil
 import math
 import re
 import json
-import requests
+import concurrent.futures
+from array import array
+import functools
 from datetime import datetime
 import glob
 import sys
 import logging
+import logging.handlers
+import queue
+import atexit
+import contextlib
+import hashlib
+import marshal
+import mmap
+import struct
 import textwrap
 
-# Wipe log file at the start of each run
-with open('analyser_debug.log', 'w') as f:
-    f.write('')
+# Reference point for the time-to-first-frame measurement
+PROCESS_START = time.perf_counter()
 
-# Set up logging
-logging.basicConfig(
-    filename='analyser_debug.log',
-    filemode='a',
-    format='%(asctime)s %(levelname)s: %(message)s',
-    level=logging.INFO
-)
+# --- Logging ---
+LOG_FILE = 'analyser_debug.log'
+LOG_MAX_BYTES = 2 * 1024 * 1024  # rotate the debug log at 2 MB
+LOG_BACKUP_COUNT = 3             # keep analyser_debug.log.1 .. .3
+LOG_RATE_LIMIT_WINDOW = 30       # seconds
+LOG_RATE_LIMIT_BURST = 5         # messages per call site and window before suppressing
+
+class LazyJson:
+    """Defers json.dumps (and truncation) until a log record is actually written."""
+    __slots__ = ("data", "limit")
+
+    def __init__(self, data, limit=1000):
+        self.data = data
+        self.limit = limit
+
+    def __str__(self):
+        text = json.dumps(self.data)
+        if len(text) > self.limit:
+            return f"{text[:self.limit]}... (truncated)"
+        return text
+
+class RateLimitFilter(logging.Filter):
+    """Let at most LOG_RATE_LIMIT_BURST records per call site through per window.
+
+    The first record after a suppressed stretch carries suppressed=N so the log
+    still says how much was dropped.
+    """
+
+    def __init__(self, window=LOG_RATE_LIMIT_WINDOW, burst=LOG_RATE_LIMIT_BURST):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.sites = {}  # (pathname, lineno) -> [window_start, count, suppressed]
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        key = (record.pathname, record.lineno)
+        now = record.created
+        with self.lock:
+            site = self.sites.get(key)
+            if site is None or now - site[0] >= self.window:
+                suppressed = site[2] if site else 0
+                self.sites[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            site[1] += 1
+            if site[1] > self.burst:
+                site[2] += 1
+                return False
+            return True
+
+class StructuredFormatter(logging.Formatter):
+    """'time LEVEL: message' followed by event=... and any key=value fields."""
+
+    def format(self, record):
+        line = super().format(record)
+        fields = dict(getattr(record, 'fields', None) or {})
+        event = getattr(record, 'event', None)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            fields['suppressed'] = suppressed
+        if event:
+            line += f" event={event}"
+        for key, value in fields.items():
+            line += f" {key}={value}"
+        return line
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves %-formatting to the listener thread.
+
+    The stock prepare() formats every record in the calling thread, which is
+    exactly the cost we want off the render loop. Records stay in-process, so
+    they can be queued as-is.
+    """
+
+    def prepare(self, record):
+        return record
+
+class EventTimings:
+    """Per-event count/total/max durations, kept in memory for status displays."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = {}  # event -> [count, total_seconds, max_seconds, last_seconds]
+
+    def record(self, event, seconds):
+        with self.lock:
+            entry = self.events.get(event)
+            if entry is None:
+                self.events[event] = [1, seconds, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+                entry[3] = seconds
+
+    def snapshot(self):
+        with self.lock:
+            return {event: list(entry) for event, entry in self.events.items()}
+
+EVENT_TIMINGS = EventTimings()
+_log_listener = None
+
+@contextlib.contextmanager
+def log_timing(event, level=logging.DEBUG, **fields):
+    """Time a block, record it in EVENT_TIMINGS and log it (only if level is enabled)."""
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        elapsed = time.perf_counter() - start
+        EVENT_TIMINGS.record(event, elapsed)
+        if logging.getLogger().isEnabledFor(level):
+            fields['duration_ms'] = round(elapsed * 1000, 2)
+            logging.log(level, "%s finished", event, extra={'event': event, 'fields': fields})
+
+def setup_logging(level=logging.INFO):
+    """Route logging through a queue to a size-rotated file (called from main(), never at import time).
+
+    Callers only pay for putting a record on a queue; formatting and file I/O
+    happen on the QueueListener thread.
+    """
+    global _log_listener
+    if _log_listener is not None:
+        return _log_listener
+    file_handler = logging.handlers.RotatingFileHandler(
+        LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+    )
+    file_handler.setFormatter(StructuredFormatter('%(asctime)s %(levelname)s: %(message)s'))
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter())
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(queue_handler)
+    _log_listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _log_listener.start()
+    atexit.register(shutdown_logging)
+    return _log_listener
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread (safe to call twice)."""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
 
 # Terminal colors
 class Colors:
@@ -44,16 +200,30 @@ OPENAI_API_KEY = ""
 ANTHROPIC_API_KEY = "YOUR_ANTHROPIC_API_KEY"  # Add your Claude API key here
 
 # Constants
+RUNS_BASE_PATH = "../yolov7-main/runs/train"  # YOLOv7 training runs, relative to this script's working dir
 INFO_BOX_HEIGHT = 14
 INFO_BOX_WIDTH = 48
 
 # AI Analysis Settings
-ANALYSIS_INTERVAL = 5  # Analyze every 5 epochs
-USE_CHATGPT = True    # Set to False to use Claude instead
+USE_CHATGPT = True    # Set to False to ask Claude first (and ChatGPT as the hedge)
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"  # or any OpenAI-compatible server
+OPENAI_MODEL = "gpt-4-turbo-preview"
+ANTHROPIC_MESSAGES_URL = "https://api.anthropic.com/v1/messages"  # or any Anthropic-compatible server
+ANTHROPIC_MODEL = "claude-3-5-sonnet-20240620"
+AI_HEDGE = True       # with both API keys set, also ask the other provider when the first is slow
+AI_DELTA_PROMPTS = True  # live runs: send only the epochs added since the last analysis
+AI_RESYNC_EVERY = 10     # ... and the whole history again on every 10th call
+
+# Prometheus endpoint (optional)
+METRICS_PORT = None         # e.g. 9464 to serve http://127.0.0.1:9464/metrics
+METRICS_HOST = "127.0.0.1"  # use "0.0.0.0" to let a remote Prometheus scrape it
+
+# Metrics bus: the first aquarium on a run parses and asks the AI, later ones just watch
+METRICS_BUS = True
 
 def find_latest_run_with_name(name):
     """Find the latest run directory that matches the given name pattern."""
-    base_path = os.path.expanduser("../yolov7-main/runs/train")
+    base_path = os.path.expanduser(RUNS_BASE_PATH)
     if not os.path.exists(base_path):
         return None
         
@@ -72,7 +242,7 @@ def find_latest_run_with_name(name):
 
 def find_all_training_runs():
     """Find all training run directories in the project."""
-    base_path = os.path.expanduser("../yolov7-main/runs/train")
+    base_path = os.path.expanduser(RUNS_BASE_PATH)
     if not os.path.exists(base_path):
         return []
         
@@ -108,7 +278,7 @@ def print_header():
     terminal_width = shutil.get_terminal_size().columns
     print(center_text(f"{Colors.CYAN}{Colors.BOLD}Your A.I trainer-how-goesit-assistant by Fishwell{Colors.RESET}"))
 
-def curses_main_menu(runs):
+async def main_menu_screen(stdscr, runs):
     """Unified curses UI: ASCII art, title, menu, and autodetect selector."""
     def draw_ascii_art(stdscr, y):
         h, w = stdscr.getmaxyx()
@@ -172,103 +342,93 @@ def curses_main_menu(runs):
         stdscr.addstr(h//2+2, (w - len(prompt)) // 2, prompt, curses.color_pair(2))
         stdscr.refresh()
 
-    def main(stdscr):
-        curses.curs_set(0)
-        curses.start_color()
-        curses.use_default_colors()
-        # Color pairs: 1=default, 2=cyan, 3=aqua, 4=yellow highlight, 5=blue bg, 6=white on blue
-        curses.init_pair(2, curses.COLOR_CYAN, -1)
-        curses.init_pair(3, curses.COLOR_MAGENTA, -1)
-        curses.init_pair(4, curses.COLOR_YELLOW, curses.COLOR_CYAN)
-        curses.init_pair(5, curses.COLOR_WHITE, curses.COLOR_BLUE)
-        curses.init_pair(6, curses.COLOR_BLACK, curses.COLOR_WHITE)
-        h, w = stdscr.getmaxyx()
-        selected_menu = 2  # default to autodetect
-        while True:
-            stdscr.clear()
-            y = 1
-            y = draw_ascii_art(stdscr, y)
-            y = draw_title(stdscr, y)
-            y = draw_menu(stdscr, y, selected_menu)
-            stdscr.refresh()
-            key = stdscr.getch()
-            if key in [curses.KEY_UP, ord('k')]:
-                selected_menu = (selected_menu - 1) % 4
-            elif key in [curses.KEY_DOWN, ord('j')]:
-                selected_menu = (selected_menu + 1) % 4
-            elif key in [curses.KEY_ENTER, 10, 13]:
-                if selected_menu == 0:
-                    # Enter relative path
-                    curses.endwin()
-                    path = input("Enter the relative path to the training run directory: ").strip()
+    curses.curs_set(0)
+    stdscr.nodelay(True)
+    curses.start_color()
+    curses.use_default_colors()
+    # Color pairs: 1=default, 2=cyan, 3=aqua, 4=yellow highlight, 5=blue bg, 6=white on blue
+    curses.init_pair(2, curses.COLOR_CYAN, -1)
+    curses.init_pair(3, curses.COLOR_MAGENTA, -1)
+    curses.init_pair(4, curses.COLOR_YELLOW, curses.COLOR_CYAN)
+    curses.init_pair(5, curses.COLOR_WHITE, curses.COLOR_BLUE)
+    curses.init_pair(6, curses.COLOR_BLACK, curses.COLOR_WHITE)
+    h, w = stdscr.getmaxyx()
+    selected_menu = 2  # default to autodetect
+    while True:
+        stdscr.clear()
+        y = 1
+        y = draw_ascii_art(stdscr, y)
+        y = draw_title(stdscr, y)
+        y = draw_menu(stdscr, y, selected_menu)
+        stdscr.refresh()
+        key = await read_key(stdscr)
+        if key in [curses.KEY_UP, ord('k')]:
+            selected_menu = (selected_menu - 1) % 4
+        elif key in [curses.KEY_DOWN, ord('j')]:
+            selected_menu = (selected_menu + 1) % 4
+        elif key in [curses.KEY_ENTER, 10, 13]:
+            if selected_menu == 0:
+                # Enter relative path
+                path = await read_line(stdscr, "Enter the relative path to the training run directory: ")
+                if path:
                     return path
-                elif selected_menu == 1:
-                    # Search by model name
-                    curses.endwin()
-                    name = input("Enter the model name to search for: ").strip()
-                    from os.path import basename
-                    from glob import glob
-                    base_path = os.path.expanduser("../yolov7-main/runs/train")
-                    pattern = os.path.join(base_path, f"{name}*")
-                    matching_dirs = glob(pattern)
-                    if not matching_dirs:
-                        print(f"No training runs found matching '{name}'")
-                        input("Press Enter to continue...")
-                        return None
-                    matching_dirs.sort()
-                    return basename(matching_dirs[-1])
-                elif selected_menu == 2:
-                    # Auto-detect
-                    sel = 0
-                    while True:
-                        stdscr.clear()
-                        y = 1
-                        y = draw_ascii_art(stdscr, y)
-                        y = draw_title(stdscr, y)
-                        draw_autodetect_selector(stdscr, runs, sel)
-                        stdscr.refresh()
-                        key2 = stdscr.getch()
-                        if key2 in [curses.KEY_UP, ord('k')]:
-                            sel = (sel - 1) % len(runs)
-                        elif key2 in [curses.KEY_DOWN, ord('j')]:
-                            sel = (sel + 1) % len(runs)
-                        elif key2 in [curses.KEY_ENTER, 10, 13]:
-                            # Confirmation
-                            while True:
-                                stdscr.clear()
-                                draw_confirmation(stdscr, runs[sel])
-                                key3 = stdscr.getch()
-                                if key3 in [ord('y'), ord('Y')]:
-                                    return runs[sel]
-                                elif key3 in [ord('n'), ord('N')]:
-                                    break
-                        elif key2 in [ord('q'), 27]:
-                            break
-                elif selected_menu == 3:
-                    # Quit
-                    curses.endwin()
-                    print("No training run selected. Exiting...")
-                    exit(0)
-    return curses.wrapper(main)
-
-def get_run_by_autodetect():
-    runs = find_all_training_runs()
-    if not runs:
-        print(center_text(f"{Colors.RED}No training runs found!{Colors.RESET}"))
-        return None
-    return curses_main_menu(runs)
-
-def get_run_directory():
-    # Use the new curses menu for everything
-    runs = find_all_training_runs()
-    return curses_main_menu(runs)
+            elif selected_menu == 1:
+                # Search by model name
+                name = await read_line(stdscr, "Enter the model name to search for: ")
+                if name is None:
+                    continue
+                from os.path import basename
+                from glob import glob
+                base_path = os.path.expanduser(RUNS_BASE_PATH)
+                pattern = os.path.join(base_path, f"{name}*")
+                matching_dirs = glob(pattern)
+                if not matching_dirs:
+                    msg = f"No training runs found matching '{name}'. Press any key to continue..."
+                    stdscr.clear()
+                    stdscr.addstr(h//2, max(0, (w - len(msg)) // 2), msg[:w-1], curses.color_pair(3))
+                    stdscr.refresh()
+                    await read_key(stdscr)
+                    return None
+                matching_dirs.sort()
+                return basename(matching_dirs[-1])
+            elif selected_menu == 2:
+                # Auto-detect
+                sel = 0
+                while True:
+                    stdscr.clear()
+                    y = 1
+                    y = draw_ascii_art(stdscr, y)
+                    y = draw_title(stdscr, y)
+                    draw_autodetect_selector(stdscr, runs, sel)
+                    stdscr.refresh()
+                    key2 = await read_key(stdscr)
+                    if key2 in [curses.KEY_UP, ord('k')]:
+                        sel = (sel - 1) % len(runs)
+                    elif key2 in [curses.KEY_DOWN, ord('j')]:
+                        sel = (sel + 1) % len(runs)
+                    elif key2 in [curses.KEY_ENTER, 10, 13]:
+                        # Confirmation
+                        while True:
+                            stdscr.clear()
+                            draw_confirmation(stdscr, runs[sel])
+                            key3 = await read_key(stdscr)
+                            if key3 in [ord('y'), ord('Y')]:
+                                return runs[sel]
+                            elif key3 in [ord('n'), ord('N')]:
+                                break
+                    elif key2 in [ord('q'), 27]:
+                        break
+            elif selected_menu == 3:
+                # Quit
+                return None
 
 def set_paths(run_name):
     """Set all paths based on the run directory name."""
-    base_path = os.path.expanduser("../yolov7-main/runs/train")
+    base_path = os.path.expanduser(RUNS_BASE_PATH)
     run_path = os.path.join(base_path, run_name)
     
-    global RESULTS_FILE, WEIGHTS_DIR, BEST_PT
+    global RUN_NAME, RESULTS_FILE, WEIGHTS_DIR, BEST_PT
+    RUN_NAME = run_name
     RESULTS_FILE = os.path.join(run_path, "results.txt")
     WEIGHTS_DIR = os.path.join(run_path, "weights")
     BEST_PT = os.path.join(WEIGHTS_DIR, "best.pt")
@@ -493,6 +653,24 @@ ASCII_ART = [
     "                  Remember to feed your Haviduck                         "
 ]
 
+# Static art drawn by the aquarium; compiled into the sprite sheet with the fish
+STATIC_ART = {
+    "logo": ASCII_ART,
+    "crab": [
+        "      ,~~.",
+        " ,   (  - )>",
+        " )`~~'   (",
+        "(  .__)   )",
+        " `-.____,' "
+    ],
+    "duck": [
+        "   __",
+        "<(o )___",
+        " ( ._> /",
+        "  `---' "
+    ],
+}
+
 # --- Fish Art Parsing ---
 def parse_fish_art_from_string(content):
     fish_defs = []
@@ -546,11 +724,13 @@ def parse_results(results_file):
         "precision": [],
         "recall": []
     }
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG)
     try:
         with open(results_file, 'r') as f:
             for line in f:
                 if line.startswith('epoch'):
-                    logging.debug(f"Skipping header line: {line.strip()}")
+                    if debug:
+                        logging.debug("Skipping header line: %s", line.strip())
                     continue
                 values = line.strip().split()
                 if len(values) >= 10:
@@ -571,14 +751,15 @@ def parse_results(results_file):
                         metrics["labels"].append(int(values[6]))
                         metrics["precision"].append(float(values[8]))
                         metrics["recall"].append(float(values[9]))
-                        logging.debug(f"Parsed line: {line.strip()}")
+                        if debug:
+                            logging.debug("Parsed line: %s", line.strip())
                     except Exception as e:
-                        logging.error(f"Error parsing line: '{line.strip()}': {e}")
+                        logging.error("Error parsing line: '%s': %s", line.strip(), e)
                         continue
                 else:
-                    logging.warning(f"Skipping short line: {line.strip()}")
+                    logging.warning("Skipping short line: %s", line.strip())
     except Exception as e:
-        logging.error(f"Error opening or reading results file: {e}")
+        logging.error("Error opening or reading results file: %s", e)
     #logging.info(f"Parsed metrics: { {k: len(v) for k,v in metrics.items()} }")
     return metrics
 
@@ -592,15 +773,6 @@ def detect_overfitting(map_history, patience=5):
             drops += 1
     return drops == patience
 
-def backup_best_weight():
-    if not os.path.exists(WEIGHTS_DIR):
-        os.makedirs(WEIGHTS_DIR)
-    dst = os.path.join(WEIGHTS_DIR, "best.pt")
-    if os.path.exists(BEST_PT):
-        shutil.copy2(BEST_PT, dst)
-        return True
-    return False
-
 def analyze_trend(map_hist, window=8):
     if len(map_hist) < window:
         return "Not enough data yet!", "🤔"
@@ -617,122 +789,908 @@ def analyze_trend(map_hist, window=8):
     else:
         return "Getting worse...", "😬"
 
-def get_training_feedback(stats, map_history, loss_history, box_loss_history, cls_loss_history, patience=8):
-    feedback = []
-    explanations = []
-    emoji = ""
-    color = curses.color_pair(2)  # green by default
-    # Use latest values for all stats
-    latest_labels = stats['labels'][-1] if stats['labels'] else 0
-    latest_total = stats['total'][-1] if stats['total'] else 0.0
-    # Check for no labels
-    if latest_labels == 0:
-        feedback.append("⚠️ No labels detected! Check your dataset.")
-        explanations.append(
-            "No labels were found in your data.\n"
-            "Why it matters: The model can't learn to detect anything without labels.\n"
-            "What to do: Check your dataset paths and annotation format."
-        )
-        color = curses.color_pair(3)
-        emoji = "🚨"
-    # Check for NaN or very high loss
-    if math.isnan(latest_total) or latest_total > 10.0:
-        feedback.append("⚠️ Loss is NaN or very high! Check your data/learning rate.")
-        explanations.append(
-            "Loss is either not a number (NaN) or extremely high.\n"
-            "Why it matters: This usually means a data or configuration problem, and the model isn't learning.\n"
-            "What to do: Check your images, labels, and try lowering the learning rate."
-        )
-        color = curses.color_pair(3)
-        emoji = "🔥"
-    # Check for mAP not improving
-    if len(map_history) > patience:
-        recent = map_history[-patience:]
-        if all(abs(recent[i] - recent[i-1]) < 1e-4 for i in range(1, len(recent))):
-            feedback.append(f"😐 mAP hasn't improved in {patience} epochs. Try more augmentation or lower lr.")
-            explanations.append(
-                "Your model's mAP (mean Average Precision) has plateaued.\n"
-                "Why it matters: The model is no longer getting better at detecting objects on your validation set.\n"
-                "What to do: Try increasing data augmentation, lowering the learning rate, or adding more labeled data.\n"
-                "If you ignore this: The model may not improve further, and you could be overfitting."
-            )
-            color = curses.color_pair(3)
-            emoji = "😐"
-        elif recent[-1] < max(recent[:-1]):
-            since = len(recent) - 1 - recent[:-1][::-1].index(max(recent[:-1]))
-            feedback.append(f"📉 No new best mAP in {since} epochs.")
-            explanations.append(
-                "You haven't achieved a new best mAP in several epochs.\n"
-                "Why it matters: The model may be plateauing or starting to overfit.\n"
-                "What to do: Consider early stopping, more data, or regularization."
-            )
-            color = curses.color_pair(4)
-            emoji = "📉"
-    # Check for loss not decreasing
-    if len(loss_history) > patience:
-        recent = loss_history[-patience:]
-        if all(abs(recent[i] - recent[i-1]) < 1e-4 for i in range(1, len(recent))):
-            feedback.append(f"😬 Loss hasn't decreased in {patience} epochs.")
-            explanations.append(
-                "Your model's loss has stopped decreasing.\n"
-                "Why it matters: The model may not be learning or could be stuck.\n"
-                "What to do: Try adjusting your learning rate, optimizer, or data."
-            )
-            color = curses.color_pair(3)
-            emoji = "😬"
-    # Check for box_loss or cls_loss rising after stability/decline
-    if len(box_loss_history) > patience:
-        recent = box_loss_history[-patience:]
-        if all(recent[i] >= recent[i-1] for i in range(1, len(recent))):
-            feedback.append(f"🔺 box_loss has been rising for {patience} epochs. Possible overfitting!")
-            explanations.append(
-                "Your model's box_loss (bounding box regression loss) is increasing after a period of stability or decline.\n"
-                "Why it matters: This is a classic sign of overfitting—your model is starting to perform worse on validation data.\n"
-                "What to do: Consider early stopping, stronger regularization, or saving the best weights now."
-            )
-            color = curses.color_pair(3)
-            emoji = "🔺"
-    if len(cls_loss_history) > patience:
-        recent = cls_loss_history[-patience:]
-        if all(recent[i] >= recent[i-1] for i in range(1, len(recent))):
-            feedback.append(f"🔺 cls_loss has been rising for {patience} epochs. Possible overfitting!")
-            explanations.append(
-                "Your model's cls_loss (classification loss) is increasing after a period of stability or decline.\n"
-                "Why it matters: This is a classic sign of overfitting—your model is starting to perform worse on validation data.\n"
-                "What to do: Consider early stopping, stronger regularization, or saving the best weights now."
-            )
-            color = curses.color_pair(3)
-            emoji = "🔺"
-    # If everything looks good
-    if not feedback:
-        feedback.append("✅ Training is progressing well! Keep going! 🚀")
-        explanations.append(
-            "Your model is learning and improving.\n"
-            "Why it matters: You're on track for a good model!\n"
-            "What to do: Keep training and monitor for plateaus or overfitting."
-        )
-        color = curses.color_pair(2)
-        emoji = "🎉"
-    return feedback, explanations, color, emoji
+# --- Training feedback rules ---
+# Each rule watches one metric column through an evaluator that is fed one epoch
+# at a time and keeps O(1) state, so re-checking after a new epoch costs the same
+# at epoch 10 as at epoch 1000. The built-in rules below can be overridden (same
+# id), disabled ("enabled": false) or extended from RULES_FILE, a JSON list of
+# rule objects with these fields:
+#   id, metric (a parse_results key), predicate, window (epochs), threshold,
+#   tolerance, severity (info/warning/critical), emoji, message, explanation,
+#   unless (ids of rules that suppress this one when they fire)
+# message and explanation may use {metric} {window} {threshold} {value} {since} {count}.
+RULES_FILE = "fishwell_rules.json"  # next to the script
+RULE_SEVERITIES = {"info": 0, "warning": 1, "critical": 2}
+RULE_SEVERITY_COLORS = {"info": 2, "warning": 4, "critical": 3}  # curses color pairs
+
+DEFAULT_RULES = [
+    {"id": "no_labels", "metric": "labels", "predicate": "equals", "threshold": 0, "severity": "critical",
+     "emoji": "🚨", "message": "⚠️ No labels detected! Check your dataset.",
+     "explanation": "No labels were found in your data.\n"
+                    "Why it matters: The model can't learn to detect anything without labels.\n"
+                    "What to do: Check your dataset paths and annotation format."},
+    {"id": "loss_nan", "metric": "total", "predicate": "nan", "severity": "critical",
+     "emoji": "🔥", "message": "⚠️ Loss is NaN or very high! Check your data/learning rate.",
+     "explanation": "Loss is either not a number (NaN) or extremely high.\n"
+                    "Why it matters: This usually means a data or configuration problem, and the model isn't learning.\n"
+                    "What to do: Check your images, labels, and try lowering the learning rate."},
+    {"id": "loss_high", "metric": "total", "predicate": "above", "threshold": 10.0, "severity": "critical",
+     "emoji": "🔥", "message": "⚠️ Loss is NaN or very high! Check your data/learning rate.",
+     "explanation": "Loss is either not a number (NaN) or extremely high.\n"
+                    "Why it matters: This usually means a data or configuration problem, and the model isn't learning.\n"
+                    "What to do: Check your images, labels, and try lowering the learning rate."},
+    {"id": "map_plateau", "metric": "map", "predicate": "flat", "window": 8, "tolerance": 1e-4,
+     "severity": "critical", "emoji": "😐",
+     "message": "😐 mAP hasn't improved in {window} epochs. Try more augmentation or lower lr.",
+     "explanation": "Your model's mAP (mean Average Precision) has plateaued.\n"
+                    "Why it matters: The model is no longer getting better at detecting objects on your validation set.\n"
+                    "What to do: Try increasing data augmentation, lowering the learning rate, or adding more labeled data.\n"
+                    "If you ignore this: The model may not improve further, and you could be overfitting."},
+    {"id": "map_no_new_best", "metric": "map", "predicate": "no_new_best", "window": 8, "severity": "warning",
+     "unless": ["map_plateau"], "emoji": "📉", "message": "📉 No new best mAP in {since} epochs.",
+     "explanation": "You haven't achieved a new best mAP in several epochs.\n"
+                    "Why it matters: The model may be plateauing or starting to overfit.\n"
+                    "What to do: Consider early stopping, more data, or regularization."},
+    {"id": "loss_flat", "metric": "loss", "predicate": "flat", "window": 8, "tolerance": 1e-4,
+     "severity": "critical", "emoji": "😬", "message": "😬 Loss hasn't decreased in {window} epochs.",
+     "explanation": "Your model's loss has stopped decreasing.\n"
+                    "Why it matters: The model may not be learning or could be stuck.\n"
+                    "What to do: Try adjusting your learning rate, optimizer, or data."},
+    {"id": "box_loss_rising", "metric": "box_loss", "predicate": "rising", "window": 8, "severity": "critical",
+     "emoji": "🔺", "message": "🔺 box_loss has been rising for {window} epochs. Possible overfitting!",
+     "explanation": "Your model's box_loss (bounding box regression loss) is increasing after a period of stability or decline.\n"
+                    "Why it matters: This is a classic sign of overfitting—your model is starting to perform worse on validation data.\n"
+                    "What to do: Consider early stopping, stronger regularization, or saving the best weights now."},
+    {"id": "cls_loss_rising", "metric": "cls_loss", "predicate": "rising", "window": 8, "severity": "critical",
+     "emoji": "🔺", "message": "🔺 cls_loss has been rising for {window} epochs. Possible overfitting!",
+     "explanation": "Your model's cls_loss (classification loss) is increasing after a period of stability or decline.\n"
+                    "Why it matters: This is a classic sign of overfitting—your model is starting to perform worse on validation data.\n"
+                    "What to do: Consider early stopping, stronger regularization, or saving the best weights now."},
+]
+
+class LatestValueEvaluator:
+    """equals / above / below / nan: looks at the newest value only."""
+
+    def __init__(self, predicate, threshold):
+        self.test = {
+            "equals": lambda v: v == threshold,
+            "above": lambda v: v > threshold,
+            "below": lambda v: v < threshold,
+            "nan": lambda v: isinstance(v, float) and math.isnan(v),
+        }[predicate]
+        self.value = None
+
+    def push(self, value):
+        self.value = value
+
+    def fired(self):
+        return self.value is not None and self.test(self.value)
+
+    def context(self):
+        return {"value": self.value}
+
+class RunLengthEvaluator:
+    """flat / rising / falling over the last window epochs, as a count of consecutive matching steps."""
+
+    def __init__(self, predicate, window, tolerance):
+        self.step = {
+            "flat": lambda d: abs(d) < tolerance,
+            "rising": lambda d: d >= 0,
+            "falling": lambda d: d <= 0,
+        }[predicate]
+        self.window = window
+        self.n = 0
+        self.run = 0
+        self.value = None
+
+    def push(self, value):
+        if self.value is not None:
+            self.run = self.run + 1 if self.step(value - self.value) else 0
+        self.value = value
+        self.n += 1
+
+    def fired(self):
+        return self.n > self.window and self.run >= self.window - 1
+
+    def context(self):
+        return {"value": self.value, "count": self.run + 1}
+
+class NoNewBestEvaluator:
+    """no_new_best: the newest value is below the best of the window before it.
+
+    Keeps a monotonic deque of (index, value), so the window maximum is always at
+    the front: amortised O(1) per epoch.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.n = 0
+        self.best = collections.deque()
+
+    def push(self, value):
+        while self.best and self.best[-1][1] <= value:
+            self.best.pop()
+        self.best.append((self.n, value))
+        if self.best[0][0] <= self.n - self.window:
+            self.best.popleft()
+        self.n += 1
+
+    def fired(self):
+        return self.n > self.window and self.best[0][0] != self.n - 1
+
+    def context(self):
+        return {"value": self.best[-1][1], "since": self.n - 1 - self.best[0][0]}
+
+def compile_rule(spec):
+    """A rule dict with defaults filled in and a factory for its evaluator. Raises ValueError."""
+    rule = {"window": 1, "threshold": 0.0, "tolerance": 1e-4, "severity": "warning", "emoji": "",
+            "explanation": "", "unless": [], "enabled": True}
+    rule.update(spec)
+    for field in ("id", "metric", "predicate", "message"):
+        if not rule.get(field):
+            raise ValueError(f"rule {spec.get('id', '?')}: missing {field}")
+    if rule["metric"] not in RESULTS_KEYS:
+        raise ValueError(f"rule {rule['id']}: unknown metric {rule['metric']!r}")
+    if rule["severity"] not in RULE_SEVERITIES:
+        raise ValueError(f"rule {rule['id']}: unknown severity {rule['severity']!r}")
+    predicate, window = rule["predicate"], int(rule["window"])
+    if predicate in ("equals", "above", "below", "nan"):
+        rule["evaluator"] = functools.partial(LatestValueEvaluator, predicate, rule["threshold"])
+    elif predicate in ("flat", "rising", "falling"):
+        rule["evaluator"] = functools.partial(RunLengthEvaluator, predicate, window, rule["tolerance"])
+    elif predicate == "no_new_best":
+        rule["evaluator"] = functools.partial(NoNewBestEvaluator, window)
+    else:
+        raise ValueError(f"rule {rule['id']}: unknown predicate {predicate!r}")
+    rule["window"] = window
+    return rule
+
+def load_rules(path=None):
+    """DEFAULT_RULES merged with RULES_FILE (if present) by id, compiled. Bad rules are logged and skipped."""
+    specs = {spec["id"]: spec for spec in DEFAULT_RULES}
+    path = path or os.path.join(SCRIPT_DIR, RULES_FILE)
+    try:
+        with open(path) as f:
+            for spec in json.load(f):
+                specs[spec.get("id")] = dict(specs.get(spec.get("id"), {}), **spec)
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, TypeError, AttributeError) as e:
+        logging.error("Ignoring rules file %s: %s", path, e)
+    rules = []
+    for spec in specs.values():
+        try:
+            rule = compile_rule(spec)
+        except (ValueError, TypeError) as e:
+            logging.error("Skipping rule: %s", e)
+            continue
+        if rule["enabled"]:
+            rules.append(rule)
+    return rules
+
+class RuleEngine:
+    """Compiled rules for one run, fed incrementally from successive parse_results() dicts.
+
+    evaluate() only pushes the epochs it has not seen yet and returns the cached
+    result when there are none; a shorter or rewritten history starts over.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.reset()
+
+    def reset(self):
+        self.evaluators = [rule["evaluator"]() for rule in self.rules]
+        self.seen = 0
+        self.last_epoch = None
+        self.fired = []
+
+    def evaluate(self, stats):
+        """[(rule, message, explanation)] for the rules firing at the latest epoch."""
+        n = len(stats['epoch'])
+        if n < self.seen or (self.seen and stats['epoch'][self.seen - 1] != self.last_epoch):
+            self.reset()
+        if n == self.seen:
+            return self.fired
+        for rule, evaluator in zip(self.rules, self.evaluators):
+            values = stats[rule["metric"]]
+            for i in range(self.seen, n):
+                evaluator.push(values[i])
+        self.seen = n
+        self.last_epoch = stats['epoch'][-1]
+        firing = {rule["id"]: evaluator for rule, evaluator in zip(self.rules, self.evaluators) if evaluator.fired()}
+        self.fired = []
+        for rule in self.rules:
+            if rule["id"] not in firing or any(other in firing for other in rule["unless"]):
+                continue
+            ctx = dict(firing[rule["id"]].context(), metric=rule["metric"], window=rule["window"],
+                       threshold=rule["threshold"])
+            self.fired.append((rule, rule["message"].format_map(collections.defaultdict(str, ctx)),
+                               rule["explanation"].format_map(collections.defaultdict(str, ctx))))
+        return self.fired
+
+def get_training_feedback(stats, engine=None):
+    """(messages, explanations, curses color, emoji) from the rules firing at the latest epoch.
+
+    Pass the run's RuleEngine to evaluate incrementally; without one, the whole
+    history is evaluated against load_rules().
+    """
+    engine = engine or RuleEngine(load_rules())
+    fired = engine.evaluate(stats)
+    if not fired:
+        return (["✅ Training is progressing well! Keep going! 🚀"],
+                ["Your model is learning and improving.\n"
+                 "Why it matters: You're on track for a good model!\n"
+                 "What to do: Keep training and monitor for plateaus or overfitting."],
+                curses.color_pair(2), "🎉")
+    # The most severe rule sets color and emoji; among equals, the last one listed
+    worst = max(reversed(fired), key=lambda f: RULE_SEVERITIES[f[0]["severity"]])[0]
+    return ([message for _, message, _ in fired], [explanation for _, _, explanation in fired],
+            curses.color_pair(RULE_SEVERITY_COLORS[worst["severity"]]), worst["emoji"])
+
+# --- Learning-curve forecast ---
+# mAP and loss curves saturate. CurveForecaster fits y = a + b*f(t) for a grid of
+# saturating shapes: exponential f = exp(-c*t) and power law f = (t+1)**-c. For a
+# fixed c that is ordinary least squares in (a, b), so each candidate only needs
+# five running sums, updated in O(1) per epoch. Each fit keeps the candidate with
+# the smallest residual. The bounds come from the residual spread for that c;
+# they do not include the uncertainty in c itself.
+FORECAST_MIN_EPOCHS = 10       # no forecast from fewer fitted epochs
+FORECAST_SKIP_EPOCHS = 3       # warm-up epochs left out of the fit
+FORECAST_PLATEAU_SLOPE = 1e-4  # per-epoch change below which the fitted curve counts as flat
+FORECAST_Z = 1.96              # bounds are +-Z standard errors (~95%)
+FORECAST_MAX_EPOCH = 100000    # a plateau predicted later than this is reported as none
+FORECAST_SHAPES = ([("exp", 0.002 * 1.12 ** i) for i in range(62)]
+                   + [("power", 0.1 * 1.12 ** i) for i in range(30)])
+
+def curve_basis(kind, c, epoch):
+    return math.exp(-c * epoch) if kind == "exp" else (epoch + 1) ** -c
+
+def plateau_epoch(kind, c, b, slope=FORECAST_PLATEAU_SLOPE):
+    """First epoch at which |d/dt (a + b*f(t))| drops below slope."""
+    scale = abs(b) * c
+    if scale <= slope:
+        return 0
+    t = math.log(scale / slope) / c if kind == "exp" else (scale / slope) ** (1 / (c + 1)) - 1
+    return math.ceil(t)
+
+class CurveForecaster:
+    """Incremental saturating-curve fit of one parse_results() column."""
+
+    def __init__(self, metric, shapes=FORECAST_SHAPES, skip=FORECAST_SKIP_EPOCHS):
+        self.metric = metric
+        self.shapes = shapes
+        self.skip = skip
+        self.reset()
+
+    def reset(self):
+        # Per shape: [n, sum x, sum x^2, sum y, sum x*y, sum y^2]
+        self.sums = [[0, 0.0, 0.0, 0.0, 0.0, 0.0] for _ in self.shapes]
+        self.seen = 0
+        self.last_epoch = None
+
+    def update(self, stats):
+        """Feed the rows of stats not seen yet. Returns True if there were any."""
+        n = len(stats['epoch'])
+        if n < self.seen or (self.seen and stats['epoch'][self.seen - 1] != self.last_epoch):
+            self.reset()
+        if n == self.seen:
+            return False
+        values = stats[self.metric]
+        rows = [(stats['epoch'][i], values[i]) for i in range(self.seen, n)
+                if stats['epoch'][i] >= self.skip and math.isfinite(values[i])]
+        for (kind, c), acc in zip(self.shapes, self.sums):
+            count, sx, sxx, sy, sxy, syy = acc
+            for epoch, y in rows:
+                x = math.exp(-c * epoch) if kind == "exp" else (epoch + 1) ** -c
+                count += 1
+                sx += x
+                sxx += x * x
+                sy += y
+                sxy += x * y
+                syy += y * y
+            acc[:] = count, sx, sxx, sy, sxy, syy
+        self.seen = n
+        self.last_epoch = stats['epoch'][-1]
+        return True
+
+    def fit(self):
+        """Best (sse, kind, c, a, b, sums) over the shapes, or None with too few epochs."""
+        best = None
+        for (kind, c), acc in zip(self.shapes, self.sums):
+            n, sx, sxx, sy, sxy, syy = acc
+            if n < FORECAST_MIN_EPOCHS:
+                return None
+            var_x = sxx - sx * sx / n
+            if var_x <= 1e-12:
+                continue
+            cov = sxy - sx * sy / n
+            b = cov / var_x
+            a = (sy - b * sx) / n
+            sse = max(0.0, syy - sy * sy / n - b * cov)
+            if best is None or sse < best[0]:
+                best = (sse, kind, c, a, b, acc)
+        return best
+
+    def forecast(self, current_epoch, final_epoch=None):
+        """Predicted value at final_epoch (default: the plateau), with bounds and the plateau epoch.
+
+        Returns a dict, or None until there are FORECAST_MIN_EPOCHS usable epochs.
+        """
+        fit = self.fit()
+        if fit is None:
+            return None
+        sse, kind, c, a, b, (n, sx, sxx, _, _, _) = fit
+        plateau = plateau_epoch(kind, c, b)
+        if plateau > FORECAST_MAX_EPOCH:
+            plateau = None
+        target = final_epoch if final_epoch is not None else max(current_epoch, plateau or current_epoch)
+        x = curve_basis(kind, c, target)
+        sigma = math.sqrt(sse / (n - 2)) if n > 2 else 0.0
+        se = sigma * math.sqrt(1 / n + (x - sx / n) ** 2 / (sxx - sx * sx / n))
+        value = a + b * x
+        return {"metric": self.metric, "model": f"{kind}({c:.3g})", "value": value, "epoch": target,
+                "low": value - FORECAST_Z * se, "high": value + FORECAST_Z * se,
+                "asymptote": a, "plateau_epoch": plateau, "sigma": sigma}
+
+def gpu_count(opt):
+    """GPUs a run trains on, from its opt.yaml: 0 for CPU runs."""
+    device = str(opt.get('device', '') or '').strip().lower()
+    if device == 'cpu':
+        return 0
+    world_size = opt.get('world_size')
+    if isinstance(world_size, int) and world_size > 1:
+        return world_size
+    return max(1, len([d for d in device.split(',') if d.strip()]))
+
+def read_run_plan(run_dir):
+    """What opt.yaml says about a run: planned epochs, GPUs and when it started (opt.yaml's mtime)."""
+    path = os.path.join(run_dir, "opt.yaml")
+    try:
+        opt = read_flat_yaml(path)
+        started = os.path.getmtime(path)
+    except Exception as e:
+        logging.info("No usable opt.yaml in %s: %s", run_dir, e)
+        return {"epochs": None, "gpus": 1, "started": None}
+    epochs = opt.get('epochs')
+    return {"epochs": epochs if isinstance(epochs, int) and epochs > 0 else None,
+            "gpus": gpu_count(opt), "started": started}
+
+def forecast_bound(forecast, name, digits=3):
+    """'name → value±half-width of the confidence bound', e.g. 'loss → 0.0412±0.0015'."""
+    half = (forecast["high"] - forecast["low"]) / 2
+    return f"{name} → {forecast['value']:.{digits}f}±{half:.{digits}f}"
+
+def forecast_label(forecast, current_epoch, seconds_per_epoch=None, gpus=1):
+    """One chart-label line: predicted final mAP +- bound, plateau epoch and GPU-hours until it."""
+    label = forecast_bound(forecast, "mAP")
+    plateau = forecast["plateau_epoch"]
+    if plateau is None:
+        return label + " no plateau"
+    if plateau <= current_epoch:
+        return label + f" plateaued e{plateau}"
+    label += f" plateau e{plateau}"
+    if seconds_per_epoch:
+        hours = (plateau - current_epoch) * seconds_per_epoch / 3600
+        label += f" {hours * gpus:.1f} GPU-h" if gpus else f" {hours:.1f} h"
+    return label
+
+# --- Epoch throughput ---
+THROUGHPUT_WINDOW = 20  # epochs in the rolling seconds-per-epoch statistics
+STALL_FACTOR = 3.0      # alert when an epoch takes this many times the rolling median
+
+def format_duration(seconds):
+    """45s, 12m, 3h12m, 2d04h."""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m"
+    if seconds < 86400:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    return f"{seconds // 86400}d{seconds % 86400 // 3600:02d}h"
+
+class EpochThroughput:
+    """Seconds per epoch, ETA and stalls, from when new results.txt lines appear.
+
+    The history already on disk at startup has no per-epoch times: it only
+    seeds the statistics with its average (opt.yaml mtime to the last append),
+    until live epochs replace it. Stalls are only reported for a run seen to be
+    live, so an old or finished run is not one long stall.
+    """
+
+    def __init__(self, window=THROUGHPUT_WINDOW, stall_factor=STALL_FACTOR):
+        self.durations = collections.deque(maxlen=window)
+        self.stall_factor = stall_factor
+        self.seeded = False      # durations holds only the startup average
+        self.live = False        # an epoch was appended recently enough to call the run active
+        self.median = None
+        self.seen = 0
+        self.last_append = None  # time the newest epoch was appended
+        self.slow_epochs = 0     # completed epochs that took stall_factor x the median
+
+    def seed(self, average, now=None):
+        if average and not self.durations:
+            self.durations.append(average)
+            self.seeded = True
+            self.median = average
+            self.live = self.last_append is not None and (now or time.time()) - self.last_append < self.stall_factor * average
+
+    def observe(self, epochs_done, append_time):
+        """Account for the epochs that appeared with the append at append_time."""
+        new = epochs_done - self.seen
+        if new <= 0:
+            self.seen = epochs_done  # results.txt rewritten
+            self.last_append = append_time
+            return
+        if self.seen and self.last_append is not None and append_time > self.last_append:
+            per_epoch = (append_time - self.last_append) / new
+            if self.median and per_epoch > self.stall_factor * self.median:
+                self.slow_epochs += 1
+                logging.warning("Epoch %d took %s, %.1fx the median %s", epochs_done - 1,
+                                format_duration(per_epoch), per_epoch / self.median, format_duration(self.median))
+            if self.seeded:
+                self.durations.clear()
+                self.seeded = False
+            self.durations.extend([per_epoch] * min(new, self.durations.maxlen))
+            self.live = True
+            ordered = sorted(self.durations)
+            mid = len(ordered) // 2
+            self.median = ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+        self.seen = epochs_done
+        self.last_append = append_time
+
+    def eta(self, planned_epochs):
+        """Seconds until planned_epochs are done, or None when unknown."""
+        if not self.median or not planned_epochs or self.last_append is None:
+            return None
+        remaining = planned_epochs - self.seen
+        return max(0.0, remaining * self.median - (time.time() - self.last_append)) if remaining > 0 else 0.0
+
+    def stall(self, planned_epochs=None, now=None):
+        """(seconds, x median) the epoch in progress has been running, if that is past stall_factor."""
+        if not self.live or not self.median or (planned_epochs and self.seen >= planned_epochs):
+            return None
+        elapsed = (now or time.time()) - self.last_append
+        ratio = elapsed / self.median
+        return (elapsed, ratio) if ratio >= self.stall_factor else None
+
+    def summary(self, planned_epochs):
+        """'ETA 3h12m @62s/ep' (or just the rate while the plan is unknown)."""
+        if not self.median:
+            return ""
+        if self.median < 10:
+            rate = f"@{self.median:.1f}s/ep"
+        else:
+            rate = f"@{self.median:.0f}s/ep" if self.median < 600 else f"@{format_duration(self.median)}/ep"
+        eta = self.eta(planned_epochs)
+        if eta is None:
+            return rate
+        return f"ETA {format_duration(eta)} {rate}" if eta else "done"
+
+    SHARED = ("live", "median", "seen", "last_append", "slow_epochs")
+
+    def shared_state(self):
+        """What a metrics-bus viewer needs to draw the stall warning."""
+        return {key: getattr(self, key) for key in self.SHARED}
+
+    def restore(self, state):
+        for key in self.SHARED:
+            setattr(self, key, state.get(key))
+
+# --- Intra-epoch progress (YOLOv7 console log) ---
+# train.py's tqdm bar only reaches the terminal, e.g. when captured with
+#   python train.py ... 2>&1 | tee runs/train/exp/train.log
+# Each update is "\r" plus the whole line, so the log is one very long line per
+# epoch. It is followed by offset: only bytes appended since the last read are
+# decoded, and a new log is entered near its end.
+TRAIN_LOG = None               # path to the captured console log; None: look for TRAIN_LOG_NAMES
+TRAIN_LOG_NAMES = ["train.log", "nohup.out", "stdout.log"]  # in the run dir, then the YOLOv7 dir
+TRAIN_LOG_POLL_INTERVAL = 0.5  # seconds between size checks
+TRAIN_LOG_TAIL_BYTES = 64 * 1024  # how far back from the end a newly found log is read
+TRAIN_LOG_RATE_WINDOW = 40     # it/s samples in the sparkline
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+_TQDM_TAIL = r"\s*(\d+)%\|[^|]*\|\s*(\d+)/(\d+)\s+\[[^\],]*(?:,\s*(\?|[\d.]+)(it/s|s/it))?[^\]]*\]"
+# '  37/299   10.2G   0.04112  0.02209  0.01321  0.07642   91   640:  12%|█▏   | 56/463 [00:32<03:50,  1.77it/s]'
+TRAIN_PROGRESS_RE = re.compile(r"(\d+)/(\d+)\s+([\d.]+)G\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+\d+\s+\d+:" + _TQDM_TAIL)
+# '   Class   Images   Labels   P   R   mAP@.5   mAP@.5:.95:  45%|████▌   | 20/44 [00:05<00:06,  3.62it/s]'
+VAL_PROGRESS_RE = re.compile(r"Class\s+Images\s+Labels\s+P\s+R\s+mAP@\.5\s+mAP@\.5:\.95:" + _TQDM_TAIL)
+
+def find_train_log(run_dir):
+    """TRAIN_LOG, else the most recently written TRAIN_LOG_NAMES file in the run or YOLOv7 directory."""
+    if TRAIN_LOG:
+        return TRAIN_LOG
+    yolo_dir = os.path.dirname(os.path.dirname(os.path.expanduser(RUNS_BASE_PATH)))
+    found = []
+    for directory in [run_dir, yolo_dir]:
+        for name in TRAIN_LOG_NAMES:
+            path = os.path.join(directory, name)
+            with contextlib.suppress(OSError):
+                found.append((os.path.getmtime(path), path))
+    return max(found)[1] if found else None
+
+def _float(text):
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+def parse_progress(segment):
+    """Progress dict for one tqdm update of the training or validation bar, or None."""
+    match = TRAIN_PROGRESS_RE.search(segment)
+    if match:
+        epoch, epochs, mem, box, obj, cls, total, _, n, of, rate, unit = match.groups()
+        progress = {"phase": "train", "epoch": int(epoch), "epochs": int(epochs) + 1, "gpu_mem": float(mem),
+                    "box": _float(box), "obj": _float(obj), "cls": _float(cls), "loss": _float(total)}
+    else:
+        match = VAL_PROGRESS_RE.search(segment)
+        if not match:
+            return None
+        _, n, of, rate, unit = match.groups()
+        progress = {"phase": "val"}
+    rate = _float(rate or "?")
+    if rate and unit == "s/it":
+        rate = 1 / rate
+    progress.update(iteration=int(n), total=int(of), rate=rate)
+    return progress
+
+class TrainLogTail:
+    """The newest tqdm update in a growing console log, plus recent iteration rates."""
+
+    def __init__(self, path, rate_window=TRAIN_LOG_RATE_WINDOW):
+        self.path = path
+        self.offset = None
+        self.partial = b""   # text after the last \r or \n: usually the bar as it stands now
+        self.progress = None
+        self.epoch = None    # the training epoch the validation bar belongs to
+        self.rates = collections.deque(maxlen=rate_window)
+        self.bytes_read = 0
+
+    def read(self):
+        """Decode what was appended since the last call. Returns True if the progress changed."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return False
+        if self.offset is None or size < self.offset:  # first read, or the log was truncated
+            self.offset = max(0, size - TRAIN_LOG_TAIL_BYTES)
+            self.partial = b""
+        if size == self.offset:
+            return False
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+        self.offset += len(chunk)
+        self.bytes_read += len(chunk)
+        segments = re.split(rb"[\r\n]", self.partial + chunk)
+        self.partial = segments[-1][-TRAIN_LOG_TAIL_BYTES:]
+        # tqdm writes "\r" before each update, so the unterminated tail is normally the newest one.
+        # Behind a validation bar, keep looking for the training bar of its epoch.
+        progress = None
+        for segment in reversed(segments):
+            found = parse_progress(segment.decode("utf-8", "replace")) if segment else None
+            if found:
+                progress = progress or found
+                if found["phase"] == "train":
+                    self.epoch = found["epoch"]
+                    break
+        if progress is None:
+            return False
+        if progress["phase"] == "val":
+            progress["epoch"] = self.epoch
+        previous, self.progress = self.progress, progress
+        if progress["rate"] and (previous is None or (previous["phase"], previous["iteration"])
+                                 != (progress["phase"], progress["iteration"])):
+            self.rates.append(progress["rate"])
+        return progress != previous
+
+def sparkline(values, width):
+    """The last width values as block characters scaled between their min and max."""
+    values = list(values)[-width:]
+    if not values:
+        return ""
+    low, high = min(values), max(values)
+    scale = (len(SPARK_CHARS) - 1) / (high - low) if high > low else 0
+    return "".join(SPARK_CHARS[int((v - low) * scale)] for v in values)
+
+def progress_label(progress, rates, width):
+    """' e37 ██████░░░░░ 56/463 1.8it/s ▃▄▅▆▇ ' for the left box's bottom border."""
+    if not progress:
+        return ""
+    phase = f"e{progress['epoch']}" if progress["phase"] == "train" else "val"
+    count = f"{progress['iteration']}/{progress['total']}"
+    rate = progress["rate"]
+    rate = "" if not rate else f"{rate:.1f}it/s" if rate >= 1 else f"{1 / rate:.1f}s/it"
+    spark_w = min(10, len(rates))
+    bar_w = max(4, width - len(phase) - len(count) - len(rate) - spark_w - 6)
+    done = int(bar_w * progress["iteration"] / progress["total"]) if progress["total"] else 0
+    label = f" {phase} {'█' * done}{'░' * (bar_w - done)} {count} {rate} {sparkline(rates, spark_w)}".rstrip()
+    return (label + " ")[:width]
+
+# --- Metric history (segment tree of range aggregates) ---
+HISTORY_METRICS = ["map", "precision", "recall", "loss", "box_loss", "cls_loss"]
+
+class MetricSegmentTree:
+    """Append-only segment tree holding min/max/sum/count per node.
+
+    Leaves live in the second half of flat arrays (iterative layout), so a
+    range query touches O(log n) nodes and an append only walks one leaf-to-root
+    path. Capacity doubles when full (amortised O(1) rebuild per append).
+    Non-finite values (YOLOv7 logs nan losses) are kept as leaves but left out
+    of min/max/mean.
+    """
+
+    def __init__(self, values=None):
+        self.values = []
+        self.cap = 1
+        self.mins = [math.inf] * 2
+        self.maxs = [-math.inf] * 2
+        self.sums = [0.0] * 2
+        self.counts = [0] * 2
+        for v in values or []:
+            self.append(v)
+
+    def __len__(self):
+        return len(self.values)
+
+    def _set_leaf(self, node, value):
+        if math.isfinite(value):
+            self.mins[node] = self.maxs[node] = self.sums[node] = value
+            self.counts[node] = 1
+
+    def _grow(self):
+        self.cap *= 2
+        self.mins = [math.inf] * (2 * self.cap)
+        self.maxs = [-math.inf] * (2 * self.cap)
+        self.sums = [0.0] * (2 * self.cap)
+        self.counts = [0] * (2 * self.cap)
+        for i, v in enumerate(self.values):
+            self._set_leaf(self.cap + i, v)
+        for node in range(self.cap - 1, 0, -1):
+            self._pull(node)
+
+    def _pull(self, node):
+        left, right = 2 * node, 2 * node + 1
+        self.mins[node] = min(self.mins[left], self.mins[right])
+        self.maxs[node] = max(self.maxs[left], self.maxs[right])
+        self.sums[node] = self.sums[left] + self.sums[right]
+        self.counts[node] = self.counts[left] + self.counts[right]
+
+    def append(self, value):
+        if len(self.values) == self.cap:
+            self._grow()
+        node = self.cap + len(self.values)
+        self.values.append(value)
+        self._set_leaf(node, value)
+        node //= 2
+        while node:
+            self._pull(node)
+            node //= 2
+
+    def query(self, lo, hi):
+        """Return (min, max, mean) of the finite values in the half-open index range [lo, hi).
+
+        None when the range is empty or holds no finite value.
+        """
+        lo = max(lo, 0)
+        hi = min(hi, len(self.values))
+        if lo >= hi:
+            return None
+        lo += self.cap
+        hi += self.cap
+        lo_min, hi_max, total, count = math.inf, -math.inf, 0.0, 0
+        while lo < hi:
+            if lo & 1:
+                lo_min = min(lo_min, self.mins[lo])
+                hi_max = max(hi_max, self.maxs[lo])
+                total += self.sums[lo]
+                count += self.counts[lo]
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                lo_min = min(lo_min, self.mins[hi])
+                hi_max = max(hi_max, self.maxs[hi])
+                total += self.sums[hi]
+                count += self.counts[hi]
+            lo //= 2
+            hi //= 2
+        if not count:
+            return None
+        return lo_min, hi_max, total / count
+
+def _same_value(a, b):
+    return a == b or (a != a and b != b)  # nan == nan here
+
+def update_history_trees(trees, stats):
+    """Append epochs that are new since the last call; rebuild if the file shrank or was rewritten.
+
+    A rewrite (restart, --resume from an earlier checkpoint) is noticed by the
+    last epoch seen no longer holding the same epoch number and values.
+    """
+    epochs = stats.get('epoch', [])
+    known = trees.setdefault('epoch', [])
+    seen = len(known)
+    if seen and (len(epochs) < seen or epochs[seen - 1] != known[-1] or any(
+            len(trees.get(metric, ())) >= seen and len(stats.get(metric, [])) >= seen
+            and not _same_value(stats[metric][seen - 1], trees[metric].values[seen - 1])
+            for metric in HISTORY_METRICS)):
+        trees.clear()
+        trees['epoch'] = known = []
+    for metric in HISTORY_METRICS:
+        values = stats.get(metric, [])
+        tree = trees.get(metric)
+        if tree is None or len(values) < len(tree):
+            trees[metric] = tree = MetricSegmentTree()
+        for v in values[len(tree):]:
+            tree.append(v)
+    known.extend(epochs[len(known):])
+    return trees
+
+# --- Sprite engine ---
+FISH_CELLS_PER_FISH = 600  # tank density: one fish per this many screen cells
+
+# Compiled sprite sheet: built once from FISH_ART_DATA, STATIC_ART and any art packs
+SPRITE_SHEET_VERSION = 1
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ART_PACK_DIR = os.path.join(SCRIPT_DIR, "art_packs")  # extra *.txt files in the FISH_ART_DATA format
+SPRITE_CACHE_FILE = os.path.join(SCRIPT_DIR, ".fishwell_sprites.cache")
+SPRITE_DISK_CACHE = True  # set to False to always compile in memory
+
+def compile_frame(lines, transparent=True):
+    """Turn art lines into ((dy, dx, text), ...) rows and the frame width.
+
+    Transparent frames drop leading/trailing blanks so whatever is behind shows
+    through; opaque frames keep every line as drawn.
+    """
+    rows = []
+    for dy, line in enumerate(lines):
+        if transparent:
+            text = line.rstrip()
+            stripped = text.lstrip()
+            if stripped:
+                rows.append((dy, len(text) - len(stripped), stripped))
+        elif line:
+            rows.append((dy, 0, line))
+    width = max((len(line) for line in lines), default=0)
+    return tuple(rows), width
+
+def compile_sprite_sheet(fish_defs, static_art):
+    """Build the plain-data sheet (tuples, dicts, str, int only, so it marshals)."""
+    fish = []
+    for fish_def in fish_defs:
+        stages = fish_def['stages'] or [[""]]
+        frames, widths = zip(*(compile_frame(stage) for stage in stages))
+        fish.append({
+            "dir": 1 if fish_def['dir'] == 'R' else -1,
+            "bubble": fish_def['bubble'],
+            # Ensure animation order indices are valid
+            "anim_order": tuple(idx % len(stages) for idx in fish_def['anim_order']) or (0,),
+            "height": max(len(stage) for stage in stages),
+            "width": max(widths) or 1,
+            "widths": tuple(widths),
+            "frames": tuple(frames),
+        })
+    static = {}
+    for name, lines in static_art.items():
+        rows, width = compile_frame(lines, transparent=False)
+        static[name] = {"rows": rows, "width": width, "height": len(lines)}
+    return {"version": SPRITE_SHEET_VERSION, "fish": tuple(fish), "static": static}
+
+def _art_pack_files():
+    if not os.path.isdir(ART_PACK_DIR):
+        return []
+    return sorted(glob.glob(os.path.join(ART_PACK_DIR, "*.txt")))
+
+def _sprite_sources_key(pack_files):
+    """Fingerprint of everything the sheet is built from; a stale cache never loads."""
+    digest = hashlib.sha1()
+    digest.update(f"{SPRITE_SHEET_VERSION}:{marshal.version}:{sys.version_info[:2]}".encode())
+    digest.update(FISH_ART_DATA.encode())
+    digest.update(repr(sorted(STATIC_ART.items())).encode())
+    for path in pack_files:
+        st = os.stat(path)
+        digest.update(f"{path}:{st.st_mtime_ns}:{st.st_size}".encode())
+    return digest.hexdigest()
+
+class SpriteSheet:
+    """Runtime view of a compiled sheet, with per-terminal-width layouts of the static art."""
+
+    def __init__(self, data):
+        self.fish = [FishSprite(entry) for entry in data['fish']]
+        self.static = data['static']
+        self._layouts = {}  # (name, max_x, x) -> clipped (dy, x, text) rows
+
+    def layout(self, name, max_x, x=None):
+        """Static art clipped to max_x: each line centred when x is None, else anchored at x."""
+        key = (name, max_x, x)
+        rows = self._layouts.get(key)
+        if rows is None:
+            rows = []
+            for dy, dx, text in self.static[name]['rows']:
+                line_x = (max_x - len(text)) // 2 if x is None else x + dx
+                if 0 <= line_x < max_x:
+                    rows.append((dy, line_x, text[:max_x - line_x]))
+            rows = self._layouts[key] = tuple(rows)
+        return rows
+
+    def rows(self, name):
+        return self.static[name]['rows']
+
+    def width(self, name):
+        return self.static[name]['width']
+
+@functools.lru_cache(maxsize=None)
+def load_sprite_sheet():
+    """Load the compiled sprite sheet from the disk cache, compiling it only when sources changed."""
+    pack_files = _art_pack_files()
+    key = _sprite_sources_key(pack_files)
+    if SPRITE_DISK_CACHE:
+        try:
+            with open(SPRITE_CACHE_FILE, 'rb') as f:
+                cached = marshal.loads(f.read())  # marshal.load(f) does many tiny reads
+            if cached.get('key') == key:
+                return SpriteSheet(cached)
+        except (OSError, EOFError, ValueError, TypeError, AttributeError):
+            pass
+    fish_defs = parse_fish_art_from_string(FISH_ART_DATA)
+    for path in pack_files:
+        try:
+            with open(path, encoding='utf-8') as f:
+                fish_defs.extend(parse_fish_art_from_string(f.read()))
+        except (OSError, ValueError, IndexError) as e:
+            logging.warning("Skipping art pack %s: %s", path, e)
+    data = compile_sprite_sheet(fish_defs, STATIC_ART)
+    data['key'] = key
+    if SPRITE_DISK_CACHE:
+        try:
+            tmp_path = f"{SPRITE_CACHE_FILE}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(marshal.dumps(data))
+            os.replace(tmp_path, SPRITE_CACHE_FILE)
+        except OSError as e:
+            logging.debug("Sprite cache not written: %s", e)
+    return SpriteSheet(data)
+
+class FishSprite:
+    """One fish from the compiled sheet: frame table, per-frame widths and animation order.
+
+    Frames are (dy, dx, text) rows with transparent blanks stripped, so drawing
+    never re-scans the art.
+    """
+    __slots__ = ("height", "width", "widths", "dir", "bubble", "anim_order", "rows")
+
+    def __init__(self, entry):
+        self.height = entry['height']
+        self.width = entry['width']
+        self.widths = entry['widths']
+        self.dir = entry['dir']
+        self.bubble = entry['bubble']
+        self.anim_order = entry['anim_order']
+        self.rows = entry['frames']
 
 class Fish:
-    def __init__(self, y, x, fish_def):
+    __slots__ = ("y", "x", "sprite", "dir", "length", "bubble", "anim_order",
+                 "frame_idx", "anim_idx", "bubble_timer", "bubble_x", "bubble_y", "bubble_active")
+
+    def __init__(self, y, x, sprite):
+        self.reset(y, x, sprite)
+
+    def reset(self, y, x, sprite):
+        """(Re)initialise in place, so pooled fish can be reused without allocating."""
         self.y = y
         self.x = x
-        self.fish_def = fish_def
-        self.dir = 1 if fish_def['dir'] == 'R' else -1
-        self.length = fish_def['length']
-        self.bubble = fish_def['bubble']
-        self.anim_order = fish_def['anim_order']
-        self.stages = fish_def['stages']
+        self.sprite = sprite
+        self.dir = sprite.dir
+        self.length = sprite.width
+        self.bubble = sprite.bubble
+        self.anim_order = sprite.anim_order
         self.frame_idx = 0
         self.anim_idx = 0
         self.bubble_timer = random.randint(5, 20)
         self.bubble_x = x
         self.bubble_y = y-1
         self.bubble_active = False
-        # Ensure animation order indices are valid
-        self.anim_order = [idx % len(self.stages) for idx in self.anim_order]
+        return self
 
     def move(self, max_x, max_y):
         self.x += self.dir
@@ -759,14 +1717,112 @@ class Fish:
                 self.bubble_y = self.y-1
                 self.bubble_timer = random.randint(10, 30)
 
-    def get_frame(self):
-        # Ensure frame_idx is within bounds
-        if not self.stages or self.frame_idx >= len(self.stages):
-            self.frame_idx = 0
-        return self.stages[self.frame_idx]
+    def get_rows(self):
+        """Pre-stripped (dy, dx, text) rows of the current animation frame."""
+        return self.sprite.rows[self.frame_idx]
+
+class SpritePool:
+    """Free list of Fish objects: respawns reuse old instances instead of allocating."""
+
+    def __init__(self):
+        self.free = []
+
+    def acquire(self, y, x, sprite):
+        if self.free:
+            return self.free.pop().reset(y, x, sprite)
+        return Fish(y, x, sprite)
+
+    def release(self, fish):
+        self.free.append(fish)
+
+class BoxOccupancy:
+    """Per-row interval index of the screen cells covered by info boxes.
+
+    Built once per terminal size. Drawing asks it for the visible pieces of a
+    row instead of testing every cell against every box.
+    """
+
+    def __init__(self, max_y, max_x, boxes):
+        self.max_y = max_y
+        self.max_x = max_x
+        spans = [[] for _ in range(max_y)]
+        for (by, bx, bh, bw) in boxes:
+            for y in range(max(by, 0), min(by + bh, max_y)):
+                spans[y].append((max(bx, 0), min(bx + bw, max_x)))
+        self.rows = []
+        for row in spans:
+            merged = []
+            for start, end in sorted(row):
+                if merged and start <= merged[-1][1]:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+                else:
+                    merged.append((start, end))
+            self.rows.append(merged)
+        self.spawn_rows = {}  # (sprite id, x) -> free y positions, filled lazily
+
+    def is_free(self, y, x):
+        if not (0 <= y < self.max_y and 0 <= x < self.max_x):
+            return False
+        for start, end in self.rows[y]:
+            if start <= x < end:
+                return False
+        return True
+
+    def rect_free(self, y, x, h, w):
+        if y < 0 or y + h > self.max_y:
+            return False
+        for row in self.rows[y:y + h]:
+            for start, end in row:
+                if start < x + w and x < end:
+                    return False
+        return True
+
+    def visible_segments(self, y, x, text):
+        """Yield (x, piece) parts of text drawn at (y, x) that are on screen and outside every box."""
+        if not 0 <= y < self.max_y:
+            return
+        start = max(x, 0)
+        end = min(x + len(text), self.max_x - 1)
+        if start >= end:
+            return
+        spans = self.rows[y]
+        if not spans:
+            yield start, (text if start == x and end == x + len(text) else text[start - x:end - x])
+            return
+        cur = start
+        for span_start, span_end in spans:
+            if span_end <= cur:
+                continue
+            if span_start >= end:
+                break
+            if span_start > cur:
+                yield cur, text[cur - x:span_start - x]
+            cur = span_end
+            if cur >= end:
+                return
+        if cur < end:
+            yield cur, text[cur - x:end - x]
+
+    def free_spawn_rows(self, sprite, x, y_min, y_max):
+        """Cached list of y positions where the sprite fits at column x without touching a box."""
+        key = (id(sprite), x)
+        rows = self.spawn_rows.get(key)
+        if rows is None:
+            rows = [y for y in range(y_min, y_max + 1) if self.rect_free(y, max(x, 0), sprite.height, sprite.width)]
+            self.spawn_rows[key] = rows
+        return rows
 
-def draw_line_chart(stdscr, box_y, box_x, box_height, box_width, values, color_pair=2, label="mAP"):
-    """Draw a Unicode/ASCII line chart for the given values inside the info box."""
+def draw_sprite(stdscr, fish, occupancy, attr):
+    """Draw the fish's current frame, clipped against the screen and the info boxes."""
+    for dy, dx, text in fish.get_rows():
+        for x, piece in occupancy.visible_segments(fish.y + dy, fish.x + dx, text):
+            stdscr.addstr(fish.y + dy, x, piece, attr)
+    if fish.bubble and fish.bubble_active and fish.bubble_y > 0 and fish.bubble_x > 0 \
+            and occupancy.is_free(fish.bubble_y, fish.bubble_x):
+        stdscr.addstr(fish.bubble_y, fish.bubble_x, "o", curses.color_pair(4))
+
+def draw_line_chart(stdscr, box_y, box_x, box_height, box_width, values, color_pair=2, label="mAP", note=""):
+    """Draw a Unicode/ASCII line chart for the given values inside the info box; note follows its title."""
     if not values:
         return
     chart_height = box_height - 3
@@ -795,7 +1851,42 @@ def draw_line_chart(stdscr, box_y, box_x, box_height, box_width, values, color_p
         if 0 <= y_pos < box_y+box_height-1:
             stdscr.addstr(y_pos, box_x+3+x, '•', curses.color_pair(color_pair))
     # Draw label
-    stdscr.addstr(box_y, box_x+2, f"{label} trend", curses.color_pair(color_pair) | curses.A_BOLD)
+    title = f"{label} trend  {note}" if note else f"{label} trend"
+    stdscr.addstr(box_y, box_x+2, title[:box_width-4], curses.color_pair(color_pair) | curses.A_BOLD)
+
+def draw_multi_line_chart(stdscr, box_y, box_x, box_height, box_width, n_epochs, series, label="mAP"):
+    """Overlay several epoch-aligned series on one chart with a shared scale.
+
+    series is a list of (values, marker, color_pair); NaN values are skipped and
+    later series are drawn on top of earlier ones.
+    """
+    if n_epochs == 0:
+        return
+    chart_height = box_height - 3
+    chart_width = box_width - 6
+    finite = [v for values, _, _ in series for v in values if not math.isnan(v)]
+    if not finite:
+        return
+    min_val = min(finite)
+    max_val = max(finite)
+    if max_val == min_val:
+        max_val += 1e-6
+    # Same column -> epoch mapping for every run keeps them aligned
+    if n_epochs > chart_width:
+        idxs = [int(i * (n_epochs - 1) / (chart_width - 1)) for i in range(chart_width)]
+    else:
+        idxs = list(range(n_epochs))
+    for h in range(chart_height):
+        stdscr.addstr(box_y+1+h, box_x+2, '|', curses.color_pair(2))
+    stdscr.addstr(box_y+chart_height+1, box_x+2, '+' + '-' * chart_width, curses.color_pair(2))
+    for values, marker, color_pair in series:
+        for x, epoch in enumerate(idxs):
+            v = values[epoch] if epoch < len(values) else math.nan
+            if math.isnan(v):
+                continue
+            y = int((v - min_val) / (max_val - min_val) * (chart_height-1))
+            stdscr.addstr(box_y+chart_height - y, box_x+3+x, marker, curses.color_pair(color_pair))
+    stdscr.addstr(box_y, box_x+2, label, curses.color_pair(2) | curses.A_BOLD)
 
 def wrap_lines(lines, width):
     """Wrap each string in lines to the given width."""
@@ -804,85 +1895,2461 @@ def wrap_lines(lines, width):
         wrapped.extend(textwrap.wrap(line, width=width))
     return wrapped
 
-def aquarium(stdscr):
-    curses.curs_set(0)
-    stdscr.nodelay(True)
-    curses.start_color()
-    curses.use_default_colors()
-    curses.init_pair(1, curses.COLOR_YELLOW, -1)  # Fish
-    curses.init_pair(2, curses.COLOR_CYAN, -1)    # Info, seaweed
-    curses.init_pair(3, curses.COLOR_MAGENTA, -1) # Crab
-    curses.init_pair(4, curses.COLOR_WHITE, -1)   # Bubbles
-    curses.init_pair(5, curses.COLOR_GREEN, -1)   # Info box border
-    curses.init_pair(6, curses.COLOR_RED, -1)     # Warnings/errors
-    min_height = INFO_BOX_HEIGHT + 8
-    min_width = INFO_BOX_WIDTH * 3 + 8
-    pause = 0.12
-    map_history = []
-    loss_history = []
-    box_loss_history = []
-    cls_loss_history = []
-    overfit_notified = False
-    info_message = "Training in progress..."
-    last_backup_epoch = None
-    best_map = 0.0
-    fish_list = []
-    animated_fish_defs = parse_fish_art_from_string(FISH_ART_DATA)
-    ai_feedback = None
-    ai_last_epoch = -1000
-    AI_FEEDBACK_INTERVAL = 5  # epochs
-    backup_message = None
-    advice_message = None
-    backup_message_time = 0
-    advice_message_time = 0
-    message_display_duration = 4  # seconds
-    last_key_time = time.time()
-    # In aquarium(), add a flag to track if we've already auto-backed up for this overfitting event
-    overfit_auto_backup_epoch = None
-    # Duck animation state
-    duck_art = [
-        "   __",
-        "<(o )___",
-        " ( ._> /",
-        "  `---' "
+def draw_history_view(stdscr, trees, metric, start, span):
+    """Render one zoom level: each column is a range query on the segment tree."""
+    max_y, max_x = stdscr.getmaxyx()
+    tree = trees.get(metric)
+    epochs = trees.get('epoch', [])
+    chart_top = 2
+    chart_left = 10
+    chart_height = max_y - 6
+    chart_width = max_x - chart_left - 2
+    title = f"History: {metric}   [←/→] pan  [+/-] zoom  [m] metric  [Home/End]  [q] back"
+    stdscr.addstr(0, 0, title[:max_x-1], curses.color_pair(2) | curses.A_BOLD)
+    if not tree or not len(tree) or chart_height < 3 or chart_width < 4:
+        stdscr.addstr(2, 2, "No history yet."[:max_x-3])
+        return
+    end = min(start + span, len(tree))
+    overall = tree.query(start, end)
+    if overall is None:
+        stdscr.addstr(2, 2, "Only nan/inf values in this range."[:max_x-3])
+        return
+    lo_val, hi_val = overall[0], overall[1]
+    if hi_val == lo_val:
+        hi_val += 1e-6
+    def to_row(v):
+        return chart_top + chart_height - 1 - int((v - lo_val) / (hi_val - lo_val) * (chart_height - 1))
+    # Axes and labels
+    for h in range(chart_height):
+        stdscr.addstr(chart_top + h, chart_left - 1, '|', curses.color_pair(2))
+    stdscr.addstr(chart_top, 0, f"{overall[1]:.4f}"[:chart_left-1], curses.color_pair(2))
+    stdscr.addstr(chart_top + chart_height - 1, 0, f"{overall[0]:.4f}"[:chart_left-1], curses.color_pair(2))
+    stdscr.addstr(chart_top + chart_height, chart_left - 1, '+' + '-' * chart_width, curses.color_pair(2))
+    columns = min(chart_width, end - start)
+    for col in range(columns):
+        lo = start + col * (end - start) // columns
+        hi = start + (col + 1) * (end - start) // columns
+        agg = tree.query(lo, max(hi, lo + 1))
+        if agg is None:
+            continue
+        col_min, col_max, col_mean = agg
+        top, bottom = to_row(col_max), to_row(col_min)
+        for y in range(top, bottom + 1):
+            stdscr.addstr(y, chart_left + col, '│', curses.color_pair(4))
+        stdscr.addstr(to_row(col_mean), chart_left + col, '•', curses.color_pair(1) | curses.A_BOLD)
+    first_epoch = epochs[start] if start < len(epochs) else start
+    last_epoch = epochs[end - 1] if end - 1 < len(epochs) else end - 1
+    footer = (f"Epochs {first_epoch}-{last_epoch} of {len(tree)}  "
+              f"min {overall[0]:.4f}  max {overall[1]:.4f}  mean {overall[2]:.4f}")
+    stdscr.addstr(chart_top + chart_height + 1, chart_left, footer[:max_x-chart_left-1], curses.color_pair(2))
+
+class HistoryBrowser:
+    """Zoom/pan state for the [H] history view; drawn and fed keys by the render task."""
+
+    def __init__(self, trees):
+        self.trees = trees
+        self.metric_idx = 0
+        self.span = len(trees.get('epoch', [])) or 1
+        self.start = 0
+        self.follow = True  # keep the view pinned to the latest epoch while it grows
+
+    def _clamp(self):
+        total = len(self.trees.get('epoch', []))
+        self.span = max(1, min(self.span, total or 1))
+        if self.follow:
+            self.start = max(0, total - self.span)
+        self.start = max(0, min(self.start, max(0, total - self.span)))
+        return total
+
+    def draw(self, stdscr):
+        self._clamp()
+        try:
+            draw_history_view(stdscr, self.trees, HISTORY_METRICS[self.metric_idx], self.start, self.span)
+        except curses.error:
+            pass
+
+    def handle_key(self, key):
+        """Apply a key press; return False when the browser should close."""
+        total = self._clamp()
+        step = max(1, self.span // 8)
+        if key in [ord('q'), ord('Q'), 27, ord('h'), ord('H')]:
+            return False
+        elif key in [curses.KEY_LEFT, ord('a')]:
+            self.start -= step
+            self.follow = False
+        elif key in [curses.KEY_RIGHT, ord('d')]:
+            self.start += step
+            self.follow = self.start + self.span >= total
+        elif key in [ord('+'), ord('=')]:
+            center = self.start + self.span // 2
+            self.span = max(2, self.span // 2)
+            self.start = center - self.span // 2
+            self.follow = self.follow and self.start + self.span >= total
+        elif key in [ord('-'), ord('_')]:
+            center = self.start + self.span // 2
+            self.span = self.span * 2
+            self.start = center - self.span // 2
+        elif key in [ord('m'), ord('M'), 9]:
+            self.metric_idx = (self.metric_idx + 1) % len(HISTORY_METRICS)
+        elif key == curses.KEY_HOME:
+            self.start = 0
+            self.follow = False
+        elif key == curses.KEY_END:
+            self.follow = True
+        return True
+
+# --- Multi-run comparison ---
+COMPARE_OVERLAY_RUNS = 3           # previous runs overlaid on the live one
+COMPARE_MARKERS = ['o', 'x', '+']  # one marker per overlaid run, the live run uses '•'
+COMPARE_METRICS = ["map", "loss"]
+_results_cache = {}  # results.txt path -> (signature, stats)
+_results_cache_lock = threading.Lock()
+
+def parse_results_cached(results_file):
+    """parse_results() memoised on (mtime, size): unchanged files are never re-read."""
+    signature = results_signature(results_file)
+    with _results_cache_lock:
+        hit = _results_cache.get(results_file)
+    if hit is not None and signature is not None and hit[0] == signature:
+        return hit[1]
+    stats = parse_results(results_file)
+    with _results_cache_lock:
+        _results_cache[results_file] = (signature, stats)
+    return stats
+
+def load_runs(run_names, max_workers=8):
+    """Parse many runs in parallel through the cache. Returns {run name: stats}."""
+    if not run_names:
+        return {}
+    base_path = os.path.expanduser(RUNS_BASE_PATH)
+    paths = [os.path.join(base_path, run, "results.txt") for run in run_names]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as pool:
+        return dict(zip(run_names, pool.map(parse_results_cached, paths)))
+
+def align_runs(run_stats, metric):
+    """Put every run's metric on a shared epoch axis.
+
+    Returns (n_epochs, {run: array('d')}) where index i holds the value at epoch i
+    and epochs a run never reached are NaN.
+    """
+    n_epochs = max((max(stats['epoch']) + 1 for stats in run_stats.values() if stats['epoch']), default=0)
+    aligned = {}
+    for run, stats in run_stats.items():
+        column = array('d', [math.nan]) * n_epochs
+        for epoch, value in zip(stats['epoch'], stats[metric]):
+            if 0 <= epoch < n_epochs:
+                column[epoch] = value
+        aligned[run] = column
+    return n_epochs, aligned
+
+def epoch_deltas(values, baseline):
+    """Per-epoch difference values - baseline (NaN where either run has no data)."""
+    return array('d', [v - b for v, b in zip(values, baseline)])
+
+class RunComparison:
+    """Previous runs loaded for the [C] comparison view, ranked by their best mAP."""
+
+    def __init__(self, live_run, run_stats):
+        self.live_run = live_run
+        self.run_stats = {run: stats for run, stats in run_stats.items() if run != live_run and stats['epoch']}
+        self.ranked = sorted(self.run_stats, key=lambda run: max(self.run_stats[run]['map']), reverse=True)
+        self.baseline_idx = 0
+        self.metric_idx = 0
+        self._cache_for = None  # (live stats object, baseline, metric) the cached views belong to
+        self._cached_aligned = None
+        self._cached_summary = None
+
+    def _refresh(self, live_stats):
+        """Recompute the aligned arrays only when the live data, baseline or metric changed."""
+        key = (self.baseline_idx, self.metric_idx)
+        if self._cache_for is not None and self._cache_for[0] is live_stats and self._cache_for[1] == key:
+            return
+        stats = {run: self.run_stats[run] for run in self.overlay_runs()}
+        stats[self.live_run] = live_stats
+        self._cached_aligned = align_runs(stats, self.metric)
+        self._cached_summary = self._delta_summary(live_stats)
+        self._cache_for = (live_stats, key)
+
+    @property
+    def metric(self):
+        return COMPARE_METRICS[self.metric_idx]
+
+    @property
+    def baseline(self):
+        return self.ranked[self.baseline_idx] if self.ranked else None
+
+    def next_baseline(self):
+        if self.ranked:
+            self.baseline_idx = (self.baseline_idx + 1) % len(self.ranked)
+
+    def next_metric(self):
+        self.metric_idx = (self.metric_idx + 1) % len(COMPARE_METRICS)
+
+    def overlay_runs(self):
+        """Baseline first, then the best other runs, COMPARE_OVERLAY_RUNS in total."""
+        runs = [self.baseline] if self.baseline else []
+        runs += [run for run in self.ranked if run != self.baseline][:COMPARE_OVERLAY_RUNS - len(runs)]
+        return runs
+
+    def aligned(self, live_stats):
+        """(n_epochs, {run: array}) for the live run plus the overlaid runs."""
+        self._refresh(live_stats)
+        return self._cached_aligned
+
+    def delta_summary(self, live_stats):
+        self._refresh(live_stats)
+        return self._cached_summary
+
+    def _delta_summary(self, live_stats, window=10):
+        """Text line with the live run's delta against the baseline at the latest shared epoch."""
+        if not self.baseline or not live_stats['epoch']:
+            return "No previous runs to compare against."
+        _, aligned = align_runs({self.live_run: live_stats, self.baseline: self.run_stats[self.baseline]}, self.metric)
+        deltas = epoch_deltas(aligned[self.live_run], aligned[self.baseline])
+        shared = [(epoch, d) for epoch, d in enumerate(deltas) if not math.isnan(d)]
+        if not shared:
+            return f"Δ vs {self.baseline[:16]}: no shared epochs"
+        epoch, delta = shared[-1]
+        recent = [d for _, d in shared[-window:]]
+        return f"Δ vs {self.baseline[:12]} @{epoch}: {delta:+.4f} (avg {sum(recent)/len(recent):+.4f})"
+
+# --- Prometheus metrics endpoint ---
+class PrometheusExporter:
+    """Latest per-run training metrics plus monitor health, in Prometheus text format.
+
+    Run metrics are published by the app once per new epoch (and when the AI
+    verdict changes); scrapes only read this in-memory snapshot and never touch
+    results.txt.
+    """
+
+    RUN_METRICS = [
+        # (snapshot key, metric name, help)
+        ("epoch", "yolo_epoch", "Latest epoch found in results.txt"),
+        ("map", "yolo_map50", "Latest mAP@.5"),
+        ("best_map", "yolo_best_map50", "Best mAP@.5 so far"),
+        ("precision", "yolo_precision", "Latest precision"),
+        ("recall", "yolo_recall", "Latest recall"),
+        ("loss", "yolo_loss", "Latest loss"),
+        ("box_loss", "yolo_box_loss", "Latest box loss"),
+        ("cls_loss", "yolo_cls_loss", "Latest classification loss"),
+        ("overfit_local", "yolo_overfitting_detected_local", "1 if detect_overfitting() fires on the mAP history"),
+        ("overfit_ai", "yolo_overfitting_detected_ai", "1 if the last AI analysis reported isoverfitted"),
+        ("ai_calls", "fishwell_ai_calls", "AI analyses requested for this run"),
+        ("ai_tokens", "fishwell_ai_tokens", "Prompt plus completion tokens spent on this run"),
+        ("ai_cost_usd", "fishwell_ai_cost_usd", "Estimated AI cost for this run in USD"),
+        ("forecast_map", "fishwell_forecast_map50", "Forecast mAP@.5 at the end of the run (or at its plateau)"),
+        ("forecast_plateau_epoch", "fishwell_forecast_plateau_epoch", "Epoch at which the fitted mAP curve flattens"),
+        ("forecast_loss", "fishwell_forecast_loss", "Forecast loss at the end of the run (or at its mAP plateau)"),
+        ("gpu_mem_gb", "yolo_gpu_mem_gb", "GPU memory reported for the latest epoch"),
+        ("epoch_seconds", "fishwell_epoch_seconds_median", "Rolling median seconds per epoch"),
+        ("eta_seconds", "fishwell_eta_seconds", "Estimated seconds until the planned epochs are done"),
+        ("slow_epochs", "fishwell_slow_epochs", "Epochs that took STALL_FACTOR times the rolling median or more"),
+        ("train_iteration", "yolo_train_iteration", "Batches done in the current epoch (from the console log)"),
+        ("train_iterations", "yolo_train_iterations", "Batches per epoch (from the console log)"),
+        ("train_it_per_second", "yolo_train_it_per_second", "Training iterations per second (from the console log)"),
+        ("train_running_loss", "yolo_train_running_loss", "Running total loss of the current epoch"),
+    ]
+    HEALTH_EVENTS = [
+        # (EVENT_TIMINGS event, metric name, help)
+        ("frame", "fishwell_frame_seconds", "Time spent drawing one aquarium frame"),
+        ("parse_results", "fishwell_parse_seconds", "Time spent parsing results.txt"),
+        ("ai_analysis", "fishwell_ai_request_seconds", "AI analysis round-trip latency"),
+        ("backup", "fishwell_backup_seconds", "Time spent copying a weight snapshot"),
     ]
-    duck_x = 0
-    duck_dir = 1
-
-    def spawn_fish(max_x, max_y, avoid_boxes):
-        for _ in range(20):
-            fish_def = random.choice(animated_fish_defs)
-            y = random.randint(4, max_y-INFO_BOX_HEIGHT-6)
-            x = 0 if fish_def['dir']=='R' else max_x-fish_def['length']-1
-            fish_area = set((y+i, x+j) for i in range(fish_def['length']) for j in range(fish_def['width']))
-            overlap = False
-            for (box_y, box_x, box_h, box_w) in avoid_boxes:
-                for fy, fx in fish_area:
-                    if box_y <= fy < box_y+box_h and box_x <= fx < box_x+box_w:
-                        overlap = True
-                        break
-                if overlap:
-                    break
-            if not overlap:
-                return Fish(y, x, fish_def)
 
-    MAX_INFO_BOX_HEIGHT = 18
-    INFO_BOX_GAP = 4
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.runs = {}       # run name -> {snapshot key: value}
+        self.run_text = ""   # pre-rendered run section, rebuilt on publish
+        self.counters = {}   # counter name -> value
+
+    def publish_run(self, run, values):
+        with self.lock:
+            self.runs.setdefault(run, {}).update(values)
+            self.run_text = self._render_runs()
+
+    def add(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    @staticmethod
+    def _label(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    def _render_runs(self):
+        lines = []
+        for key, name, help_text in self.RUN_METRICS:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for run, values in sorted(self.runs.items()):
+                if values.get(key) is not None:
+                    lines.append(f'{name}{{run="{self._label(run)}"}} {float(values[key])}')
+        return "\n".join(lines) + "\n"
+
+    def render(self):
+        timings = EVENT_TIMINGS.snapshot()
+        with self.lock:
+            parts = [self.run_text]
+            counters = dict(self.counters)
+        for event, name, help_text in self.HEALTH_EVENTS:
+            count, total, worst, last = timings.get(event, [0, 0.0, 0.0, 0.0])
+            parts.append(f"# HELP {name} {help_text}\n# TYPE {name} summary\n"
+                         f"{name}_count {count}\n{name}_sum {total}\n"
+                         f"# HELP {name}_max Slowest observation\n# TYPE {name}_max gauge\n{name}_max {worst}\n"
+                         f"# HELP {name}_last Most recent observation\n# TYPE {name}_last gauge\n{name}_last {last}\n")
+        parts.append("# HELP fishwell_backup_bytes_total Bytes written by weight backups\n"
+                     "# TYPE fishwell_backup_bytes_total counter\n"
+                     f"fishwell_backup_bytes_total {counters.get('backup_bytes', 0)}\n")
+        parts.append(render_provider_latency())
+        parts.append("# HELP fishwell_early_stops_total Training processes signalled by the early-stop controller\n"
+                     "# TYPE fishwell_early_stops_total counter\n"
+                     f"fishwell_early_stops_total {counters.get('early_stops', 0)}\n")
+        return "".join(parts)
+
+METRICS_EXPORTER = PrometheusExporter()
+
+def start_metrics_server(port, host=METRICS_HOST):
+    """Serve METRICS_EXPORTER on http://host:port/metrics from a daemon thread."""
+    import http.server  # deferred: only needed when METRICS_PORT is set
+
+    class MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = METRICS_EXPORTER.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logging.debug("metrics endpoint: " + format, *args)
+
+    server = http.server.ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-endpoint", daemon=True).start()
+    logging.info("Prometheus metrics served on http://%s:%d/metrics", host, server.server_address[1])
+    return server
+
+# --- Early stop (signal the training process once overfitting persists) ---
+EARLY_STOP_MODE = "confirm"        # "off", "dry-run" (log only), "confirm" (ask with [Y]) or "auto"
+EARLY_STOP_GRACE_SECONDS = 120     # overfitting must persist this long before anything happens
+EARLY_STOP_SIGNAL = signal.SIGINT  # YOLOv7 stops as on Ctrl-C; SIGTERM for a harder stop
+EARLY_STOP_POLL_INTERVAL = 1.0
+TRAIN_SCRIPT = "train.py"
+PROC_ROOT = "/proc"
+
+def read_proc_cmdline(pid, proc_root=PROC_ROOT):
+    """argv of a process as a list of str ([] if it is gone or unreadable)."""
+    try:
+        with open(os.path.join(proc_root, str(pid), "cmdline"), "rb") as f:
+            raw = f.read()
+    except OSError:
+        return []
+    return [arg.decode(errors="replace") for arg in raw.split(b"\0") if arg]
+
+def read_proc_ppid(pid, proc_root=PROC_ROOT):
+    try:
+        with open(os.path.join(proc_root, str(pid), "stat"), "rb") as f:
+            stat = f.read()
+        # "pid (comm) state ppid ..." - comm may contain spaces and parentheses
+        return int(stat[stat.rindex(b")") + 2:].split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _cmdline_option(argv, option, default):
+    for i, arg in enumerate(argv):
+        if arg == option and i + 1 < len(argv):
+            return argv[i + 1]
+        if arg.startswith(option + "="):
+            return arg[len(option) + 1:]
+    return default
+
+def cmdline_matches_run(argv, run_name):
+    """True if argv runs YOLOv7's train.py under a --name that produces runs/train/<run_name>.
+
+    YOLOv7 increments an existing name (exp -> exp2), so 'exp2' matches '--name exp'.
+    """
+    if not any(os.path.basename(arg) == TRAIN_SCRIPT for arg in argv):
+        return False
+    name = _cmdline_option(argv, "--name", "exp")
+    return run_name == name or (run_name.startswith(name) and run_name[len(name):].isdigit())
+
+def _process_project_dir(pid, argv, proc_root):
+    """Absolute --project directory of a training process, or None if its cwd is unreadable."""
+    try:
+        cwd = os.readlink(os.path.join(proc_root, str(pid), "cwd"))
+    except OSError:
+        return None
+    return os.path.realpath(os.path.join(cwd, _cmdline_option(argv, "--project", "runs/train")))
+
+def find_training_processes(run_name, run_dir, proc_root=PROC_ROOT):
+    """PIDs of train.py processes writing to run_dir, without their own train.py children.
+
+    Children are dropped so a torch.distributed launcher is signalled instead of each worker.
+    """
+    project_dir = os.path.realpath(os.path.dirname(run_dir))
+    matches = {}
+    for entry in os.listdir(proc_root):
+        if not entry.isdigit() or int(entry) == os.getpid():
+            continue
+        argv = read_proc_cmdline(entry, proc_root)
+        if not cmdline_matches_run(argv, run_name):
+            continue
+        process_dir = _process_project_dir(entry, argv, proc_root)
+        if process_dir is not None and process_dir != project_dir:
+            continue
+        matches[int(entry)] = read_proc_ppid(entry, proc_root)
+    return sorted(pid for pid, ppid in matches.items() if ppid not in matches)
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def verified_weights_snapshot(prefix, epoch=None, attempts=3):
+    """copy_weights_snapshot(), then check the copy against best.pt by size and SHA-256.
+
+    Training may rewrite best.pt mid-copy, so a copy is only accepted if best.pt did
+    not change while it was taken. Returns the path, or None if there is no best.pt.
+    A snapshot that already existed is never removed, only one this call copied.
+    Blocks (copy, hashing, time.sleep() between retries) and is meant for run_blocking().
+    """
+    for _ in range(attempts):
+        try:
+            before = os.stat(BEST_PT)
+        except FileNotFoundError:
+            return None
+        backup_path, copied = copy_weights_snapshot(prefix, epoch)
+        if backup_path is None:
+            return None
+        after = os.stat(BEST_PT)
+        if (before.st_size, before.st_mtime_ns) == (after.st_size, after.st_mtime_ns) \
+                and os.path.getsize(backup_path) == after.st_size \
+                and file_sha256(backup_path) == file_sha256(BEST_PT):
+            return backup_path
+        logging.warning("best.pt changed during backup, retrying: %s", backup_path)
+        if copied:
+            os.remove(backup_path)
+            uncatalog_snapshot(backup_path)
+        time.sleep(1)
+    raise IOError(f"could not take a consistent copy of {BEST_PT}")
+
+class EarlyStopController:
+    """Turns a persistent overfitting verdict into a signal to the training process.
+
+    idle -> armed (overfitting seen, grace period running) -> backing_up -> stopped,
+    with 'confirm' in between in confirm mode and 'dry_run' instead of 'stopped' in
+    dry-run mode. Losing the verdict disarms; [X] cancels until the verdict clears.
+    stop_training() and confirm() block (backup, /proc scan, kill) and are meant for
+    run_blocking().
+    """
+
+    RESTING = ("cancelled", "failed", "dry_run")  # re-armed only after the verdict clears
+
+    def __init__(self, run_name, run_dir, mode=EARLY_STOP_MODE, grace=EARLY_STOP_GRACE_SECONDS,
+                 sig=EARLY_STOP_SIGNAL, proc_root=PROC_ROOT):
+        self.run_name = run_name
+        self.run_dir = run_dir
+        self.mode = mode
+        self.grace = grace
+        self.signal = sig
+        self.proc_root = proc_root
+        self.state = "idle"
+        self.reason = None
+        self.armed_at = None
+        self.backup_path = None
+        self.pids = []
+        self.message = None
+
+    def observe(self, map_history, ai_overfit, now=None):
+        """Feed the latest verdicts; True when the grace period is over and stop_training() is due."""
+        if self.mode == "off":
+            return False
+        now = time.monotonic() if now is None else now
+        reasons = []
+        if detect_overfitting(map_history):
+            reasons.append("mAP falling")
+        if ai_overfit:
+            reasons.append("AI verdict")
+        if not reasons:
+            if self.state in ("armed", "confirm"):
+                logging.info("Early stop disarmed for %s: overfitting no longer detected", self.run_name)
+            if self.state in ("armed", "confirm") + self.RESTING:
+                self.state = "idle"
+            return False
+        self.reason = " + ".join(reasons)
+        if self.state == "idle":
+            self.state, self.armed_at = "armed", now
+            logging.warning("Early stop armed for %s (%s), acting in %ss", self.run_name, self.reason, self.grace)
+        return self.state == "armed" and now - self.armed_at >= self.grace
+
+    def remaining(self, now=None):
+        now = time.monotonic() if now is None else now
+        return max(0, self.grace - (now - self.armed_at)) if self.state == "armed" else 0
+
+    def _fail(self, message):
+        self.state, self.message = "failed", message
+        logging.error("Early stop for %s failed: %s", self.run_name, message)
+        return self.state
+
+    def stop_training(self, epoch=None):
+        """Final verified backup, locate the trainer, then signal / ask / log depending on mode."""
+        self.state = "backing_up"
+        try:
+            self.backup_path = verified_weights_snapshot("earlystop", epoch)
+        except Exception as e:
+            return self._fail(f"backup failed: {e}")
+        if self.backup_path is None:
+            return self._fail("no best.pt to back up, not stopping")
+        METRICS_EXPORTER.add("backup_bytes", os.path.getsize(self.backup_path))
+        self.pids = find_training_processes(self.run_name, self.run_dir, self.proc_root)
+        if not self.pids:
+            return self._fail(f"no {TRAIN_SCRIPT} process found for {self.run_name}")
+        if len(self.pids) > 1:
+            return self._fail(f"several {TRAIN_SCRIPT} processes match {self.run_name}: {self.pids}")
+        sig_name = signal.Signals(self.signal).name
+        if self.mode == "dry-run":
+            self.state = "dry_run"
+            self.message = f"Dry run: would send {sig_name} to pid {self.pids[0]}"
+            logging.warning("Early stop dry run for %s: would send %s to pid %s (backup %s)",
+                            self.run_name, sig_name, self.pids[0], self.backup_path)
+            return self.state
+        if self.mode == "confirm":
+            self.state = "confirm"
+            self.message = f"Stop training (pid {self.pids[0]}) with {sig_name}?"
+            return self.state
+        return self.send_signal()
+
+    def confirm(self):
+        if self.state == "confirm":
+            return self.send_signal()
+        return self.state
+
+    def cancel(self):
+        if self.state in ("armed", "confirm"):
+            self.state = "cancelled"
+            logging.info("Early stop cancelled for %s", self.run_name)
+
+    def send_signal(self):
+        sig_name = signal.Signals(self.signal).name
+        for pid in self.pids:
+            # The pid may have exited (or been reused) since the scan
+            if not cmdline_matches_run(read_proc_cmdline(pid, self.proc_root), self.run_name):
+                return self._fail(f"training process {pid} is gone")
+            try:
+                os.kill(pid, self.signal)
+            except OSError as e:
+                return self._fail(f"cannot signal pid {pid}: {e}")
+        self.state = "stopped"
+        self.message = f"Sent {sig_name} to training (pid {', '.join(map(str, self.pids))})"
+        METRICS_EXPORTER.add("early_stops")
+        logging.warning("Early stop: sent %s to %s for %s (backup %s)",
+                        sig_name, self.pids, self.run_name, self.backup_path)
+        return self.state
+
+    def status_line(self, now=None):
+        """One line for the dashboard, or None when there is nothing to say."""
+        if self.state == "armed":
+            return f"⏹ Early stop in {self.remaining(now):.0f}s ({self.reason}) [X] cancel"
+        if self.state == "backing_up":
+            return "⏹ Early stop: saving best.pt..."
+        if self.state == "confirm":
+            return f"⏹ {self.message} [Y] stop [X] keep training"
+        if self.state in ("stopped", "dry_run"):
+            return f"⏹ {self.message}"
+        if self.state == "failed":
+            return f"❌ Early stop: {self.message}"
+        return None
+
+# --- Checkpoint metadata (epoch / best_fitness of a .pt without torch) ---
+# torch.save writes a zip: <name>/data.pkl holds the pickled dict, every tensor's
+# storage is a separate member that the pickle only references by key. YOLOv7's
+# dict starts with epoch and best_fitness, so a restricted unpickler that stops
+# at the first class or tensor it will not build reads them in a few hundred
+# bytes, however big the weights are. best_fitness is a numpy array or scalar;
+# those are decoded from their raw bytes without numpy.
+CHECKPOINT_FIELDS = ("epoch", "best_fitness")
+NUMPY_STRUCT_CODES = {"f8": "d", "f4": "f", "f2": "e", "i8": "q", "i4": "i", "i2": "h", "i1": "b",
+                      "u8": "Q", "u4": "I", "u2": "H", "u1": "B", "b1": "?"}
+
+class _StopUnpickling(Exception):
+    """Raised at the first object the checkpoint reader will not build."""
+
+class _NumpyDtype:
+    def __init__(self, name, *args):
+        self.name = name
+        self.byteorder = "<"
+
+    def __setstate__(self, state):
+        self.byteorder = state[1]
+
+    def unpack(self, raw):
+        code = NUMPY_STRUCT_CODES.get(self.name)
+        if code is None or not isinstance(raw, (bytes, bytearray)):
+            return list(raw) if isinstance(raw, list) else None
+        order = ">" if self.byteorder == ">" else "<"
+        return list(struct.unpack(f"{order}{len(raw) // struct.calcsize(code)}{code}", raw))
+
+class _NumpyArray:
+    def __init__(self):
+        self.values = None
+
+    def __setstate__(self, state):
+        _, _, dtype, _, raw = state[:5]
+        self.values = dtype.unpack(raw)
+
+def _numpy_reconstruct(cls, shape, dtype):
+    return _NumpyArray()
+
+def _numpy_scalar(dtype, raw=b""):
+    values = dtype.unpack(raw)
+    return values[0] if values else None
+
+CHECKPOINT_GLOBALS = {
+    ("numpy", "dtype"): _NumpyDtype,
+    ("numpy", "ndarray"): _NumpyArray,
+    ("numpy.core.multiarray", "_reconstruct"): _numpy_reconstruct,
+    ("numpy._core.multiarray", "_reconstruct"): _numpy_reconstruct,
+    ("numpy.core.multiarray", "scalar"): _numpy_scalar,
+    ("numpy._core.multiarray", "scalar"): _numpy_scalar,
+    ("collections", "OrderedDict"): collections.OrderedDict,
+    ("_codecs", "encode"): codecs.encode,  # how protocol 2 pickles bytes
+}
+
+class _MappedReader:
+    """read()/readline() over a slice of an mmap, for the unpickler."""
+
+    def __init__(self, buf, start, end):
+        self.buf, self.pos, self.end = buf, start, end
+
+    def read(self, n=-1):
+        end = self.end if n is None or n < 0 else min(self.end, self.pos + n)
+        data, self.pos = self.buf[self.pos:end], end
+        return data
+
+    def readline(self):
+        newline = self.buf.find(b"\n", self.pos, self.end)
+        return self.read(self.end - self.pos if newline < 0 else newline + 1 - self.pos)
+
+def _checkpoint_unpickler(file):
+    import pickle
+
+    class CheckpointUnpickler(pickle._Unpickler):
+        """Pure-Python unpickler (its stack stays inspectable after a stop) that builds plain values only."""
+
+        def find_class(self, module, name):
+            try:
+                return CHECKPOINT_GLOBALS[module, name]
+            except KeyError:
+                raise _StopUnpickling(f"{module}.{name}") from None
+
+        def persistent_load(self, pid):
+            raise _StopUnpickling("tensor")
+
+    return CheckpointUnpickler(file, encoding="latin1")
+
+def _top_level_fields(unpickler):
+    """The top-level dict's items that were complete when the unpickler stopped."""
+    levels = unpickler.metastack + [unpickler.stack]
+    if not levels[0] or not isinstance(levels[0][0], dict):
+        return {}
+    items = dict(levels[0][0])  # filled by an earlier SETITEMS batch
+    if len(levels) > 1:
+        pending = levels[1]  # key, value, key, value, ... (the last key may still wait for its value)
+        items.update((k, v) for k, v in zip(pending[0::2], pending[1::2]) if isinstance(k, str))
+    return items
+
+def _checkpoint_fields(file):
+    unpickler = _checkpoint_unpickler(file)
+    try:
+        items = unpickler.load()
+    except _StopUnpickling:
+        items = _top_level_fields(unpickler)
+    if not isinstance(items, dict):
+        return None
+    meta = {}
+    for field in CHECKPOINT_FIELDS:
+        value = items.get(field)
+        if isinstance(value, _NumpyArray):
+            value = value.values[0] if value.values and len(value.values) == 1 else value.values
+        meta[field] = value if isinstance(value, (int, float, str, list)) else None
+    return meta
+
+def _zip_member(buf, suffix):
+    """(data offset, compressed size, method) of the first member whose name ends with suffix.
+
+    Walks the central directory from the end-of-central-directory record (zip64 too).
+    """
+    eocd = buf.rfind(b"PK\x05\x06", max(0, len(buf) - 65557))
+    if eocd < 0:
+        return None
+    entries, _, cd_offset = struct.unpack_from("<HII", buf, eocd + 10)
+    if (entries == 0xFFFF or cd_offset == 0xFFFFFFFF) and buf[eocd - 20:eocd - 16] == b"PK\x06\x07":
+        eocd64 = struct.unpack_from("<Q", buf, eocd - 12)[0]
+        entries, _, cd_offset = struct.unpack_from("<QQQ", buf, eocd64 + 32)
+    pos = cd_offset
+    for _ in range(entries):
+        if buf[pos:pos + 4] != b"PK\x01\x02":
+            return None
+        method, = struct.unpack_from("<H", buf, pos + 10)
+        size, raw_size = struct.unpack_from("<II", buf, pos + 20)
+        name_len, extra_len, comment_len = struct.unpack_from("<HHH", buf, pos + 28)
+        local, = struct.unpack_from("<I", buf, pos + 42)
+        if buf[pos + 46:pos + 46 + name_len].endswith(suffix):
+            extra, end = pos + 46 + name_len, pos + 46 + name_len + extra_len
+            while extra + 4 <= end:  # zip64 extra field: the sizes/offset that did not fit 32 bits
+                tag, length = struct.unpack_from("<HH", buf, extra)
+                if tag == 1:
+                    wide = list(struct.unpack_from(f"<{length // 8}Q", buf, extra + 4))
+                    if raw_size == 0xFFFFFFFF:
+                        wide.pop(0)
+                    if size == 0xFFFFFFFF:
+                        size = wide.pop(0)
+                    if local == 0xFFFFFFFF:
+                        local = wide.pop(0)
+                extra += 4 + length
+            local_name, local_extra = struct.unpack_from("<HH", buf, local + 26)
+            return local + 30 + local_name + local_extra, size, method
+        pos += 46 + name_len + extra_len + comment_len
+    return None
+
+def read_checkpoint_meta(path):
+    """{"epoch", "best_fitness"} of a torch checkpoint, read without torch; None if it is not one.
+
+    Only the end of the zip, its central directory and the start of data.pkl are
+    touched (through mmap); tensors are never read. Legacy (pre-zip) checkpoints
+    are read the same way after their three header pickles. Gzipped snapshots are
+    not supported.
+    """
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if buf[:4] != b"PK\x03\x04":
+                file = _MappedReader(buf, 0, len(buf))
+                for _ in range(3):  # magic number, protocol version, sys info
+                    _checkpoint_unpickler(file).load()
+                return _checkpoint_fields(file)
+            member = _zip_member(buf, b"data.pkl")
+            if member is None:
+                return None
+            start, size, method = member
+            if method == 0:
+                return _checkpoint_fields(_MappedReader(buf, start, start + size))
+            import io
+            import zlib
+            return _checkpoint_fields(io.BytesIO(zlib.decompress(buf[start:start + size], -15)))
+    except Exception as e:  # truncated, being rewritten, or not a checkpoint at all
+        logging.debug("Could not read checkpoint metadata from %s: %s", path, e)
+        return None
+
+def unchanged_snapshot(weights_dir, meta, size):
+    """An existing uncompressed snapshot holding the same checkpoint (epoch, best_fitness, size), or None."""
+    if not meta or meta.get("epoch") is None:
+        return None
+    for snapshot in list_snapshots(weights_dir):
+        if snapshot["epoch"] == meta["epoch"] and not snapshot["compressed"] \
+                and os.path.getsize(snapshot["path"]) == size and read_checkpoint_meta(snapshot["path"]) == meta:
+            return snapshot["path"]
+    return None
+
+# --- Backup retention (top-K by mAP, last N, exponential thinning, compression) ---
+BACKUP_KEEP_BEST = 3                  # top-K snapshots by mAP are always kept
+BACKUP_KEEP_LAST = 5                  # so are the N newest, which also stay uncompressed
+BACKUP_THIN_INTERVAL = 3600           # the rest: newest per age bucket of 1, 2, 4, 8... intervals
+BACKUP_MIN_FREE_BYTES = 2 * 1024**3   # free space that must remain on the disk after a copy
+BACKUP_COMPRESS_WORKERS = 2
+BACKUP_COMPRESS_NICE = 10             # compression must not compete with the training dataloaders
+BACKUP_FILE_RE = re.compile(r"^(?P<kind>[a-z]+)_(?P<time>\d+)(?:_e(?P<epoch>\d+))?\.pt(?P<gz>\.gz)?$")
+_compress_pool = None
+
+class BackupSpaceError(OSError):
+    pass
+
+def list_snapshots(weights_dir):
+    """Snapshots written by this tool in weights_dir, newest first.
+
+    YOLOv7's own files (best.pt, last.pt, epoch_*.pt) never match BACKUP_FILE_RE.
+    """
+    snapshots = []
+    try:
+        names = os.listdir(weights_dir)
+    except FileNotFoundError:
+        return snapshots
+    for name in names:
+        m = BACKUP_FILE_RE.match(name)
+        if m:
+            snapshots.append({
+                "path": os.path.join(weights_dir, name),
+                "kind": m.group("kind"),
+                "time": int(m.group("time")),
+                "epoch": int(m.group("epoch")) if m.group("epoch") else None,
+                "compressed": bool(m.group("gz")),
+            })
+    snapshots.sort(key=lambda s: (s["time"], s["path"]), reverse=True)
+    return snapshots
+
+def protected_snapshots(snapshots, map_history, keep_best=BACKUP_KEEP_BEST, keep_last=BACKUP_KEEP_LAST):
+    """Paths of the keep_last newest snapshots and the keep_best ones with the highest mAP.
+
+    A snapshot of best.pt taken at epoch E holds the best weights up to E, so its
+    mAP is the running maximum of map_history at E; snapshots without an epoch in
+    the name never count as top-K.
+    """
+    running_best = list(itertools.accumulate(map_history, max))
+    scored = [(running_best[min(s["epoch"], len(running_best) - 1)], s["time"], s["path"])
+              for s in snapshots if s["epoch"] is not None and running_best]
+    best = sorted(scored, reverse=True)[:keep_best]
+    return {s["path"] for s in snapshots[:keep_last]} | {path for _, _, path in best}
+
+def plan_retention(snapshots, map_history, now=None, interval=BACKUP_THIN_INTERVAL):
+    """Split snapshots (newest first) into (keep, delete, compress) lists."""
+    now = time.time() if now is None else now
+    protected = protected_snapshots(snapshots, map_history)
+    keep, delete, buckets = [], [], set()
+    for s in snapshots:
+        bucket = int(math.log2(1 + max(0, now - s["time"]) / interval))
+        if s["path"] in protected or bucket not in buckets:
+            buckets.add(bucket)
+            keep.append(s)
+        else:
+            delete.append(s)
+    recent_paths = {s["path"] for s in snapshots[:BACKUP_KEEP_LAST]}
+    compress = [s for s in keep if not s["compressed"] and s["path"] not in recent_paths]
+    return keep, delete, compress
+
+def apply_backup_retention(weights_dir, map_history=None, busy=()):
+    """Delete thinned snapshots; return the paths that should be compressed.
+
+    Paths in busy (being compressed right now) are left alone.
+    """
+    if map_history is None:
+        map_history = parse_results(RESULTS_FILE)["map"]
+    _, delete, compress = plan_retention(list_snapshots(weights_dir), map_history)
+    for s in delete:
+        if s["path"] in busy:
+            continue
+        try:
+            os.remove(s["path"])
+            logging.info("Backup retention removed %s", s["path"])
+        except FileNotFoundError:
+            pass
+        uncatalog_snapshot(s["path"])
+    return [s["path"] for s in compress if s["path"] not in busy]
+
+def ensure_backup_space(needed, weights_dir, map_history=None):
+    """Make sure needed bytes fit while leaving BACKUP_MIN_FREE_BYTES free.
+
+    Evicts unprotected snapshots oldest first, and raises BackupSpaceError rather
+    than fill the disk the training is writing to.
+    """
+    def short():
+        return needed + BACKUP_MIN_FREE_BYTES - shutil.disk_usage(weights_dir).free
+    if short() <= 0:
+        return
+    if map_history is None:
+        map_history = parse_results(RESULTS_FILE)["map"]
+    snapshots = list_snapshots(weights_dir)
+    keep, delete, _ = plan_retention(snapshots, map_history)
+    protected = protected_snapshots(snapshots, map_history)
+    evictable = delete[::-1] + [s for s in keep[::-1] if s["path"] not in protected]
+    for s in evictable:
+        if short() <= 0:
+            return
+        try:
+            os.remove(s["path"])
+            logging.warning("Low disk space: evicted backup %s", s["path"])
+        except FileNotFoundError:
+            pass
+        uncatalog_snapshot(s["path"])
+    if short() > 0:
+        raise BackupSpaceError(f"not enough free space in {weights_dir} for a {needed / 2**20:.1f} MiB backup")
+
+def compress_snapshot(path):
+    """gzip a snapshot to path + '.gz' (atomically) and remove the original. Returns bytes saved.
+
+    Runs in the compression process pool.
+    """
+    import gzip
+    size = os.path.getsize(path)
+    if shutil.disk_usage(os.path.dirname(path)).free - size < BACKUP_MIN_FREE_BYTES:
+        return 0  # no room for the temporary copy; try again after the next backup
+    tmp_path = path + ".gz.tmp"
+    with open(path, "rb") as src, gzip.open(tmp_path, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    shutil.copystat(path, tmp_path)
+    os.replace(tmp_path, path + ".gz")
+    os.remove(path)
+    return size - os.path.getsize(path + ".gz")
+
+def compression_pool():
+    """Process pool for compress_snapshot(), started on first use at low CPU priority."""
+    global _compress_pool
+    if _compress_pool is None:
+        import multiprocessing
+        # spawn, not fork: this process has logging, HTTP and worker threads running
+        _compress_pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=BACKUP_COMPRESS_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+            initializer=os.nice, initargs=(BACKUP_COMPRESS_NICE,))
+    return _compress_pool
+
+def shutdown_compression_pool():
+    """Drop queued compressions and kill running ones, so exit never waits for a gzip.
+
+    A killed compression leaves its original and at most a stale .gz.tmp, which the
+    next compress_snapshot() of that file overwrites.
+    """
+    global _compress_pool
+    if _compress_pool is not None:
+        # shutdown() alone lets the pool's manager thread wait for a running task at exit
+        processes = list((getattr(_compress_pool, "_processes", None) or {}).values())
+        _compress_pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        _compress_pool = None
+
+# --- Backup catalog (SQLite, one per runs/train project) ---
+BACKUP_CATALOG_NAME = "fishwell_backups.sqlite3"
+# Snapshot file prefix -> catalog reason
+BACKUP_REASONS = {"backup": "manual", "manual": "manual", "overfit": "overfit",
+                  "timeout": "timeout", "earlystop": "auto"}
+CATALOG_RESCAN_WORKERS = 8
+
+def snapshot_metrics(stats, epoch):
+    """mAP/P/R of the epoch's results.txt row plus best_map, the running best up to it.
+
+    best_map is what the weights in a best.pt snapshot actually score.
+    """
+    metrics = {"map": None, "precision": None, "recall": None, "best_map": None}
+    if epoch is None or epoch not in stats["epoch"]:
+        return metrics
+    # Last occurrence: a resumed training repeats epochs
+    i = len(stats["epoch"]) - 1 - stats["epoch"][::-1].index(epoch)
+    for key in ["map", "precision", "recall"]:
+        metrics[key] = stats[key][i]
+    metrics["best_map"] = max(stats["map"][:i + 1])
+    return metrics
+
+def snapshot_sha256(path):
+    """SHA-256 of the weights inside a snapshot (gzipped snapshots hash their uncompressed content)."""
+    if not path.endswith(".gz"):
+        return file_sha256(path)
+    import gzip
+    digest = hashlib.sha256()
+    with gzip.open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class SqliteStore:
+    """Base for the tool's SQLite files: subclasses set SCHEMA (idempotent DDL).
+
+    Connections are opened per call, so any thread may use the same instance.
+    """
+
+    SCHEMA = ""
+
+    def __init__(self, path):
+        self.path = path
+
+    @contextlib.contextmanager
+    def connect(self):
+        import sqlite3
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+class BackupCatalog(SqliteStore):
+    """Every snapshot the tool writes, with its run, epoch, metrics, reason, size and hash."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS backups (
+            id INTEGER PRIMARY KEY,
+            run TEXT NOT NULL,
+            epoch INTEGER,
+            map REAL,
+            precision REAL,
+            recall REAL,
+            best_map REAL,
+            reason TEXT NOT NULL,
+            created INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            path TEXT NOT NULL UNIQUE
+        );
+        CREATE INDEX IF NOT EXISTS backups_run_best ON backups (run, best_map DESC, created DESC);
+        CREATE INDEX IF NOT EXISTS backups_run_epoch ON backups (run, epoch);
+        CREATE INDEX IF NOT EXISTS backups_best ON backups (best_map DESC, created DESC);
+        CREATE INDEX IF NOT EXISTS backups_sha256 ON backups (sha256);
+    """
+    COLUMNS = ["run", "epoch", "map", "precision", "recall", "best_map", "reason", "created", "size", "sha256", "path"]
+
+    def record(self, entry):
+        """Insert or replace one snapshot; entry maps COLUMNS to values."""
+        with self.connect() as conn:
+            conn.execute(f"INSERT OR REPLACE INTO backups ({', '.join(self.COLUMNS)}) "
+                         f"VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                         [entry.get(c) for c in self.COLUMNS])
+
+    def forget(self, path):
+        with self.connect() as conn:
+            conn.execute("DELETE FROM backups WHERE path = ?", (os.path.abspath(path),))
+
+    def moved(self, old_path, new_path):
+        """A snapshot was renamed (compressed); its content hash stays the same."""
+        new_path = os.path.abspath(new_path)
+        with self.connect() as conn:
+            conn.execute("UPDATE backups SET path = ?, size = ? WHERE path = ?",
+                         (new_path, os.path.getsize(new_path), os.path.abspath(old_path)))
+
+    def best(self, run=None):
+        """The snapshot with the highest best_map (newest first on ties), optionally within one run."""
+        where, args = ("WHERE run = ? AND best_map IS NOT NULL", (run,)) if run else ("WHERE best_map IS NOT NULL", ())
+        with self.connect() as conn:
+            return conn.execute(f"SELECT * FROM backups {where} ORDER BY best_map DESC, created DESC LIMIT 1",
+                                args).fetchone()
+
+    def before_epoch(self, run, epoch):
+        """The newest snapshot of a run taken before the given epoch."""
+        with self.connect() as conn:
+            return conn.execute("SELECT * FROM backups WHERE run = ? AND epoch < ? ORDER BY epoch DESC, created DESC "
+                                "LIMIT 1", (run, epoch)).fetchone()
+
+    def entries(self, run=None):
+        where, args = ("WHERE run = ?", (run,)) if run else ("", ())
+        with self.connect() as conn:
+            return conn.execute(f"SELECT * FROM backups {where} ORDER BY run, created", args).fetchall()
+
+    def rebuild(self, max_workers=CATALOG_RESCAN_WORKERS):
+        """Recreate the catalog from the snapshot files of every run in RUNS_BASE_PATH. Returns the entry count.
+
+        Hashing dominates and hashlib/zlib release the GIL, so files are hashed in a thread pool.
+        """
+        base_path = os.path.expanduser(RUNS_BASE_PATH)
+        snapshots = []
+        for run in find_all_training_runs():
+            for s in list_snapshots(os.path.join(base_path, run, "weights")):
+                snapshots.append((run, s))
+        stats = load_runs(sorted({run for run, _ in snapshots}))
+
+        def entry(item):
+            run, s = item
+            return dict(snapshot_metrics(stats[run], s["epoch"]), run=run, epoch=s["epoch"],
+                        reason=BACKUP_REASONS.get(s["kind"], s["kind"]), created=s["time"],
+                        size=os.path.getsize(s["path"]), sha256=snapshot_sha256(s["path"]),
+                        path=os.path.abspath(s["path"]))
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+            entries = list(pool.map(entry, snapshots))
+        with self.connect() as conn:
+            conn.execute("DELETE FROM backups")
+            conn.executemany(f"INSERT OR REPLACE INTO backups ({', '.join(self.COLUMNS)}) "
+                             f"VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                             [[e.get(c) for c in self.COLUMNS] for e in entries])
+        return len(entries)
+
+def backup_catalog():
+    return BackupCatalog(os.path.join(os.path.expanduser(RUNS_BASE_PATH), BACKUP_CATALOG_NAME))
+
+def catalog_snapshot(path, prefix, epoch, created, sha256):
+    """Record a fresh snapshot of the current run. Catalog problems never fail a backup."""
+    try:
+        entry = snapshot_metrics(parse_results_cached(RESULTS_FILE), epoch)
+        entry.update(run=RUN_NAME, epoch=epoch, reason=BACKUP_REASONS.get(prefix, prefix),
+                     created=created, size=os.path.getsize(path), sha256=sha256,
+                     path=os.path.abspath(path))
+        backup_catalog().record(entry)
+    except Exception as e:
+        logging.error("Could not add %s to the backup catalog: %s", path, e)
+
+def uncatalog_snapshot(path):
+    try:
+        backup_catalog().forget(path)
+    except Exception as e:
+        logging.error("Could not remove %s from the backup catalog: %s", path, e)
+
+def restore_snapshot(row, dest):
+    """Copy (and gunzip) a catalogued snapshot to dest and check its hash. Returns dest."""
+    import gzip
+    opener = gzip.open if row["path"].endswith(".gz") else open
+    digest = hashlib.sha256()
+    tmp_path = dest + ".tmp"
+    with opener(row["path"], "rb") as src, open(tmp_path, "wb") as dst:
+        for chunk in iter(lambda: src.read(1 << 20), b""):
+            digest.update(chunk)
+            dst.write(chunk)
+    if digest.hexdigest() != row["sha256"]:
+        os.remove(tmp_path)
+        raise IOError(f"{row['path']} does not match its catalogued hash")
+    os.replace(tmp_path, dest)
+    return dest
+
+# --- Metrics warehouse (SQLite, every run in runs/train) ---
+WAREHOUSE_NAME = "fishwell_metrics.sqlite3"
+WAREHOUSE_POOL_MIN_RUNS = 16  # smaller backfills are faster in-process than starting workers
+WAREHOUSE_WORKERS = min(8, len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1)
+PLATEAU_PATIENCE = 10         # epochs without a new best mAP before a run counts as plateaued
+RESULTS_KEYS = ["epoch", "gflops", "map", "loss", "box_loss", "cls_loss", "total", "labels", "precision", "recall"]
+
+def results_row(line):
+    """One results.txt line as a tuple in RESULTS_KEYS order (same columns as parse_results()), or None."""
+    values = line.split()
+    if len(values) < 10 or line.startswith('epoch'):
+        return None
+    try:
+        return (int(values[0].split('/')[0]), float(values[1].replace('G', '')), float(values[2]),
+                float(values[3]), float(values[4]), float(values[5]), float(values[5]), int(values[6]),
+                float(values[8]), float(values[9]))
+    except ValueError:
+        return None
+
+def _yaml_scalar(text):
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "'\"":
+        return text[1:-1]
+    lowered = text.lower()
+    if lowered in ("null", "~", ""):
+        return None
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+def read_flat_yaml(path):
+    """opt.yaml / hyp.yaml as a dict.
+
+    Uses PyYAML when it is installed; otherwise reads the flat 'key: value' and
+    '- item' layout YOLOv7 writes with yaml.safe_dump.
+    """
+    with open(path) as f:
+        text = f.read()
+    try:
+        import yaml
+    except ImportError:
+        yaml = None
+    if yaml is not None:
+        return yaml.safe_load(text) or {}
+    data, key = {}, None
+    for line in text.splitlines():
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        if line.lstrip().startswith('- ') and key is not None:
+            if not isinstance(data[key], list):
+                data[key] = []
+            data[key].append(_yaml_scalar(line.lstrip()[2:]))
+        elif ':' in line and not line[0].isspace():
+            key, _, value = line.partition(':')
+            key = key.strip()
+            data[key] = _yaml_scalar(value)
+    return data
+
+def read_run_increment(run_dir, offset, inode, config_mtimes):
+    """What changed in a run since the last ingestion: new results rows and re-read opt/hyp.
+
+    Only complete lines are consumed, so a half-written line is picked up next time.
+    A shrunk or replaced results.txt starts over from offset 0 (reset=True).
+    Module-level so the backfill process pool can run it.
+    """
+    results_path = os.path.join(run_dir, "results.txt")
+    st = os.stat(results_path)
+    reset = st.st_ino != inode or st.st_size < offset
+    if reset:
+        offset = 0
+    with open(results_path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    rows = [row for row in map(results_row, data[:end].decode(errors="replace").splitlines()) if row]
+    configs = {}
+    for name in ["opt", "hyp"]:
+        path = os.path.join(run_dir, f"{name}.yaml")
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            continue
+        if mtime != config_mtimes.get(name):
+            try:
+                configs[name] = (mtime, read_flat_yaml(path))
+            except Exception as e:
+                configs[name] = (mtime, {"_error": str(e)})
+    return {"reset": reset, "offset": offset + end, "inode": st.st_ino, "rows": rows, "configs": configs}
+
+class MetricsWarehouse(SqliteStore):
+    """Every epoch of every run in RUNS_BASE_PATH, plus each run's opt.yaml/hyp.yaml.
+
+    ingest() only reads what was appended to each results.txt since the last call,
+    tracked by byte offset and inode in the runs table.
+    """
+
+    SCHEMA = f"""
+        CREATE TABLE IF NOT EXISTS runs (
+            run TEXT PRIMARY KEY,
+            dataset TEXT,
+            planned_epochs INTEGER,
+            results_offset INTEGER NOT NULL DEFAULT 0,
+            results_inode INTEGER,
+            opt_mtime_ns INTEGER,
+            hyp_mtime_ns INTEGER,
+            opt TEXT,
+            hyp TEXT,
+            ingested REAL
+        );
+        CREATE TABLE IF NOT EXISTS epochs (
+            id INTEGER PRIMARY KEY,
+            run TEXT NOT NULL REFERENCES runs (run),
+            {", ".join(f"{key} {'INTEGER' if key in ('epoch', 'labels') else 'REAL'}" for key in RESULTS_KEYS)}
+        );
+        CREATE INDEX IF NOT EXISTS epochs_run ON epochs (run, id);
+        CREATE INDEX IF NOT EXISTS epochs_run_map ON epochs (run, map DESC, epoch);
+        CREATE INDEX IF NOT EXISTS runs_dataset ON runs (dataset);
+        CREATE VIEW IF NOT EXISTS run_summary AS
+            SELECT r.run, r.dataset, r.planned_epochs,
+                   (SELECT MAX(map) FROM epochs e WHERE e.run = r.run) AS best_map,
+                   (SELECT epoch FROM epochs e WHERE e.run = r.run ORDER BY map DESC, epoch LIMIT 1) AS peak_epoch,
+                   (SELECT MAX(epoch) FROM epochs e WHERE e.run = r.run) AS last_epoch
+            FROM runs r;
+    """
+
+    def ingest(self, run_names=None, max_workers=WAREHOUSE_WORKERS):
+        """Bring the given runs (default: all of them) up to date. Returns {run: new rows}.
+
+        A backfill of at least WAREHOUSE_POOL_MIN_RUNS never-seen runs is parsed in a process pool.
+        """
+        prune = run_names is None
+        run_names = find_all_training_runs() if run_names is None else run_names
+        base_path = os.path.expanduser(RUNS_BASE_PATH)
+        with self.connect() as conn:
+            known = {row["run"]: row for row in conn.execute("SELECT * FROM runs")}
+        jobs = {}
+        for run in run_names:
+            row = known.get(run)
+            state = (row["results_offset"], row["results_inode"],
+                     {"opt": row["opt_mtime_ns"], "hyp": row["hyp_mtime_ns"]}) if row else (0, None, {})
+            jobs[run] = (os.path.join(base_path, run),) + state
+        backfill = [run for run in jobs if run not in known]
+        results = {}
+        if len(backfill) >= WAREHOUSE_POOL_MIN_RUNS and max_workers > 1:
+            import multiprocessing
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = {run: pool.submit(read_run_increment, *jobs[run]) for run in backfill}
+                results.update(self._collect(futures))
+        for run in jobs:
+            if run not in results:
+                try:
+                    results[run] = read_run_increment(*jobs[run])
+                except OSError as e:
+                    logging.warning("Warehouse skipped %s: %s", run, e)
+        with self.connect() as conn:
+            for run, inc in results.items():
+                self._store(conn, run, inc, known.get(run))
+            if prune:
+                gone = [run for run in known if run not in jobs]
+                conn.executemany("DELETE FROM epochs WHERE run = ?", [(run,) for run in gone])
+                conn.executemany("DELETE FROM runs WHERE run = ?", [(run,) for run in gone])
+        return {run: len(inc["rows"]) for run, inc in results.items()}
+
+    @staticmethod
+    def _collect(futures):
+        collected = {}
+        for run, future in futures.items():
+            try:
+                collected[run] = future.result()
+            except OSError as e:
+                logging.warning("Warehouse skipped %s: %s", run, e)
+        return collected
+
+    @staticmethod
+    def _store(conn, run, inc, known_row):
+        if known_row is None:
+            conn.execute("INSERT INTO runs (run) VALUES (?)", (run,))
+        elif inc["reset"]:
+            conn.execute("DELETE FROM epochs WHERE run = ?", (run,))
+        conn.executemany(f"INSERT INTO epochs (run, {', '.join(RESULTS_KEYS)}) "
+                         f"VALUES (?, {', '.join('?' * len(RESULTS_KEYS))})",
+                         [(run,) + row for row in inc["rows"]])
+        conn.execute("UPDATE runs SET results_offset = ?, results_inode = ?, ingested = ? WHERE run = ?",
+                     (inc["offset"], inc["inode"], time.time(), run))
+        for name, (mtime, config) in inc["configs"].items():
+            conn.execute(f"UPDATE runs SET {name}_mtime_ns = ?, {name} = ? WHERE run = ?",
+                         (mtime, json.dumps(config, default=str), run))
+            if name == "opt":
+                data = config.get("data")
+                dataset = os.path.splitext(os.path.basename(data))[0] if isinstance(data, str) else None
+                epochs = config.get("epochs")
+                conn.execute("UPDATE runs SET dataset = ?, planned_epochs = ? WHERE run = ?",
+                             (dataset, epochs if isinstance(epochs, int) else None, run))
+
+    def load_runs(self, run_names):
+        """Same result as load_runs(): {run: parse_results()-style stats}, served from the database."""
+        self.ingest(run_names)
+        run_stats = {run: {key: [] for key in RESULTS_KEYS} for run in run_names}
+        with self.connect() as conn:
+            for row in conn.execute(f"SELECT run, {', '.join(RESULTS_KEYS)} FROM epochs ORDER BY run, id"):
+                stats = run_stats.get(row[0])
+                if stats is not None:
+                    for key, value in zip(RESULTS_KEYS, row[1:]):
+                        stats[key].append(value)
+        return run_stats
+
+    def summary(self):
+        with self.connect() as conn:
+            return conn.execute("SELECT * FROM run_summary ORDER BY run").fetchall()
+
+    def best_per_dataset(self):
+        with self.connect() as conn:
+            return conn.execute("SELECT dataset, run, MAX(best_map) AS best_map FROM run_summary "
+                                "WHERE best_map IS NOT NULL GROUP BY dataset ORDER BY best_map DESC").fetchall()
+
+    def plateaued_before(self, epoch, patience=PLATEAU_PATIENCE):
+        """Runs whose best mAP came before epoch and did not improve for patience more epochs."""
+        with self.connect() as conn:
+            return conn.execute("SELECT * FROM run_summary WHERE peak_epoch < ? AND last_epoch - peak_epoch >= ? "
+                                "ORDER BY peak_epoch", (epoch, patience)).fetchall()
+
+def metrics_warehouse():
+    return MetricsWarehouse(os.path.join(os.path.expanduser(RUNS_BASE_PATH), WAREHOUSE_NAME))
+
+# --- AI scheduling and accounting ---
+AI_MIN_INTERVAL = 5            # epochs between analyses, however much changes
+AI_MAX_INTERVAL = 30           # epochs after which an analysis runs even if nothing changed
+AI_NEW_BEST_DELTA = 0.01       # mAP gain over the best at the last analysis that counts as news
+AI_PRICE_PER_1K_PROMPT = 0.01  # USD, gpt-4-turbo
+AI_PRICE_PER_1K_COMPLETION = 0.03
+ANTHROPIC_PRICE_PER_1K_PROMPT = 0.003  # USD, claude-3.5-sonnet
+ANTHROPIC_PRICE_PER_1K_COMPLETION = 0.015
+AI_BUDGET_USD = None           # per-run spending cap; None for no cap
+AI_BUDGET_TOKENS = None        # per-run token cap; None for no cap
+AI_USAGE_FILE = "fishwell_ai_usage.json"  # kept in the run directory, so budgets survive restarts
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token) for providers that report no usage."""
+    return (len(text) + 3) // 4
+
+class AIUsage:
+    """Per-run AI counters: calls, failures, tokens, latency and estimated cost, persisted as JSON.
+
+    record() only counts; save() writes the file and is meant for run_blocking().
+    """
+
+    FIELDS = ["calls", "failures", "prompt_tokens", "completion_tokens", "latency_total", "latency_max", "cost_usd"]
+
+    def __init__(self, path):
+        self.path = path
+        self.counters = dict.fromkeys(self.FIELDS, 0)
+        try:
+            with open(path) as f:
+                self.counters.update({k: v for k, v in json.load(f).items() if k in self.counters})
+        except (OSError, ValueError):
+            pass
+
+    def record(self, latency, usage=None, failed=False):
+        c = self.counters
+        c["calls"] += 1
+        c["failures"] += int(failed)
+        c["latency_total"] += latency
+        c["latency_max"] = max(c["latency_max"], latency)
+        if usage:
+            prompt, completion = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+            c["prompt_tokens"] += prompt
+            c["completion_tokens"] += completion
+            c["cost_usd"] += usage.get("cost_usd", prompt / 1000 * AI_PRICE_PER_1K_PROMPT
+                                       + completion / 1000 * AI_PRICE_PER_1K_COMPLETION)
+
+    def save(self, counters=None):
+        """Write counters (a snapshot taken by the caller, default the current ones) atomically."""
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(counters or dict(self.counters), f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning("Could not save AI usage to %s: %s", self.path, e)
+
+    @property
+    def tokens(self):
+        return self.counters["prompt_tokens"] + self.counters["completion_tokens"]
+
+    def over_budget(self):
+        return ((AI_BUDGET_USD is not None and self.counters["cost_usd"] >= AI_BUDGET_USD)
+                or (AI_BUDGET_TOKENS is not None and self.tokens >= AI_BUDGET_TOKENS))
+
+    def status_line(self):
+        c = self.counters
+        if not c["calls"]:
+            return None
+        budget = f"/${AI_BUDGET_USD:.2f}" if AI_BUDGET_USD is not None else ""
+        line = (f"AI {c['calls']} calls · {self.tokens / 1000:.1f}k tok · ${c['cost_usd']:.2f}{budget} · "
+                f"{c['latency_total'] / c['calls']:.1f}s avg")
+        return line + " · budget reached" if self.over_budget() else line
+
+class AIScheduler:
+    """Decides when the training has changed enough to be worth another AI analysis.
+
+    Triggers: a new best mAP, detect_overfitting() switching on or off, or the
+    analyze_trend() label changing; never sooner than min_interval epochs after the
+    last analysis and at the latest after max_interval. Failures back off
+    exponentially (in epochs) instead of retrying on every results.txt update.
+    """
+
+    def __init__(self, usage, min_interval=AI_MIN_INTERVAL, max_interval=AI_MAX_INTERVAL):
+        self.usage = usage
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.last_epoch = None  # epoch of the last successful analysis
+        self.last_best = float("-inf")
+        self.last_alarm = False
+        self.last_trend = None
+        self.failures = 0
+        self.retry_epoch = None
+
+    def reason(self, stats):
+        """Why an analysis should run now, or None."""
+        if not stats['epoch'] or self.usage.over_budget():
+            return None
+        epoch = stats['epoch'][-1]
+        if self.retry_epoch is not None:
+            return "retry" if epoch >= self.retry_epoch else None
+        if self.last_epoch is None:
+            return "first"
+        since = epoch - self.last_epoch
+        if since < self.min_interval:
+            return None
+        if since >= self.max_interval:
+            return "max interval"
+        if max(stats['map']) >= self.last_best + AI_NEW_BEST_DELTA:
+            return "new best"
+        if detect_overfitting(stats['map']) != self.last_alarm:
+            return "overfitting alarm"
+        if analyze_trend(stats['map'])[0] != self.last_trend:
+            return "trend flip"
+        return None
+
+    def analyzed(self, stats):
+        self.last_epoch = stats['epoch'][-1] if stats['epoch'] else 0
+        self.last_best = max(stats['map']) if stats['map'] else float("-inf")
+        self.last_alarm = detect_overfitting(stats['map'])
+        self.last_trend = analyze_trend(stats['map'])[0]
+        self.failures = 0
+        self.retry_epoch = None
+
+    def failed(self, stats):
+        epoch = stats['epoch'][-1] if stats['epoch'] else 0
+        self.failures += 1
+        self.retry_epoch = epoch + min(self.max_interval, self.min_interval * 2 ** (self.failures - 1))
+
+# --- Metrics bus (one parser, many viewers) ---
+# Several aquariums on the same run share one mmap'd file in shared memory. The
+# instance holding its flock is the publisher: it parses results.txt, fits the
+# forecasts and makes the AI calls, and writes a snapshot into the next slot of
+# a small ring after every change. The others attach read-only and poll the
+# header; a slot is guarded by a seqlock (odd while being written), so a reader
+# that raced the writer just retries. When the publisher exits its lock is
+# released and the next viewer to notice takes over.
+BUS_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None  # None: the system temp dir
+BUS_SLOTS = 4
+BUS_SLOT_BYTES = 512 * 1024  # ~6000 epochs of results plus the AI analysis
+BUS_POLL_INTERVAL = 0.12     # seconds between viewer polls (one frame)
+BUS_TAKEOVER_INTERVAL = 2.0  # seconds between a viewer's attempts to become the publisher
+BUS_MAGIC = b"FWBUS\x00\x00\x01"
+BUS_HEADER = struct.Struct("<8sIIIQ")  # magic, slots, slot bytes, publisher pid, latest snapshot number
+BUS_HEADER_BYTES = 64
+BUS_SLOT_HEADER = struct.Struct("<QQII")  # seqlock, snapshot number, epochs, state json bytes
+
+def bus_path(results_file):
+    """Shared-memory file for a run, the same for every user watching that results.txt."""
+    import tempfile
+    digest = hashlib.sha1(os.path.realpath(results_file).encode()).hexdigest()[:16]
+    return os.path.join(BUS_DIR or tempfile.gettempdir(), f"fishwell_{digest}.bus")
+
+class MetricsBus:
+    """A run's snapshot ring: publish() on the owning instance, poll() on the viewers."""
+
+    def __init__(self, path, slots=BUS_SLOTS, slot_bytes=BUS_SLOT_BYTES):
+        self.path = path
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.size = BUS_HEADER_BYTES + slots * slot_bytes
+        self.fd = None
+        self.map = None
+        self.publisher = False
+        self.publisher_pid = None
+        self.seen = 0  # number of the last snapshot returned by poll()
+
+    def claim(self):
+        """Become the publisher if nobody holds the run; otherwise (re)attach as a viewer.
+
+        Returns True when this instance is now the publisher.
+        """
+        import fcntl
+        if self.publisher:
+            return True
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            writable = True
+        except PermissionError:
+            fd, writable = os.open(self.path, os.O_RDONLY), False
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            locked = True
+        except OSError:
+            locked = False
+        if locked and writable:
+            if os.fstat(fd).st_size < self.size:
+                os.ftruncate(fd, self.size)
+            self._attach(fd, mmap.ACCESS_WRITE)
+            magic, slots, slot_bytes, _, latest = BUS_HEADER.unpack_from(self.map)
+            if (magic, slots, slot_bytes) != (BUS_MAGIC, self.slots, self.slot_bytes):
+                latest = 0  # new file or another layout: start the ring over
+            BUS_HEADER.pack_into(self.map, 0, BUS_MAGIC, self.slots, self.slot_bytes, os.getpid(), latest)
+            self.publisher = True
+            self.publisher_pid = os.getpid()
+            logging.info("Metrics bus %s: publishing", self.path)
+            return True
+        if locked:
+            os.close(fd)  # a dead publisher's file we cannot write: keep watching the old one
+            return False
+        if self.map is not None and os.fstat(self.fd).st_ino == os.fstat(fd).st_ino:
+            os.close(fd)  # still the same publisher's file
+        else:
+            self._attach(fd, mmap.ACCESS_READ)
+            self.seen = 0
+        return False
+
+    def _attach(self, fd, access):
+        self.close()
+        self.fd = fd
+        try:
+            self.map = mmap.mmap(fd, self.size, access=access)
+        except (ValueError, OSError):
+            self.map = None  # the publisher has not sized the file yet
+
+    def close(self):
+        """Drop the mapping; a publisher removes the file first, so the next instance starts afresh."""
+        if self.publisher:
+            with contextlib.suppress(OSError):
+                os.unlink(self.path)
+            self.publisher = False
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.fd is not None:
+            os.close(self.fd)  # also releases the flock
+            self.fd = None
+
+    def publish(self, stats, state):
+        """Write stats (the RESULTS_KEYS columns) and a JSON-able state dict as the next snapshot."""
+        epochs = len(stats['epoch'])
+        columns = array('d')
+        for key in RESULTS_KEYS:
+            columns.extend(stats[key])
+        blob = json.dumps(state, separators=(",", ":")).encode()
+        payload_bytes = len(columns) * columns.itemsize + len(blob)
+        if BUS_SLOT_HEADER.size + payload_bytes > self.slot_bytes:
+            logging.warning("Metrics bus snapshot of %d bytes does not fit a %d byte slot", payload_bytes,
+                            self.slot_bytes)
+            return False
+        buf = self.map
+        number = BUS_HEADER.unpack_from(buf)[4] + 1
+        base = BUS_HEADER_BYTES + number % self.slots * self.slot_bytes
+        seq = BUS_SLOT_HEADER.unpack_from(buf, base)[0]
+        struct.pack_into("<Q", buf, base, seq + 1)  # odd: being written
+        offset = base + BUS_SLOT_HEADER.size
+        buf[offset:offset + len(columns) * columns.itemsize] = columns.tobytes()
+        offset += len(columns) * columns.itemsize
+        buf[offset:offset + len(blob)] = blob
+        BUS_SLOT_HEADER.pack_into(buf, base, seq + 2, number, epochs, len(blob))
+        struct.pack_into("<Q", buf, BUS_HEADER.size - 8, number)
+        return True
+
+    def poll(self):
+        """(stats, state) of a snapshot newer than the last one returned, else None.
+
+        With nothing new this is a single read of the header from the mapping.
+        Columns are decoded straight out of the shared pages through memoryview.
+        """
+        buf = self.map
+        if buf is None:
+            return None
+        magic, slots, slot_bytes, pid, latest = BUS_HEADER.unpack_from(buf)
+        if magic != BUS_MAGIC or (slots, slot_bytes) != (self.slots, self.slot_bytes) or latest == self.seen:
+            return None
+        self.publisher_pid = pid
+        base = BUS_HEADER_BYTES + latest % self.slots * self.slot_bytes
+        for _ in range(3):
+            seq, number, epochs, blob_bytes = BUS_SLOT_HEADER.unpack_from(buf, base)
+            if seq & 1 or number != latest:
+                continue  # being written, or already reused for a newer snapshot
+            offset = base + BUS_SLOT_HEADER.size
+            column_bytes = epochs * len(RESULTS_KEYS) * 8
+            try:
+                with memoryview(buf)[offset:offset + column_bytes] as raw, raw.cast('d') as values:
+                    stats = {key: values[i * epochs:(i + 1) * epochs].tolist()
+                             for i, key in enumerate(RESULTS_KEYS)}
+                state = json.loads(buf[offset + column_bytes:offset + column_bytes + blob_bytes])
+            except (ValueError, TypeError):
+                continue  # torn read
+            if BUS_SLOT_HEADER.unpack_from(buf, base)[0] == seq:
+                stats['epoch'] = [int(v) for v in stats['epoch']]
+                stats['labels'] = [int(v) for v in stats['labels']]
+                self.seen = latest
+                return stats, state
+        return None
+
+def open_metrics_bus(results_file):
+    """The run's MetricsBus, claimed or attached; None where shared memory or flock is unavailable."""
+    bus = MetricsBus(bus_path(results_file))
+    try:
+        bus.claim()
+    except (ImportError, OSError) as e:
+        logging.warning("Metrics bus unavailable, running standalone: %s", e)
+        bus.close()
+        return None
+    return bus
+
+# --- Application core (one asyncio loop for the whole session) ---
+FRAME_INTERVAL = 0.12        # seconds per aquarium frame
+RESULTS_POLL_INTERVAL = 0.5  # seconds between results.txt stat checks
+MESSAGE_DISPLAY_DURATION = 4  # seconds a backup/advice message stays on screen
+
+def _resolve_future(future, result, error):
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+def run_blocking(func, *args):
+    """Run a blocking call in a daemon thread and return an awaitable future.
+
+    Unlike the default executor, an abandoned call never delays shutdown:
+    cancelling the future just drops the result and the thread dies with the process.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def worker():
+        try:
+            result, error = func(*args), None
+        except Exception as e:
+            result, error = None, e
+        try:
+            loop.call_soon_threadsafe(_resolve_future, future, result, error)
+        except RuntimeError:
+            pass  # loop already closed, nobody is waiting anymore
+
+    threading.Thread(target=worker, daemon=True).start()
+    return future
+
+class DaemonThreadPool:
+    """The part of ThreadPoolExecutor used here (submit/shutdown), on daemon threads.
+
+    concurrent.futures joins its workers at interpreter exit, so a request still in
+    flight there (a hedge that lost, a run past its deadline) would hold up quitting
+    for its whole timeout. As with run_blocking(), these threads die with the process.
+    """
+
+    def __init__(self, max_workers, name="fishwell-worker"):
+        self.max_workers = max_workers
+        self.name = name
+        self.tasks = queue.SimpleQueue()
+        self.idle = threading.Semaphore(0)
+        self.lock = threading.Lock()
+        self.threads = 0
+        self.closed = False
+
+    def submit(self, func, *args):
+        future = concurrent.futures.Future()
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("cannot submit to a pool that was shut down")
+            self.tasks.put((future, func, args))
+            if not self.idle.acquire(blocking=False) and self.threads < self.max_workers:
+                threading.Thread(target=self._work, name=f"{self.name}-{self.threads}", daemon=True).start()
+                self.threads += 1
+        return future
+
+    def _work(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                return
+            future, func, args = task
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(func(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+            self.idle.release()
+
+    def shutdown(self, cancel_futures=False):
+        """Stop the workers once the queue is empty; running calls are never waited for."""
+        with self.lock:
+            self.closed = True
+            if cancel_futures:
+                while True:
+                    try:
+                        task = self.tasks.get_nowait()
+                    except queue.Empty:
+                        break
+                    if task is not None:
+                        task[0].cancel()
+            for _ in range(self.threads):
+                self.tasks.put(None)
+
+async def read_key(stdscr, poll=0.03):
+    """Wait for a key press without blocking the event loop (stdscr must be nodelay)."""
     while True:
-        stdscr.erase()
+        key = stdscr.getch()
+        if key != -1:
+            return key
+        await asyncio.sleep(poll)
+
+async def read_line(stdscr, prompt):
+    """Tiny in-curses line editor. Returns the entered text, or None on Esc."""
+    text = ""
+    curses.curs_set(1)
+    try:
+        while True:
+            h, w = stdscr.getmaxyx()
+            stdscr.clear()
+            line = f"{prompt}{text}"
+            stdscr.addstr(h//2, 2, line[-(w-4):])
+            stdscr.refresh()
+            key = await read_key(stdscr)
+            if key in [curses.KEY_ENTER, 10, 13]:
+                return text.strip()
+            elif key == 27:
+                return None
+            elif key in [curses.KEY_BACKSPACE, 127, 8]:
+                text = text[:-1]
+            elif 32 <= key < 127:
+                text += chr(key)
+    finally:
+        curses.curs_set(0)
+
+def results_signature(results_file):
+    """Cheap change detector for results.txt: (mtime_ns, size), or None if missing."""
+    try:
+        st = os.stat(results_file)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def copy_weights_snapshot(prefix, epoch=None):
+    """Copy best.pt to a timestamped snapshot in WEIGHTS_DIR.
+
+    Returns (path, copied), or (None, False) if there is no best.pt. The snapshot
+    is named after the epoch stored in best.pt when it can be read (else epoch,
+    else the latest results.txt epoch). If a snapshot of the same checkpoint
+    already exists, its path is returned with copied False instead of copying again.
+    Raises BackupSpaceError if the copy would leave less than BACKUP_MIN_FREE_BYTES free.
+    """
+    if not os.path.exists(WEIGHTS_DIR):
+        os.makedirs(WEIGHTS_DIR)
+    if not os.path.exists(BEST_PT):
+        return None, False
+    size = os.path.getsize(BEST_PT)
+    meta = read_checkpoint_meta(BEST_PT)
+    if meta and isinstance(meta.get("epoch"), int) and meta["epoch"] >= 0:  # strip_optimizer() sets -1
+        epoch = meta["epoch"]
+        existing = unchanged_snapshot(WEIGHTS_DIR, meta, size)
+        if existing:
+            logging.info("best.pt (epoch %s, fitness %s) is already in %s, not copied again",
+                         epoch, meta.get("best_fitness"), existing)
+            return existing, False
+    ensure_backup_space(size, WEIGHTS_DIR)
+    if epoch is None:
+        epochs = parse_results_cached(RESULTS_FILE)["epoch"]
+        epoch = epochs[-1] if epochs else None
+    created = int(time.time())
+    suffix = f"_e{epoch}" if epoch is not None else ""
+    backup_path = os.path.join(WEIGHTS_DIR, f"{prefix}_{created}{suffix}.pt")
+    # Hash while copying, for the catalog
+    digest = hashlib.sha256()
+    with open(BEST_PT, "rb") as src, open(backup_path, "wb") as dst:
+        for chunk in iter(lambda: src.read(1 << 20), b""):
+            digest.update(chunk)
+            dst.write(chunk)
+    shutil.copystat(BEST_PT, backup_path)
+    catalog_snapshot(backup_path, prefix, epoch, created, digest.hexdigest())
+    return backup_path, True
+
+# --- Box view models ---
+# The info boxes change once per epoch or per AI reply, but are drawn every frame.
+# Their laid-out lines are built by the pure functions below and memoised in a
+# ViewModelCache keyed by the app's metrics/analysis versions and the box width.
+
+class ViewModelCache:
+    """Laid-out line lists per box, rebuilt only when the key they were built for changes.
+
+    Callers get the cached list itself and must copy it before changing it.
+    """
+
+    def __init__(self):
+        self.entries = {}  # box -> (key, lines)
+        self.builds = 0
+
+    def get(self, box, key, build, *args):
+        entry = self.entries.get(box)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        lines = build(*args)
+        self.entries[box] = (key, lines)
+        self.builds += 1
+        return lines
+
+def left_box_lines(stats, best_map, extra_line, width, max_lines, planned_epochs=None, timing=""):
+    """Latest epoch, mAP, loss, GPU memory, P/R, the timing summary and one extra line
+    (comparison delta or forecast), wrapped for the left box."""
+    if not stats or not stats['map']:
+        return wrap_lines(["No results yet or results.txt is empty."], width)[:max_lines]
+    epoch_num = stats['epoch'][-1] if stats['epoch'] else 0
+    epoch = f"{epoch_num}/{planned_epochs - 1}" if planned_epochs else f"{epoch_num}"
+    # parse_results() keeps YOLOv7's gpu_mem column (e.g. "10.2G") under 'gflops'
+    mem = f"  Mem: {stats['gflops'][-1]:.1f}G" if stats['gflops'] else ""
+    lines = [
+        f"Epoch: {epoch} mAP@.5: {stats['map'][-1]:.4f} (Best: {best_map:.4f})",
+        f"Loss: {stats['loss'][-1]:.4f}  Labels: {stats['labels'][-1] if stats['labels'] else 0}{mem}",
+        f"P: {stats['precision'][-1]:.4f}  R: {stats['recall'][-1]:.4f}  {timing}".rstrip(),
+        extra_line,
+    ]
+    return wrap_lines(lines, width)[:max_lines]
+
+def center_summary_lines(ai_feedback, box_w, box_h):
+    """The AI summary as centred bullets, one per sentence, padded to the box height."""
+    summary_bullets = []
+    for line in wrap_lines([ai_feedback.get('summary', 'No summary.')], box_w-10):
+        for sent in line.split('. '):
+            sent = sent.strip()
+            if sent:
+                summary_bullets.append(f"• {sent}")
+    lines = [''] * ((box_h - len(summary_bullets)) // 2)
+    lines.extend(line.center(box_w-4) for line in summary_bullets)
+    lines.extend([''] * (box_h - len(lines)))
+    return lines
+
+def right_box_lines(ai_feedback, width):
+    """Risks, trends, recommendations and metrics from the AI, with a blank line between sections."""
+    if ai_feedback and ai_feedback.get('error'):
+        return ["AI Feedback unavailable."]
+    if not ai_feedback:
+        return ["Waiting for AI feedback..."]
+    lines = []
+    for key, title, bullet in [('risks', 'Risks:', '-'), ('trends', 'Trends:', '-'),
+                               ('recommendations', 'Recommendations:', '*'), ('metrics', 'Metrics:', '•')]:
+        if ai_feedback.get(key):
+            if lines:
+                lines.append('')
+            lines.append(title)
+            lines.extend(wrap_lines([f"{bullet} {item}" for item in ai_feedback[key]], width))
+    return lines
+
+def draw_box_border(stdscr, box_y, box_x, box_h, box_w, max_y, max_x):
+    """Draw a '-'/'|' border with '+' corners, clipped to the screen."""
+    for i in range(box_w):
+        if 0 <= box_y < max_y and 0 <= box_x + i < max_x:
+            stdscr.addch(box_y, box_x + i, ord('-'), curses.color_pair(5))
+        if 0 <= box_y + box_h - 1 < max_y and 0 <= box_x + i < max_x:
+            stdscr.addch(box_y + box_h - 1, box_x + i, ord('-'), curses.color_pair(5))
+    for i in range(box_h):
+        if 0 <= box_y + i < max_y and 0 <= box_x < max_x:
+            stdscr.addch(box_y + i, box_x, ord('|'), curses.color_pair(5))
+        if 0 <= box_y + i < max_y and 0 <= box_x + box_w - 1 < max_x:
+            stdscr.addch(box_y + i, box_x + box_w - 1, ord('|'), curses.color_pair(5))
+    # Corners
+    for cy, cx in [(box_y, box_x), (box_y, box_x + box_w - 1),
+                   (box_y + box_h - 1, box_x), (box_y + box_h - 1, box_x + box_w - 1)]:
+        if 0 <= cy < max_y and 0 <= cx < max_x:
+            stdscr.addch(cy, cx, ord('+'), curses.color_pair(5))
+
+# Messages for each backup kind: (success, no best.pt found)
+BACKUP_MESSAGES = {
+    "backup": ("✅ Weights backed up to {path}", "❌ No weight file found to backup."),
+    "manual": ("✅ Weights saved to {path} (manual)", "❌ No weight file found to save."),
+    "overfit": ("✅ Weights auto-saved to {path} (overfitting)", "❌ No weight file found to auto-save."),
+}
+
+class AquariumApp:
+    """One monitoring session: the shared state plus the tasks that update and draw it.
+
+    Everything runs on a single asyncio loop. Parsing, AI requests, backups and
+    life advice go through run_blocking, so the render task keeps reading keys
+    every FRAME_INTERVAL however slow the disk or the network is.
+    """
+
+    def __init__(self, stdscr, ai_provider=None):
+        self.stdscr = stdscr
+        self.stop_event = asyncio.Event()
+        self.tasks = []
+        self.first_frame_ms = None
+        # Metrics state (updated by watch_results)
+        self.stats = None
+        self.current_epoch = 0
+        self.map_history = []
+        self.best_map = 0.0
+        self.history_trees = {}
+        self.history_view = None
+        self.comparison = None       # RunComparison while the [C] view is on
+        self.comparison_loading = False
+        self.forecasters = {"map": CurveForecaster("map"), "loss": CurveForecaster("loss")}
+        self.forecast_lock = threading.Lock()
+        self.forecast = None         # {"map": ..., "loss": ...} from CurveForecaster.forecast()
+        self.forecast_line = None
+        self.run_plan = None         # read_run_plan() of the watched run, loaded in the background
+        self.throughput = EpochThroughput()
+        self.timing_line = ""        # ETA / seconds per epoch, rebuilt per epoch
+        self.train_log = None        # TrainLogTail once a console log is found
+        # AI state (updated by ai_worker)
+        if ai_provider is None:
+            ai_provider = DeltaAnalysis().analyze if AI_DELTA_PROMPTS else get_ai_analysis
+        self.ai_provider = ai_provider
+        self.ai_wakeup = asyncio.Event()
+        self.ai_feedback = None
+        # Bumped whenever stats / ai_feedback are replaced; the view-model cache keys on them
+        self.metrics_version = 0
+        self.analysis_version = 0
+        self.view_cache = ViewModelCache()
+        self.ai_usage = AIUsage(os.path.join(os.path.dirname(RESULTS_FILE), AI_USAGE_FILE))
+        self.ai_scheduler = AIScheduler(self.ai_usage)
+        self.overfit_auto_backup_epoch = None
+        self.early_stop = EarlyStopController(RUN_NAME, os.path.dirname(RESULTS_FILE))
+        self.bus = None              # MetricsBus; a viewer gets stats and analyses from its publisher
+        self.compressing = set()  # snapshot paths handed to the compression pool
+        # Transient messages
+        self.backup_message = None
+        self.backup_message_time = 0
+        self.advice_message = None
+        self.advice_message_time = 0
+        self.advice_pool = AdvicePool(os.path.join(os.path.expanduser(RUNS_BASE_PATH), ADVICE_POOL_FILE))
+        self.advice_wakeup = asyncio.Event()
+        self.advice_waiting = False  # [L] found the pool empty; show the next refill's first piece
+        # Animation state
+        self.fish_list = []
+        self.sprite_sheet = load_sprite_sheet()
+        self.fish_sprites = self.sprite_sheet.fish
+        self.fish_pool = SpritePool()
+        self.fish_target = 4
+        self.occupancy = None  # BoxOccupancy for the current terminal size
+        self.duck_x = 0
+        self.duck_dir = 1
+        self.spinner = itertools.cycle(['|', '/', '-', '\\'])
+
+    # --- lifecycle ---
+    def stop(self):
+        self.stop_event.set()
+
+    def spawn(self, coro):
+        """Start a task owned by the app; it is cancelled on shutdown."""
+        self.tasks = [t for t in self.tasks if not t.done()]
+        task = asyncio.ensure_future(coro)
+        self.tasks.append(task)
+        return task
+
+    async def run(self):
+        curses.curs_set(0)
+        self.stdscr.nodelay(True)
+        curses.start_color()
+        curses.use_default_colors()
+        curses.init_pair(1, curses.COLOR_YELLOW, -1)  # Fish
+        curses.init_pair(2, curses.COLOR_CYAN, -1)    # Info, seaweed
+        curses.init_pair(3, curses.COLOR_MAGENTA, -1) # Crab
+        curses.init_pair(4, curses.COLOR_WHITE, -1)   # Bubbles
+        curses.init_pair(5, curses.COLOR_GREEN, -1)   # Info box border
+        curses.init_pair(6, curses.COLOR_RED, -1)     # Warnings/errors
+        loop = asyncio.get_running_loop()
+        try:
+            # Ctrl-C just flags shutdown; the render task notices it within one frame
+            loop.add_signal_handler(signal.SIGINT, self.stop)
+        except (NotImplementedError, RuntimeError):
+            pass  # no signal handlers on this platform, KeyboardInterrupt still works
+        self.bus = open_metrics_bus(RESULTS_FILE) if METRICS_BUS else None
+        if self.bus and not self.bus.publisher:
+            logging.info("Metrics bus %s: viewing, pid %s owns the run", self.bus.path, self.bus.publisher_pid)
+            self.follow_bus()  # whatever the publisher has shared so far, before the first frame
+            self.spawn(self.bus_viewer())
+        else:
+            self.own_run()
+        self.spawn(self.advice_worker())
+        self.spawn(self.watch_train_log())
+        try:
+            await self.render_loop()
+        finally:
+            for task in self.tasks:
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+            if self.bus:
+                self.bus.close()
+            shutdown_compression_pool()
+            try:
+                loop.remove_signal_handler(signal.SIGINT)
+            except (NotImplementedError, RuntimeError):
+                pass
+            logging.info("Aquarium UI stopped")
+
+    def own_run(self):
+        """Parse results.txt and start the tasks that only the run's owner runs: parsing, forecasts, AI."""
+        # Local data first: the dashboard is drawn before the AI has said anything
+        with log_timing("parse_results"):
+            stats = parse_results(RESULTS_FILE)
+        signature = results_signature(RESULTS_FILE)
+        self.on_new_stats(stats, signature[0] / 1e9 if signature else None)
+        self.spawn(self.watch_results())
+        self.spawn(self.load_run_plan())
+        self.spawn(self.ai_worker())
+        if self.early_stop.mode != "off":
+            self.spawn(self.early_stop_worker())
+
+    # --- background tasks ---
+    async def bus_viewer(self):
+        """Show the publisher's snapshots; take the run over once its publisher has gone."""
+        next_claim = time.monotonic() + BUS_TAKEOVER_INTERVAL
+        while True:
+            await asyncio.sleep(BUS_POLL_INTERVAL)
+            self.follow_bus()
+            if time.monotonic() < next_claim:
+                continue
+            next_claim = time.monotonic() + BUS_TAKEOVER_INTERVAL
+            if self.bus.claim():
+                logging.info("Metrics bus publisher gone, taking over %s", RUN_NAME)
+                self.set_backup_message("🐟 The other aquarium closed, this one owns the run now")
+                if self.ai_feedback and not self.ai_feedback.get('error') and self.stats:
+                    self.ai_scheduler.analyzed(self.stats)  # the shared analysis counts, no extra API call
+                self.own_run()
+                self.advice_wakeup.set()  # start prefetching advice
+                return
+
+    def follow_bus(self):
+        snapshot = self.bus.poll()
+        if snapshot is None:
+            return
+        stats, state = snapshot
+        first = self.stats is None
+        self.stats = stats
+        self.metrics_version += 1
+        update_history_trees(self.history_trees, stats)
+        self.map_history = stats['map']
+        self.current_epoch = stats['epoch'][-1] if stats['epoch'] else 0
+        self.best_map = state["best_map"]
+        self.run_plan = state["run_plan"]
+        self.forecast = state["forecast"]
+        self.forecast_line = state["forecast_line"]
+        self.timing_line = state["timing_line"]
+        self.throughput.restore(state["throughput"])
+        self.ai_usage.counters.update(state["ai_usage"])
+        if state["ai_feedback"] != self.ai_feedback:
+            self.set_ai_feedback(state["ai_feedback"])
+        if first:
+            self.set_backup_message(f"👀 Viewing {RUN_NAME} through pid {self.bus.publisher_pid}'s aquarium")
+
+    def publish_bus(self):
+        self.bus.publish(self.stats, {
+            "best_map": self.best_map,
+            "run_plan": self.run_plan,
+            "forecast": self.forecast,
+            "forecast_line": self.forecast_line,
+            "timing_line": self.timing_line,
+            "throughput": self.throughput.shared_state(),
+            "ai_usage": self.ai_usage.counters,
+            "ai_feedback": self.ai_feedback,
+        })
+
+    async def watch_train_log(self):
+        """Follow the console log for the batch counter, rate and running losses inside an epoch."""
+        while True:
+            if self.train_log is None:
+                path = find_train_log(os.path.dirname(RESULTS_FILE))
+                if path:
+                    logging.info("Following console log %s", path)
+                    self.train_log = TrainLogTail(path)
+            if self.train_log and await run_blocking(self.train_log.read):
+                progress = self.train_log.progress
+                if progress["phase"] == "train":
+                    METRICS_EXPORTER.publish_run(RUN_NAME, {"train_iteration": progress["iteration"],
+                                                            "train_iterations": progress["total"],
+                                                            "train_it_per_second": progress["rate"],
+                                                            "train_running_loss": progress["loss"]})
+            await asyncio.sleep(TRAIN_LOG_POLL_INTERVAL)
+
+    async def watch_results(self):
+        """Re-parse results.txt whenever its size or mtime changes."""
+        last_signature = results_signature(RESULTS_FILE)
+        while True:
+            await asyncio.sleep(RESULTS_POLL_INTERVAL)
+            signature = results_signature(RESULTS_FILE)
+            if signature != last_signature:
+                with log_timing("parse_results", size=signature[1] if signature else 0):
+                    stats = await run_blocking(parse_results, RESULTS_FILE)
+                last_signature = signature
+                self.on_new_stats(stats, signature[0] / 1e9 if signature else time.time())
+
+    def on_new_stats(self, stats, append_time=None):
+        first = self.stats is None
+        self.stats = stats
+        self.throughput.observe(len(stats['epoch']), append_time or time.time())
+        self.metrics_version += 1
+        update_history_trees(self.history_trees, stats)
+        self.map_history = stats['map']
+        if stats['map']:
+            self.best_map = max(self.best_map, max(stats['map']))
+        previous_epoch = self.current_epoch
+        self.current_epoch = stats['epoch'][-1] if stats['epoch'] else 0
+        if not first:
+            self.update_forecast()  # the first, full-history fit runs off the loop in load_run_plan
+        if first or self.current_epoch != previous_epoch:
+            self.publish_metrics()
+        reason = self.ai_scheduler.reason(stats)
+        if reason and not self.ai_wakeup.is_set():
+            logging.info("AI analysis scheduled at epoch %s: %s", self.current_epoch, reason)
+            self.ai_wakeup.set()
+
+    async def load_run_plan(self):
+        self.run_plan = await run_blocking(read_run_plan, os.path.dirname(RESULTS_FILE))
+        # Seed the epoch timing with the average so far: opt.yaml written to the last append
+        started, last_append = self.run_plan["started"], self.throughput.last_append
+        if started and last_append and self.stats and self.stats['epoch'] and last_append > started:
+            self.throughput.seed((last_append - started) / len(self.stats['epoch']))
+        await run_blocking(self.update_forecast)
+        if self.bus and self.bus.publisher:
+            self.publish_bus()  # viewers get the plan, ETA and forecast without waiting for an epoch
+
+    def seconds_per_epoch(self):
+        return self.throughput.median
+
+    def update_forecast(self):
+        """Feed new epochs to the learning-curve fits; rebuild the forecast and timing lines."""
+        stats = self.stats
+        if not stats or not stats['epoch']:
+            return
+        with self.forecast_lock:  # the first call runs on a worker thread
+            for forecaster in self.forecasters.values():
+                forecaster.update(stats)
+        plan = self.run_plan or {}
+        self.timing_line = self.throughput.summary(plan.get("epochs"))
+        final_epoch = plan["epochs"] - 1 if plan.get("epochs") else None
+        forecast_map = self.forecasters["map"].forecast(self.current_epoch, final_epoch)
+        if forecast_map is None:
+            self.forecast = self.forecast_line = None
+            return
+        self.forecast = {"map": forecast_map,
+                         "loss": self.forecasters["loss"].forecast(self.current_epoch, forecast_map["epoch"])}
+        self.forecast_line = forecast_label(forecast_map, self.current_epoch, self.seconds_per_epoch(),
+                                            plan.get("gpus", 1))
+
+    async def ai_worker(self):
+        """Run one AI analysis at a time whenever watch_results asks for one."""
+        while True:
+            await self.ai_wakeup.wait()
+            self.ai_wakeup.clear()
+            stats = self.stats
+            epoch = self.current_epoch
+            if not self.ai_scheduler.reason(stats):
+                continue  # already analysed, or the budget ran out, while this wakeup was pending
+            start = time.monotonic()
+            try:
+                with log_timing("ai_analysis", logging.INFO, epoch=epoch):
+                    feedback = await run_blocking(self.ai_provider, stats)
+            except Exception as e:
+                logging.error("AI feedback error: %s", e)
+                feedback = None
+            failed = not feedback or bool(feedback.get('error'))
+            self.ai_usage.record(time.monotonic() - start, feedback.get('usage') if feedback else None, failed)
+            await run_blocking(self.ai_usage.save, dict(self.ai_usage.counters))
+            if failed:
+                self.ai_scheduler.failed(stats)
+                # Keep showing the last good analysis rather than an error
+                if not self.ai_feedback or self.ai_feedback.get('error'):
+                    self.set_ai_feedback(feedback)
+            else:
+                self.ai_scheduler.analyzed(stats)
+                self.set_ai_feedback(feedback)
+            self.publish_metrics()
+            if self.ai_feedback and not self.ai_feedback.get('error') and self.ai_feedback.get('isoverfitted', False):
+                if self.overfit_auto_backup_epoch != epoch:
+                    self.spawn(self.run_backup("overfit", epoch))
+
+    async def early_stop_worker(self):
+        """Feed verdicts to the early-stop controller; act once its grace period is over."""
+        while True:
+            await asyncio.sleep(EARLY_STOP_POLL_INTERVAL)
+            ai_overfit = bool(self.ai_feedback and not self.ai_feedback.get('error')
+                              and self.ai_feedback.get('isoverfitted', False))
+            if self.stats and self.early_stop.observe(self.stats['map'], ai_overfit):
+                with log_timing("early_stop", logging.WARNING, run=RUN_NAME, mode=self.early_stop.mode):
+                    await run_blocking(self.early_stop.stop_training, self.current_epoch)
+                if self.early_stop.backup_path:
+                    self.spawn(self.enforce_backup_retention())
+
+    async def load_comparison(self):
+        """Load every other run in runs/train (in parallel, cached) for the [C] view."""
+        self.comparison_loading = True
+        self.set_backup_message("⏳ Loading previous runs...")
+        try:
+            runs = find_all_training_runs()
+            with log_timing("load_runs", logging.INFO, runs=len(runs)):
+                run_stats = await run_blocking(load_runs, runs)
+            self.comparison = RunComparison(RUN_NAME, run_stats)
+            self.set_backup_message(f"📊 Comparing against {len(self.comparison.ranked)} runs [N] baseline [M] metric")
+        except Exception as e:
+            logging.error("Loading runs for comparison failed: %s", e)
+            self.set_backup_message(f"❌ Could not load runs: {e}")
+        finally:
+            self.comparison_loading = False
+
+    def publish_metrics(self):
+        """Push the latest epoch's values to the Prometheus snapshot and the metrics bus."""
+        stats = self.stats
+        if self.bus and self.bus.publisher:
+            self.publish_bus()
+        values = {"best_map": self.best_map,
+                  "overfit_local": int(detect_overfitting(stats['map'])),
+                  "overfit_ai": int(bool(self.ai_feedback and self.ai_feedback.get('isoverfitted'))),
+                  "ai_calls": self.ai_usage.counters["calls"],
+                  "ai_tokens": self.ai_usage.tokens,
+                  "ai_cost_usd": self.ai_usage.counters["cost_usd"]}
+        for key in ["epoch", "map", "precision", "recall", "loss", "box_loss", "cls_loss"]:
+            values[key] = stats[key][-1] if stats[key] else None
+        forecast = self.forecast or {}
+        values["forecast_map"] = forecast["map"]["value"] if forecast.get("map") else None
+        values["forecast_plateau_epoch"] = forecast["map"]["plateau_epoch"] if forecast.get("map") else None
+        values["forecast_loss"] = forecast["loss"]["value"] if forecast.get("loss") else None
+        values["gpu_mem_gb"] = stats['gflops'][-1] if stats['gflops'] else None
+        values["epoch_seconds"] = self.throughput.median
+        values["eta_seconds"] = self.throughput.eta(self.run_plan["epochs"] if self.run_plan else None)
+        values["slow_epochs"] = self.throughput.slow_epochs
+        METRICS_EXPORTER.publish_run(RUN_NAME, values)
+
+    async def run_backup(self, kind, epoch=None):
+        ok_message, missing_message = BACKUP_MESSAGES[kind]
+        self.set_backup_message("⏳ Saving weights...")
+        try:
+            with log_timing("backup", logging.INFO, kind=kind):
+                backup_path, _ = await run_blocking(copy_weights_snapshot, kind, self.current_epoch)
+        except Exception as e:
+            self.set_backup_message(f"❌ Backup failed: {e}")
+            logging.error("%s backup failed: %s", kind, e)
+            return
+        if backup_path:
+            METRICS_EXPORTER.add("backup_bytes", os.path.getsize(backup_path))
+            self.set_backup_message(ok_message.format(path=backup_path))
+            logging.info("%s backup completed: %s", kind, backup_path)
+            if kind == "overfit":
+                self.overfit_auto_backup_epoch = epoch
+            self.spawn(self.enforce_backup_retention())
+        else:
+            self.set_backup_message(missing_message)
+            logging.warning("No weight file found for %s backup", kind)
+
+    async def enforce_backup_retention(self):
+        """Thin the snapshots after a backup and compress older ones in the process pool."""
+        try:
+            to_compress = await run_blocking(apply_backup_retention, WEIGHTS_DIR, self.map_history,
+                                             frozenset(self.compressing))
+        except Exception as e:
+            logging.error("Backup retention failed: %s", e)
+            return
+        if not to_compress:
+            return
+        pool = compression_pool()
+        self.compressing.update(to_compress)
+        try:
+            with log_timing("compress_backups", logging.INFO, files=len(to_compress)):
+                results = await asyncio.gather(
+                    *(asyncio.wrap_future(pool.submit(compress_snapshot, path)) for path in to_compress),
+                    return_exceptions=True)
+        finally:
+            self.compressing.difference_update(to_compress)
+        for path, result in zip(to_compress, results):
+            if isinstance(result, BaseException):
+                logging.error("Compressing %s failed: %s", path, result)
+            elif os.path.exists(path + ".gz"):
+                try:
+                    await run_blocking(backup_catalog().moved, path, path + ".gz")
+                except Exception as e:
+                    logging.error("Could not update the backup catalog for %s: %s", path, e)
+
+    async def advice_worker(self):
+        """Keep the advice pool topped up; answer an [L] press that found it empty.
+
+        Only the run's owner prefetches and saves the pool. A bus viewer reads the
+        owner's pool file when its own copy runs dry, and asks the API itself only
+        for an [L] press that still finds nothing.
+        """
+        pool = self.advice_pool
+        await run_blocking(pool.load)
+        while True:
+            viewer = self.bus is not None and not self.bus.publisher
+            if viewer and self.advice_waiting and not pool.items:
+                await run_blocking(pool.load)
+            # Without an API key for any provider, only fetch when someone actually asked
+            prefetch = not viewer and any(provider.configured() for provider in ai_providers())
+            if pool.low() and (prefetch or self.advice_waiting and not pool.items) and not pool.refill_wait():
+                try:
+                    with log_timing("life_advice", logging.INFO):
+                        await run_blocking(pool.refill)
+                except Exception as e:
+                    logging.error("Failed to get life advice: %s", e)
+                    if self.advice_waiting:
+                        self.advice_waiting = False
+                        self.set_advice_message(f"❌ Failed to get life advice: {e}")
+            elif pool.dirty and not viewer:
+                await run_blocking(pool.save)
+            if self.advice_waiting:
+                advice = pool.take()
+                if advice:
+                    self.advice_waiting = False
+                    self.set_advice_message(advice)
+            self.advice_wakeup.clear()
+            refill_due = pool.low() and (prefetch or self.advice_waiting)
+            try:
+                await asyncio.wait_for(self.advice_wakeup.wait(), max(pool.refill_wait(), 0.5) if refill_due else None)
+            except asyncio.TimeoutError:
+                pass
+
+    def set_ai_feedback(self, feedback):
+        self.ai_feedback = feedback
+        self.analysis_version += 1
+
+    def set_backup_message(self, message):
+        self.backup_message = message
+        self.backup_message_time = time.time()
+
+    def set_advice_message(self, message):
+        self.advice_message = message
+        self.advice_message_time = time.time()
+
+    # --- input ---
+    def handle_key(self, key):
+        logging.debug("Aquarium keypress: %s", key)
+        if self.history_view is not None:
+            if not self.history_view.handle_key(key):
+                self.history_view = None
+            return
+        if key == ord('q'):
+            self.stop()
+        elif key in [ord('b'), ord('B')]:
+            logging.info("[B] key pressed for backup")
+            self.spawn(self.run_backup("backup"))
+        elif key in [ord('s'), ord('S')]:
+            logging.info("[S] key pressed for overfitting/manual save")
+            self.spawn(self.run_backup("manual"))
+        elif key in [ord('l'), ord('L')]:
+            logging.info("[L] key pressed for life advice")
+            advice = self.advice_pool.take()
+            if advice:
+                self.set_advice_message(advice)
+            else:
+                self.advice_waiting = True
+                self.set_advice_message("🔮 Asking the oracle...")
+            self.advice_wakeup.set()  # persist the take, or refill
+        elif key in [ord('h'), ord('H')]:
+            logging.info("[H] key pressed for history browser")
+            self.history_view = HistoryBrowser(self.history_trees)
+        elif key in [ord('c'), ord('C')]:
+            if self.comparison is not None:
+                self.comparison = None
+            elif not self.comparison_loading:
+                logging.info("[C] key pressed for run comparison")
+                self.spawn(self.load_comparison())
+        elif key in [ord('n'), ord('N')] and self.comparison is not None:
+            self.comparison.next_baseline()
+        elif key in [ord('m'), ord('M')] and self.comparison is not None:
+            self.comparison.next_metric()
+        elif key in [ord('y'), ord('Y')] and self.early_stop.state == "confirm":
+            logging.info("[Y] key pressed to confirm early stop")
+            self.spawn(run_blocking(self.early_stop.confirm))
+        elif key in [ord('x'), ord('X')] and self.early_stop.state in ("armed", "confirm"):
+            self.early_stop.cancel()
+        else:
+            # Any other key clears messages
+            self.backup_message = None
+            self.advice_message = None
+
+    # --- rendering ---
+    async def render_loop(self):
+        while not self.stop_event.is_set():
+            frame_start = time.monotonic()
+            while True:
+                key = self.stdscr.getch()
+                if key == -1:
+                    break
+                self.handle_key(key)
+            if self.stop_event.is_set():
+                break
+            self.stdscr.erase()
+            try:
+                if self.history_view is not None:
+                    self.history_view.draw(self.stdscr)
+                else:
+                    self.draw_frame()
+            except curses.error:
+                pass  # terminal resized mid-frame; the next frame redraws everything
+            self.stdscr.refresh()
+            EVENT_TIMINGS.record("frame", time.monotonic() - frame_start)
+            self.frame_drawn()
+            if self.first_frame_ms is None:
+                self.first_frame_ms = (time.perf_counter() - PROCESS_START) * 1000
+                logging.info("First frame drawn %.1f ms after start", self.first_frame_ms)
+            remaining = FRAME_INTERVAL - (time.monotonic() - frame_start)
+            try:
+                await asyncio.wait_for(self.stop_event.wait(), max(0.0, remaining))
+            except asyncio.TimeoutError:
+                pass
+
+    def frame_drawn(self):
+        """Called once a frame has reached the terminal; a hook for ReplayApp."""
+
+    def on_resize(self, max_y, max_x, box_areas):
+        """Rebuild the box index and fit the school of fish to the new tank size."""
+        self.occupancy = BoxOccupancy(max_y, max_x, box_areas)
+        self.fish_target = max(4, max_x * max_y // FISH_CELLS_PER_FISH)
+        y_max = max_y - INFO_BOX_HEIGHT - 6
+        keep = []
+        for fish in self.fish_list:
+            if len(keep) < self.fish_target and fish.y <= y_max and fish.x + fish.length <= max_x:
+                keep.append(fish)
+            else:
+                self.fish_pool.release(fish)
+        self.fish_list = keep
+
+    def spawn_fish(self, max_x, max_y):
+        """Place a pooled fish on a free row at its entry edge, or return None if nothing fits."""
+        sprite = random.choice(self.fish_sprites)
+        x = 0 if sprite.dir == 1 else max_x - sprite.width - 1
+        rows = self.occupancy.free_spawn_rows(sprite, x, 4, max_y-INFO_BOX_HEIGHT-6)
+        if not rows:
+            return None
+        return self.fish_pool.acquire(random.choice(rows), x, sprite)
+
+    def draw_frame(self):
+        stdscr = self.stdscr
+        min_height = INFO_BOX_HEIGHT + 8
+        min_width = INFO_BOX_WIDTH * 3 + 8
         max_y, max_x = stdscr.getmaxyx()
         if max_y < min_height or max_x < min_width:
             warning = f"Terminal too small! Resize to at least {min_width}x{min_height}."
             stdscr.addstr(0, 0, warning[:max_x-1])
-            stdscr.refresh()
-            time.sleep(0.5)
-            continue
+            return
+        sheet = self.sprite_sheet
         # Draw ASCII art (logo) at the top
-        for i, line in enumerate(ASCII_ART):
-            y = i+1
-            x = (max_x - len(line))//2
-            if 0 <= y < max_y and 0 <= x < max_x:
-                stdscr.addstr(y, x, line[:max_x-x], curses.A_BOLD)
+        for dy, x, text in sheet.layout("logo", max_x):
+            if dy+1 < max_y:
+                stdscr.addstr(dy+1, x, text, curses.A_BOLD)
         # Info box positions
         box_w = INFO_BOX_WIDTH
         box_h = INFO_BOX_HEIGHT
@@ -897,212 +4364,102 @@ def aquarium(stdscr):
             (center_box_y, center_box_x, box_h, box_w),
             (right_box_y, right_box_x, box_h, box_w)
         ]
+        if self.occupancy is None or (self.occupancy.max_y, self.occupancy.max_x) != (max_y, max_x):
+            self.on_resize(max_y, max_x, box_areas)
+        occupancy = self.occupancy
         # Animate seaweed (avoid info box area)
+        phase = int(time.time()*2)
         for y in range(max_y-2, max_y):
-            for x in range(0, max_x, 4):
-                in_box = False
-                for (by, bx, bh, bw) in box_areas:
-                    if by <= y < by+bh and bx <= x < bx+bw:
-                        in_box = True
-                        break
-                if not in_box and 0 <= y < max_y and 0 <= x < max_x-3:
-                    stdscr.addstr(y, x, SEAWEED[(x//4 + int(time.time()*2))%2][:max_x-x], curses.color_pair(2))
-        # Animate fish (avoid info box area, but not logo)
-        if len(fish_list) < 4:
-            fish_list.append(spawn_fish(max_x, max_y, box_areas))
-        for fish in fish_list:
+            for x in range(0, max_x-3, 4):
+                if occupancy.is_free(y, x):
+                    stdscr.addstr(y, x, SEAWEED[(x//4 + phase)%2], curses.color_pair(2))
+        # Animate fish (hidden behind info boxes, but not the logo)
+        if len(self.fish_list) < self.fish_target:
+            fish = self.spawn_fish(max_x, max_y)
+            if fish is not None:
+                self.fish_list.append(fish)
+        fish_attr = curses.color_pair(1)
+        for fish in self.fish_list:
             fish.move(max_x, max_y)
-            frame = fish.get_frame()
-            for i, line in enumerate(frame):
-                draw_y = fish.y + i
-                draw_x = fish.x
-                in_box = False
-                for (by, bx, bh, bw) in box_areas:
-                    if by <= draw_y < by+bh and bx <= draw_x < bx+bw:
-                        in_box = True
-                        break
-                if not in_box and 0 <= draw_y < max_y and 0 <= draw_x < max_x - len(line):
-                    stdscr.addstr(draw_y, draw_x, line[:max_x-draw_x], curses.color_pair(1))
-            if fish.bubble and fish.bubble_active and 0 < fish.bubble_y < max_y and 0 < fish.bubble_x < max_x:
-                stdscr.addstr(fish.bubble_y, fish.bubble_x, "o", curses.color_pair(4))
+            draw_sprite(stdscr, fish, occupancy, fish_attr)
         # Animate a crab (optional)
-        crab = [
-            "      ,~~.",
-            " ,   (  - )>",
-            " )`~~'   (",
-            "(  .__)   )",
-            " `-.____,' "
-        ]
         crab_y = max_y-7
-        crab_x = (max_x//2)-8
-        for i, line in enumerate(crab):
-            if 0 <= crab_y+i < max_y and 0 <= crab_x < max_x:
-                stdscr.addstr(crab_y+i, crab_x, line[:max_x-crab_x], curses.color_pair(3))
+        for dy, x, text in sheet.layout("crab", max_x, (max_x//2)-8):
+            if 0 <= crab_y+dy < max_y:
+                stdscr.addstr(crab_y+dy, x, text, curses.color_pair(3))
         # --- Info/analysis box drawing ---
-        stats = parse_results(RESULTS_FILE)
-        current_epoch = stats['epoch'][-1] if stats and stats['epoch'] else 0
-        # Call AI feedback every N epochs
-        if stats and stats['epoch'] and (current_epoch - ai_last_epoch >= AI_FEEDBACK_INTERVAL):
-            try:
-                ai_feedback = get_ai_analysis(stats)
-                ai_last_epoch = current_epoch
-            except Exception as e:
-                logging.error(f"AI feedback error: {e}")
-                ai_feedback = None
+        stats = self.stats
+        ai_feedback = self.ai_feedback
+        view = self.view_cache
         # LEFT BOX: mAP line chart + stats
-        left_lines = []
-        if stats and stats['map']:
-            map_history.append(stats['map'][-1])
-            loss_history.append(stats['loss'][-1])
-            box_loss_history.append(stats['box_loss'][-1])
-            cls_loss_history.append(stats['cls_loss'][-1])
-            if stats['map'][-1] > best_map:
-                best_map = stats['map'][-1]
-            try:
-                epoch_num = stats['epoch'][-1]
-                epoch_total = len(stats['epoch'])
-            except Exception:
-                epoch_num, epoch_total = 0, 200
-            # COMPACT SUMMARY: Only show latest values
-            left_lines.append(f"Epoch: {epoch_num}  mAP@.5: {stats['map'][-1]:.4f} (Best: {best_map:.4f})")
-            left_lines.append(f"Loss: {stats['loss'][-1]:.4f}  Labels: {stats['labels'][-1] if stats['labels'] else 0}")
-            left_lines.append(f"P: {stats['precision'][-1]:.4f}  R: {stats['recall'][-1]:.4f}")
-            left_lines.append("")
+        if self.comparison and stats and stats['map']:
+            extra_line = self.comparison.delta_summary(stats)
         else:
-            left_lines = ["No results yet or results.txt is empty."]
-        # Draw left info box border
-        for i in range(box_w):
-            if 0 <= left_box_y < max_y and 0 <= left_box_x + i < max_x:
-                stdscr.addch(left_box_y, left_box_x + i, ord('-'), curses.color_pair(5))
-            if 0 <= left_box_y + box_h - 1 < max_y and 0 <= left_box_x + i < max_x:
-                stdscr.addch(left_box_y + box_h - 1, left_box_x + i, ord('-'), curses.color_pair(5))
-        for i in range(box_h):
-            if 0 <= left_box_y + i < max_y and 0 <= left_box_x < max_x:
-                stdscr.addch(left_box_y + i, left_box_x, ord('|'), curses.color_pair(5))
-            if 0 <= left_box_y + i < max_y and 0 <= left_box_x + box_w - 1 < max_x:
-                stdscr.addch(left_box_y + i, left_box_x + box_w - 1, ord('|'), curses.color_pair(5))
-        # Corners
-        if 0 <= left_box_y < max_y and 0 <= left_box_x < max_x:
-            stdscr.addch(left_box_y, left_box_x, ord('+'), curses.color_pair(5))
-        if 0 <= left_box_y < max_y and 0 <= left_box_x + box_w - 1 < max_x:
-            stdscr.addch(left_box_y, left_box_x + box_w - 1, ord('+'), curses.color_pair(5))
-        if 0 <= left_box_y + box_h - 1 < max_y and 0 <= left_box_x < max_x:
-            stdscr.addch(left_box_y + box_h - 1, left_box_x, ord('+'), curses.color_pair(5))
-        if 0 <= left_box_y + box_h - 1 < max_y and 0 <= left_box_x + box_w - 1 < max_x:
-            stdscr.addch(left_box_y + box_h - 1, left_box_x + box_w - 1, ord('+'), curses.color_pair(5))
-        # Draw left info text (leave more room for chart)
+            extra_line = self.forecast_line or ""
         max_info_lines = box_h - 10  # leave more space for chart
-        for idx, line in enumerate(wrap_lines(left_lines, box_w-4)[:max_info_lines]):
+        planned_epochs = self.run_plan["epochs"] if self.run_plan else None
+        left_lines = view.get("left", (self.metrics_version, extra_line, self.timing_line, planned_epochs, box_w),
+                              left_box_lines, stats, self.best_map, extra_line, box_w-4, max_info_lines,
+                              planned_epochs, self.timing_line)
+        draw_box_border(stdscr, left_box_y, left_box_x, box_h, box_w, max_y, max_x)
+        # Batch progress of the running epoch, set into the bottom border
+        if self.train_log and self.train_log.progress and 0 <= left_box_y + box_h - 1 < max_y:
+            label = progress_label(self.train_log.progress, self.train_log.rates, box_w - 4)
+            if 0 <= left_box_x + 2 and left_box_x + 2 + len(label) < max_x:
+                stdscr.addstr(left_box_y + box_h - 1, left_box_x + 2, label, curses.color_pair(5) | curses.A_BOLD)
+        # Draw left info text (leave more room for chart)
+        for idx, line in enumerate(left_lines):
             y = left_box_y + 1 + idx
             x = left_box_x + 2
             if 0 <= y < max_y and 0 <= x < max_x:
                 stdscr.addstr(y, x, line[:max_x-x][:box_w-4], curses.color_pair(2))
         # Draw mAP line chart (use more vertical space)
-        draw_line_chart(stdscr, left_box_y+box_h-9, left_box_x, 8, box_w, map_history, color_pair=2, label="mAP")
-
-        # --- Restore right info box drawing ---
-        right_lines = []
-        if ai_feedback and not ai_feedback.get('error'):
-            if ai_feedback.get('risks'):
-                right_lines.append('Risks:')
-                right_lines.extend(wrap_lines([f"- {r}" for r in ai_feedback['risks']], box_w-4))
-            if ai_feedback.get('trends'):
-                right_lines.append('Trends:')
-                right_lines.extend(wrap_lines([f"- {t}" for t in ai_feedback['trends']], box_w-4))
-            if ai_feedback.get('recommendations'):
-                right_lines.append('Recommendations:')
-                right_lines.extend(wrap_lines([f"* {rec}" for rec in ai_feedback['recommendations']], box_w-4))
-            if ai_feedback.get('metrics'):
-                right_lines.append('Metrics:')
-                right_lines.extend(wrap_lines([f"• {m}" for m in ai_feedback['metrics']], box_w-4))
-        elif ai_feedback and ai_feedback.get('error'):
-            right_lines.append("AI Feedback unavailable.")
-        elif not ai_feedback:
-            right_lines.append("Waiting for AI feedback...")
-        # Draw right info box border
-        for i in range(box_w):
-            if 0 <= right_box_y < max_y and 0 <= right_box_x + i < max_x:
-                stdscr.addch(right_box_y, right_box_x + i, ord('-'), curses.color_pair(5))
-            if 0 <= right_box_y + box_h - 1 < max_y and 0 <= right_box_x + i < max_x:
-                stdscr.addch(right_box_y + box_h - 1, right_box_x + i, ord('-'), curses.color_pair(5))
-        for i in range(box_h):
-            if 0 <= right_box_y + i < max_y and 0 <= right_box_x < max_x:
-                stdscr.addch(right_box_y + i, right_box_x, ord('|'), curses.color_pair(5))
-            if 0 <= right_box_y + i < max_y and 0 <= right_box_x + box_w - 1 < max_x:
-                stdscr.addch(right_box_y + i, right_box_x + box_w - 1, ord('|'), curses.color_pair(5))
-        # Corners
-        if 0 <= right_box_y < max_y and 0 <= right_box_x < max_x:
-            stdscr.addch(right_box_y, right_box_x, ord('+'), curses.color_pair(5))
-        if 0 <= right_box_y < max_y and 0 <= right_box_x + box_w - 1 < max_x:
-            stdscr.addch(right_box_y, right_box_x + box_w - 1, ord('+'), curses.color_pair(5))
-        if 0 <= right_box_y + box_h - 1 < max_y and 0 <= right_box_x < max_x:
-            stdscr.addch(right_box_y + box_h - 1, right_box_x, ord('+'), curses.color_pair(5))
-        if 0 <= right_box_y + box_h - 1 < max_y and 0 <= right_box_x + box_w - 1 < max_x:
-            stdscr.addch(right_box_y + box_h - 1, right_box_x + box_w - 1, ord('+'), curses.color_pair(5))
-        # Draw right info text
-        for idx, line in enumerate(right_lines[:box_h-2]):
-            y = right_box_y + 1 + idx
-            x = right_box_x + 2
-            if 0 <= y < max_y and 0 <= x < max_x:
-                stdscr.addstr(y, x, line[:max_x-x][:box_w-4], curses.color_pair(2))
+        if self.comparison and stats and stats['epoch']:
+            n_epochs, aligned = self.comparison.aligned(stats)
+            overlay = self.comparison.overlay_runs()
+            series = [(aligned[run], marker, 4) for run, marker in zip(overlay, COMPARE_MARKERS)]
+            series.append((aligned[RUN_NAME], '•', 2))
+            label = f"{self.comparison.metric} vs " + " ".join(f"{m}={run[:8]}" for run, m in zip(overlay, COMPARE_MARKERS))
+            draw_multi_line_chart(stdscr, left_box_y+box_h-9, left_box_x, 8, box_w, n_epochs, series, label=label[:box_w-4])
+        else:
+            # The loss forecast (same target epoch as the mAP one) goes next to the chart's title
+            loss_forecast = self.forecast and self.forecast.get("loss")
+            note = forecast_bound(loss_forecast, "loss", 4) if loss_forecast else ""
+            draw_line_chart(stdscr, left_box_y+box_h-9, left_box_x, 8, box_w, self.map_history, color_pair=2,
+                            label="mAP", note=note)
 
         # --- Center box drawing (centered, list-like) ---
         center_lines = []
         overfitting_detected = False
         if ai_feedback and not ai_feedback.get('error'):
-            summary = ai_feedback.get('summary', 'No summary.')
-            if ai_feedback.get('isoverfitted', False):
-                overfitting_detected = True
-                if (overfit_auto_backup_epoch != current_epoch):
-                    backup_dir = WEIGHTS_DIR
-                    if not os.path.exists(backup_dir):
-                        os.makedirs(backup_dir)
-                    latest_weight = BEST_PT if os.path.exists(BEST_PT) else None
-                    if latest_weight:
-                        backup_path = os.path.join(backup_dir, f"overfit_{int(time.time())}.pt")
-                        shutil.copy2(latest_weight, backup_path)
-                        backup_message = f"✅ Weights auto-saved to {backup_path} (overfitting)"
-                        backup_message_time = time.time()
-                        logging.info(f"Auto overfitting backup completed: {backup_path}")
-                        overfit_auto_backup_epoch = current_epoch
-                    else:
-                        backup_message = "❌ No weight file found to auto-save."
-                        backup_message_time = time.time()
-                        logging.warning("No weight file found for auto overfitting save")
-            # Center and listify summary
-            summary_lines = wrap_lines([summary], box_w-10)
-            # Add bullet points if summary has sentences
-            summary_bullets = []
-            for line in summary_lines:
-                for sent in line.split('. '):
-                    sent = sent.strip()
-                    if sent:
-                        summary_bullets.append(f"• {sent}")
-            # Add vertical padding to center
-            pad_top = (box_h - len(summary_bullets)) // 2
-            center_lines.extend([''] * pad_top)
-            for line in summary_bullets:
-                # Center horizontally
-                center_lines.append(line.center(box_w-4))
-            pad_bottom = box_h - len(center_lines)
-            center_lines.extend([''] * pad_bottom)
+            overfitting_detected = ai_feedback.get('isoverfitted', False)
+            center_lines = list(view.get("center", (self.analysis_version, box_w, box_h), center_summary_lines,
+                                         ai_feedback, box_w, box_h))
         elif ai_feedback and ai_feedback.get('error'):
             center_lines.append("AI Feedback unavailable.")
         elif not ai_feedback:
-            center_lines.append("Waiting for AI feedback...")
+            center_lines.append(f"Waiting for AI feedback... {next(self.spinner)}")
         if overfitting_detected:
             center_lines.append("")
             center_lines.append("🚨 Overfitting detected! [S] Save weights now".center(box_w-4))
         center_lines.append("")
         # Show backup or advice message if set
         now = time.time()
-        if backup_message and now - backup_message_time < message_display_duration:
+        if self.backup_message and now - self.backup_message_time < MESSAGE_DISPLAY_DURATION:
             center_lines.append("")
-            center_lines.append(backup_message.center(box_w-4))
-        if advice_message and now - advice_message_time < message_display_duration:
+            center_lines.append(self.backup_message.center(box_w-4))
+        if self.advice_message and now - self.advice_message_time < MESSAGE_DISPLAY_DURATION:
             center_lines.append("")
-            for l in wrap_lines([advice_message], box_w-10):
-                center_lines.append(l.center(box_w-4))
+            center_lines.extend(view.get("advice", (self.advice_message_time, box_w), lambda: [
+                l.center(box_w-4) for l in wrap_lines([self.advice_message], box_w-10)]))
+        # Top row, so it stays visible below a full-height AI summary
+        early_stop_line = self.early_stop.status_line()
+        if early_stop_line:
+            center_lines.insert(0, early_stop_line.center(box_w-4))
+        stall = self.throughput.stall(self.run_plan["epochs"] if self.run_plan else None)
+        if stall:
+            center_lines.insert(0, f"⚠️ Epoch {self.current_epoch + 1} running {format_duration(stall[0])}, "
+                                   f"{stall[1]:.1f}x median".center(box_w-4))
         for i in range(box_w):
             if 0 <= center_box_y-1 < max_y and 0 <= center_box_x + i < max_x:
                 stdscr.addch(center_box_y-1, center_box_x + i, ord('='), curses.color_pair(5) | curses.A_BOLD)
@@ -1116,55 +4473,23 @@ def aquarium(stdscr):
             stdscr.addch(center_box_y + box_h, center_box_x-1, ord('#'), curses.color_pair(5) | curses.A_BOLD)
         if 0 <= center_box_y + box_h < max_y and 0 <= center_box_x + box_w < max_x:
             stdscr.addch(center_box_y + box_h, center_box_x + box_w, ord('#'), curses.color_pair(5) | curses.A_BOLD)
+        # AI usage, set into the bottom border
+        usage_line = self.ai_usage.status_line()
+        if usage_line and 0 <= center_box_y + box_h < max_y:
+            label = f" {usage_line} "[:max(0, box_w - 4)]
+            x = center_box_x + (box_w - len(label)) // 2
+            if 0 <= x and x + len(label) < max_x:
+                color = curses.color_pair(6) if self.ai_usage.over_budget() else curses.color_pair(5)
+                stdscr.addstr(center_box_y + box_h, x, label, color | curses.A_BOLD)
         for idx, line in enumerate(center_lines[:box_h]):
             y = center_box_y + idx
             x = center_box_x + 2
             if 0 <= y < max_y and 0 <= x < max_x:
                 stdscr.addstr(y, x, line[:max_x-x][:box_w-4], curses.color_pair(2) | curses.A_BOLD)
-        stdscr.refresh()
 
-        # --- Restore right info box drawing (add paragraph spacing) ---
-        right_lines = []
-        if ai_feedback and not ai_feedback.get('error'):
-            if ai_feedback.get('risks'):
-                right_lines.append('Risks:')
-                right_lines.extend(wrap_lines([f"- {r}" for r in ai_feedback['risks']], box_w-4))
-                right_lines.append('')
-            if ai_feedback.get('trends'):
-                right_lines.append('Trends:')
-                right_lines.extend(wrap_lines([f"- {t}" for t in ai_feedback['trends']], box_w-4))
-                right_lines.append('')
-            if ai_feedback.get('recommendations'):
-                right_lines.append('Recommendations:')
-                right_lines.extend(wrap_lines([f"* {rec}" for rec in ai_feedback['recommendations']], box_w-4))
-                right_lines.append('')
-            if ai_feedback.get('metrics'):
-                right_lines.append('Metrics:')
-                right_lines.extend(wrap_lines([f"• {m}" for m in ai_feedback['metrics']], box_w-4))
-        elif ai_feedback and ai_feedback.get('error'):
-            right_lines.append("AI Feedback unavailable.")
-        elif not ai_feedback:
-            right_lines.append("Waiting for AI feedback...")
-        # Draw right info box border and text as before
-        for i in range(box_w):
-            if 0 <= right_box_y < max_y and 0 <= right_box_x + i < max_x:
-                stdscr.addch(right_box_y, right_box_x + i, ord('-'), curses.color_pair(5))
-            if 0 <= right_box_y + box_h - 1 < max_y and 0 <= right_box_x + i < max_x:
-                stdscr.addch(right_box_y + box_h - 1, right_box_x + i, ord('-'), curses.color_pair(5))
-        for i in range(box_h):
-            if 0 <= right_box_y + i < max_y and 0 <= right_box_x < max_x:
-                stdscr.addch(right_box_y + i, right_box_x, ord('|'), curses.color_pair(5))
-            if 0 <= right_box_y + i < max_y and 0 <= right_box_x + box_w - 1 < max_x:
-                stdscr.addch(right_box_y + i, right_box_x + box_w - 1, ord('|'), curses.color_pair(5))
-        # Corners
-        if 0 <= right_box_y < max_y and 0 <= right_box_x < max_x:
-            stdscr.addch(right_box_y, right_box_x, ord('+'), curses.color_pair(5))
-        if 0 <= right_box_y < max_y and 0 <= right_box_x + box_w - 1 < max_x:
-            stdscr.addch(right_box_y, right_box_x + box_w - 1, ord('+'), curses.color_pair(5))
-        if 0 <= right_box_y + box_h - 1 < max_y and 0 <= right_box_x < max_x:
-            stdscr.addch(right_box_y + box_h - 1, right_box_x, ord('+'), curses.color_pair(5))
-        if 0 <= right_box_y + box_h - 1 < max_y and 0 <= right_box_x + box_w - 1 < max_x:
-            stdscr.addch(right_box_y + box_h - 1, right_box_x + box_w - 1, ord('+'), curses.color_pair(5))
+        # --- Right info box (AI risks/trends/recommendations, with paragraph spacing) ---
+        right_lines = view.get("right", (self.analysis_version, box_w), right_box_lines, ai_feedback, box_w-4)
+        draw_box_border(stdscr, right_box_y, right_box_x, box_h, box_w, max_y, max_x)
         # Draw right info text
         for idx, line in enumerate(right_lines[:box_h-2]):
             y = right_box_y + 1 + idx
@@ -1172,119 +4497,177 @@ def aquarium(stdscr):
             if 0 <= y < max_y and 0 <= x < max_x:
                 stdscr.addstr(y, x, line[:max_x-x][:box_w-4], curses.color_pair(2))
 
-        # Remove seaweed at the bottom (do not draw it)
         # Animate duck at the bottom, moving left/right
-        duck_y = max_y - len(duck_art) - 1
-        if duck_x + len(duck_art[1]) >= max_x:
-            duck_dir = -1
-        if duck_x <= 0:
-            duck_dir = 1
-        for i, line in enumerate(duck_art):
-            if 0 <= duck_y + i < max_y and 0 <= duck_x < max_x:
-                stdscr.addstr(duck_y + i, duck_x, line[:max_x-duck_x], curses.color_pair(3))
-        duck_x += duck_dir
-
-        # Handle keypresses for backup, save, and life advice
-        key = stdscr.getch()
-        logging.debug(f"Aquarium keypress: {key}")
-        if key in [ord('b'), ord('B')]:
-            logging.info("[B] key pressed for backup")
-            backup_dir = WEIGHTS_DIR
-            if not os.path.exists(backup_dir):
-                os.makedirs(backup_dir)
-            latest_weight = BEST_PT if os.path.exists(BEST_PT) else None
-            if latest_weight:
-                backup_path = os.path.join(backup_dir, f"backup_{int(time.time())}.pt")
-                shutil.copy2(latest_weight, backup_path)
-                backup_message = f"✅ Weights backed up to {backup_path}"
-                backup_message_time = time.time()
-                logging.info(f"Backup completed: {backup_path}")
-            else:
-                backup_message = "❌ No weight file found to backup."
-                backup_message_time = time.time()
-                logging.warning("No weight file found for backup")
-        elif key in [ord('s'), ord('S')]:
-            logging.info("[S] key pressed for overfitting/manual save")
-            backup_dir = WEIGHTS_DIR
-            if not os.path.exists(backup_dir):
-                os.makedirs(backup_dir)
-            latest_weight = BEST_PT if os.path.exists(BEST_PT) else None
-            if latest_weight:
-                backup_path = os.path.join(backup_dir, f"manual_{int(time.time())}.pt")
-                shutil.copy2(latest_weight, backup_path)
-                backup_message = f"✅ Weights saved to {backup_path} (manual)"
-                backup_message_time = time.time()
-                logging.info(f"Manual backup completed: {backup_path}")
-            else:
-                backup_message = "❌ No weight file found to save."
-                backup_message_time = time.time()
-                logging.warning("No weight file found for manual save")
-        elif key in [ord('l'), ord('L')]:
-            logging.info("[L] key pressed for life advice")
-            advice_prompt = (
-                "Give me a funny, ML-themed life advice for a machine learning engineer, related to model training, overfitting, or debugging. Make it fit the context of someone training YOLOv7 or deep learning models in a terminal aquarium UI. 2-3 lines, with emojis."
-            )
-            try:
-                advice_data = {
-                    "model": "gpt-4-turbo-preview",
-                    "messages": [{"role": "user", "content": advice_prompt}],
-                    "temperature": 0.7,
-                    "max_tokens": 100
-                }
-                advice_headers = {
-                    "Authorization": f"Bearer {OPENAI_API_KEY}",
-                    "Content-Type": "application/json"
-                }
-                advice_response = requests.post(
-                    "https://api.openai.com/v1/chat/completions",
-                    headers=advice_headers,
-                    json=advice_data,
-                    timeout=30
-                )
-                advice_response.raise_for_status()
-                advice_content = advice_response.json()["choices"][0]["message"]["content"]
-                advice_message = advice_content
-                advice_message_time = time.time()
-                logging.info(f"Life advice received: {advice_content}")
-            except Exception as e:
-                advice_message = f"❌ Failed to get life advice: {e}"
-                advice_message_time = time.time()
-                logging.error(f"Failed to get life advice: {e}")
-        elif key != -1:
-            # Any other key clears messages
-            backup_message = None
-            advice_message = None
-        time.sleep(pause)
+        # (bouncing keeps the whole duck on screen, so its rows never need clipping)
+        duck_y = max_y - sheet.static["duck"]["height"] - 1
+        self.duck_x = max(0, min(self.duck_x, max_x - sheet.width("duck") - 1))
+        if self.duck_x + sheet.width("duck") >= max_x:
+            self.duck_dir = -1
+        if self.duck_x <= 0:
+            self.duck_dir = 1
+        for dy, dx, text in sheet.rows("duck"):
+            if 0 <= duck_y + dy < max_y:
+                stdscr.addstr(duck_y + dy, self.duck_x + dx, text, curses.color_pair(3))
+        self.duck_x += self.duck_dir
+
+# --- Replay (a finished run fed through the live pipeline) ---
+REPLAY_SPEED = 100.0        # epochs per second
+REPLAY_AI_LATENCY = 0.2     # seconds the stub AI provider "thinks"
+REPLAY_LINGER = 1.0         # seconds the aquarium stays up after the last epoch is shown
+REPLAY_BEST_PT_BYTES = 1 << 16
+
+def stub_ai_analysis(stats, latency=REPLAY_AI_LATENCY, rules=None):
+    """Offline stand-in for get_ai_analysis(): same response shape, built from
+    get_training_feedback() (with the run's RuleEngine, if given) and
+    detect_overfitting() after a fixed delay."""
+    time.sleep(latency)
+    feedback, _, _, emoji = get_training_feedback(stats, rules)
+    epoch = stats['epoch'][-1] if stats['epoch'] else 0
+    latest_map = stats['map'][-1] if stats['map'] else 0.0
+    best_map = max(stats['map']) if stats['map'] else 0.0
+    overfit = detect_overfitting(stats['map'])
+    trend, trend_emoji = analyze_trend(stats['map'])
+    return {
+        "summary": f"{emoji} Replay at epoch {epoch}. mAP {latest_map:.3f}, best {best_map:.3f}.",
+        "risks": feedback or ["✅ No rule fired."],
+        "trends": [f"{trend_emoji} {trend}"],
+        "recommendations": ["🛑 Stop and keep best.pt."] if overfit else ["▶️ Keep training."],
+        "metrics": [f"mAP: {latest_map:.4f}", f"Loss: {stats['loss'][-1]:.4f}" if stats['loss'] else "Loss: -"],
+        "isoverfitted": overfit,
+        "usage": {"prompt_tokens": estimate_tokens(json.dumps(stats)), "completion_tokens": 200},
+    }
+
+class Replayer:
+    """Appends the lines of a finished results.txt to a new file at speed epochs per second.
+
+    Writes like YOLOv7 does (open, append one line, close) and rewrites best.pt on
+    every new best mAP, recording when each line landed.
+    """
+
+    def __init__(self, lines, results_file, best_pt, speed=REPLAY_SPEED):
+        self.lines = lines
+        self.results_file = results_file
+        self.best_pt = best_pt
+        self.speed = speed
+        self.append_times = []  # perf_counter() per appended line
+        self.started = None
+        self.finished = None
+        self.stop_event = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, name="replayer", daemon=True).start()
+
+    def _run(self):
+        best_map = float("-inf")
+        self.started = time.perf_counter()
+        for i, line in enumerate(self.lines):
+            delay = self.started + i / self.speed - time.perf_counter()
+            if self.stop_event.wait(delay) if delay > 0 else self.stop_event.is_set():
+                return
+            row = results_row(line)
+            if row and row[2] > best_map:
+                best_map = row[2]
+                with open(self.best_pt, "wb") as f:
+                    f.write(os.urandom(REPLAY_BEST_PT_BYTES))
+            with open(self.results_file, "a") as f:
+                f.write(line)
+            self.append_times.append(time.perf_counter())
+        self.finished = time.perf_counter()
+
+class ReplayApp(AquariumApp):
+    """The aquarium with the stub AI provider; notes when each replayed epoch first reaches the screen."""
+
+    def __init__(self, stdscr, replayer, hold=False, ai_latency=REPLAY_AI_LATENCY):
+        super().__init__(stdscr, ai_provider=functools.partial(stub_ai_analysis, latency=ai_latency,
+                                                             rules=RuleEngine(load_rules())))
+        self.early_stop.mode = "dry-run"  # there is no train.py to signal
+        self.replayer = replayer
+        self.hold = hold
+        self.latencies = []  # seconds from append to the first frame showing that line
+        self.screen_updates = 0
+        self.all_shown_at = None
+
+    def frame_drawn(self):
+        now = time.perf_counter()
+        shown = min(len(self.stats['epoch']) if self.stats else 0, len(self.replayer.append_times))
+        if shown > len(self.latencies):
+            self.screen_updates += 1
+            self.latencies.extend(now - t for t in self.replayer.append_times[len(self.latencies):shown])
+        if self.replayer.finished and len(self.latencies) >= len(self.replayer.lines):
+            self.all_shown_at = self.all_shown_at or now
+            if not self.hold and now - self.all_shown_at >= REPLAY_LINGER:
+                self.stop()
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+def replay_report(app, source, speed):
+    """Throughput and latency summary of a finished replay, as printable lines."""
+    replayer = app.replayer
+    appended = len(replayer.append_times)
+    lines = [f"Replayed {appended}/{len(replayer.lines)} epochs of {source} at {speed:g} epochs/s"]
+    if appended > 1:
+        span = replayer.append_times[-1] - replayer.started
+        lines.append(f"  writer:  {appended / span:8.1f} epochs/s over {span:.2f} s")
+    if app.latencies:
+        shown_span = app.all_shown_at - replayer.started if app.all_shown_at else None
+        if shown_span:
+            lines.append(f"  screen:  {len(app.latencies) / shown_span:8.1f} epochs/s "
+                         f"({app.screen_updates} screen updates)")
+        ms = sorted(x * 1000 for x in app.latencies)
+        lines.append(f"  append -> on-screen latency: p50 {_percentile(ms, 0.5):.0f} ms, "
+                     f"p90 {_percentile(ms, 0.9):.0f} ms, p99 {_percentile(ms, 0.99):.0f} ms, max {ms[-1]:.0f} ms")
+    timings = EVENT_TIMINGS.snapshot()
+    for event in ["parse_results", "frame", "ai_analysis", "backup"]:
+        count, total, worst, _ = timings.get(event, [0, 0.0, 0.0, 0.0])
+        if count:
+            lines.append(f"  {event:<14} {count:5d} x, mean {total / count * 1000:7.2f} ms, max {worst * 1000:7.2f} ms")
+    if app.ai_usage.status_line():
+        lines.append(f"  {app.ai_usage.status_line()}")
+    lines.append(f"  early stop: {app.early_stop.state}" + (f" ({app.early_stop.message})" if app.early_stop.message else ""))
+    return lines
+
+def run_replay(source, speed=REPLAY_SPEED, ai_latency=REPLAY_AI_LATENCY, hold=False, keep=False):
+    """Replay source into a throwaway runs/train tree through the aquarium, then print the report."""
+    global RUNS_BASE_PATH
+    import tempfile
+    with open(source) as f:
+        lines = [line if line.endswith("\n") else line + "\n" for line in f if results_row(line)]
+    root = tempfile.mkdtemp(prefix="fishwell_replay_")
+    RUNS_BASE_PATH = os.path.join(root, "runs", "train")
+    run_name = "replay_" + os.path.basename(os.path.dirname(os.path.abspath(source)))
+    os.makedirs(os.path.join(RUNS_BASE_PATH, run_name, "weights"))
+    set_paths(run_name)
+    open(RESULTS_FILE, "w").close()
+    replayer = Replayer(lines, RESULTS_FILE, BEST_PT, speed)
+
+    async def session(stdscr):
+        app = ReplayApp(stdscr, replayer, hold=hold, ai_latency=ai_latency)
+        replayer.start()
         try:
-            key = stdscr.getch()
-            if key == ord('q'):
-                break
-        except Exception:
-            pass
+            await app.run()
+        finally:
+            replayer.stop_event.set()
+        return app
+
+    try:
+        app = curses.wrapper(lambda stdscr: asyncio.run(session(stdscr)))
+        print("\n".join(replay_report(app, source, speed)))
+    finally:
+        if keep:
+            print(f"Replay run kept in {os.path.join(RUNS_BASE_PATH, run_name)}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+    return 0
 
 def get_ai_analysis(metrics_data):
-    """Get AI analysis of training metrics using either ChatGPT or Claude."""
+    """Get AI analysis of training metrics from the configured providers (see ai_providers())."""
     
     # Prepare the metrics data
     metrics_str = json.dumps(metrics_data, indent=2)
-    
-    if USE_CHATGPT:
-        return get_chatgpt_analysis(metrics_str)
-    else:
-        return get_claude_analysis(metrics_str)
-
-def get_chatgpt_analysis(metrics_str):
-    """Get analysis from ChatGPT."""
-    # Parse metrics to get current epoch
-    try:
-        metrics = json.loads(metrics_str)
-        current_epoch = metrics.get('epoch', [0])[-1]
-        logging.info(f"Current epoch: {current_epoch}")
-    except Exception as e:
-        logging.error(f"Error parsing metrics for epoch: {e}")
-        current_epoch = 0
+    return get_chatgpt_analysis(metrics_str)
 
-    prompt = f"""Analyze these YOLOv7 training metrics and provide a detailed, actionable, and emoji-rich response for a terminal UI with three info boxes. For each field, wrap lines at 48 characters or less so nothing overflows. Use these fields:
+ANALYSIS_INSTRUCTIONS = """Analyze these YOLOv7 training metrics and provide a detailed, actionable, and emoji-rich response for a terminal UI with three info boxes. For each field, wrap lines at 48 characters or less so nothing overflows. Use these fields:
 
 1. summary: 3-4 sentences summarizing training status (with emoji/icons, line-wrapped). If overfitting is detected, make it clear and urgent.
 2. risks: List of 4-5 key risks/issues (each 1-2 lines, with emoji/icons, line-wrapped).
@@ -1293,7 +4676,7 @@ def get_chatgpt_analysis(metrics_str):
 5. metrics: List of key numbers (epoch, mAP, loss, precision, recall, etc), line-wrapped.
 6. isoverfitted: true/false (boolean, not string). This must be true ONLY if the model is clearly overfitting (see below).
 
-IMPORTANT: The model is currently at epoch {current_epoch}. Do not mention overfitting or set isoverfitted true unless the epoch is above 50 and the signs are very clear (see below). Overfitting detection rules:
+IMPORTANT: The message with the metrics says which epoch the model is at. Do not mention overfitting or set isoverfitted true unless the epoch is above 50 and the signs are very clear (see below). Overfitting detection rules:
 - DO NOT flag overfitting or set isoverfitted true before epoch 50
 - Only set isoverfitted true if ALL of these are true:
   * Model is past epoch 50
@@ -1307,342 +4690,849 @@ IMPORTANT: The model is currently at epoch {current_epoch}. Do not mention overf
   * General training stability
 
 Format your response as JSON with these exact keys:
-{{{{
-  \"summary\": \"...\",
-  \"risks\": [\"...\", ...],
-  \"trends\": [\"...\", ...],
-  \"recommendations\": [\"...\", ...],
-  \"metrics\": [\"...\", ...],
-  \"isoverfitted\": false
-}}}}
+{
+  "summary": "...",
+  "risks": ["...", ...],
+  "trends": ["...", ...],
+  "recommendations": ["...", ...],
+  "metrics": ["...", ...],
+  "isoverfitted": false
+}
 
 Be concise but informative, use only the most relevant information, and always use emojis/icons for clarity and fun. Do not use markdown or code blocks.
 
+Some messages carry only the epochs added since your previous analysis, together with that analysis: update it in the light of the new epochs rather than starting over."""
+# Kept byte-for-byte stable and sent first, so providers with prompt caching can reuse it
+
+def get_chatgpt_analysis(metrics_str, providers=None):
+    """Get analysis from ChatGPT (hedged with Claude when configured), sending the whole metrics history."""
+    # Parse metrics to get current epoch
+    try:
+        metrics = json.loads(metrics_str)
+        current_epoch = metrics.get('epoch', [0])[-1]
+        logging.info("Current epoch: %s", current_epoch)
+    except Exception as e:
+        logging.error("Error parsing metrics for epoch: %s", e)
+        current_epoch = 0
+
+    prompt = f"""The model is currently at epoch {current_epoch}.
+
 Metrics data:
 {metrics_str}"""
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    data = {
-        "model": "gpt-4-turbo-preview",
-        "messages": [{"role": "user", "content": prompt}],
-        "temperature": 0.3,
-        "max_tokens": 900
-    }
     try:
-        logging.info(f"ChatGPT prompt length: {len(prompt)}")
-        logging.info(f"ChatGPT payload: {json.dumps(data)[:1000]}... (truncated)")
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers=headers,
-            json=data,
-            timeout=60
-        )
-        logging.info(f"ChatGPT API HTTP status: {response.status_code}")
-        logging.info(f"ChatGPT API raw response: {response.text[:1000]}... (truncated)")
-        response.raise_for_status()
-        content = response.json()["choices"][0]["message"]["content"]
-        logging.info(f"ChatGPT API parsed content: {content}")
-        # Strip markdown formatting if present
-        if content.startswith("```json"):
-            content = content.split("```json")[1]
-        if content.endswith("```"):
-            content = content.rsplit("```", 1)[0]
-        content = content.strip()
-        logging.info(f"Cleaned content for JSON parsing: {content}")
-        analysis = json.loads(content)
-        # Ensure all expected fields are present, defaulting if missing
-        expected_fields = {
-            "summary": "No summary.",
-            "risks": [],
-            "trends": [],
-            "recommendations": [],
-            "metrics": [],
-            "isoverfitted": False
-        }
-        for key, default in expected_fields.items():
-            if key not in analysis:
-                analysis[key] = default
+        logging.info("ChatGPT prompt length: %d", len(ANALYSIS_INSTRUCTIONS) + len(prompt))
+        content, usage = chat_completion([{"role": "system", "content": ANALYSIS_INSTRUCTIONS},
+                                          {"role": "user", "content": prompt}], max_tokens=900,
+                                         validate=validate_analysis, providers=providers)
+        analysis = parse_analysis(content)
+        analysis["usage"] = usage
         return analysis
     except Exception as e:
-        logging.error(f"Failed to get ChatGPT analysis: {str(e)}")
-        return {
-            "error": f"Failed to get ChatGPT analysis: {str(e)}",
-            "summary": "No summary.",
-            "risks": [],
-            "trends": [],
-            "recommendations": [],
-            "metrics": [],
-            "isoverfitted": False
+        logging.error("Failed to get ChatGPT analysis: %s", e)
+        return analysis_error(f"Failed to get ChatGPT analysis: {str(e)}")
+
+ANALYSIS_DEFAULTS = {
+    "summary": "No summary.",
+    "risks": [],
+    "trends": [],
+    "recommendations": [],
+    "metrics": [],
+    "isoverfitted": False
+}
+
+def analysis_error(message):
+    """An analysis dict that carries an error instead of advice."""
+    return dict(ANALYSIS_DEFAULTS, error=message)
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+def http_session():
+    """The requests.Session every chat call goes through, so they share keep-alive connections."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            import requests  # deferred: keeps the cold start free of the requests/urllib3 import chain
+            _http_session = requests.Session()
+        return _http_session
+
+# --- AI providers and hedged requests ---
+# Every chat call goes through chat_completion(), which asks the configured
+# providers in order: the first straight away, the next only once the first has
+# taken longer than its own p90 latency (or has failed). The first answer that
+# passes validation wins. A request already on the wire cannot be recalled
+# through requests, so a losing one finishes in the background: its answer is
+# dropped and only its latency is recorded.
+AI_HEDGE_MIN_SAMPLES = 5      # latencies a provider needs before its p90 is trusted
+AI_HEDGE_DEFAULT_DELAY = 8.0  # seconds before hedging while a provider has fewer samples
+AI_HEDGE_WORKERS = 32         # threads for requests in flight, including abandoned ones
+
+class LatencyHistogram:
+    """Request latencies in log-spaced buckets from 50 ms to ~2 min; quantiles are bucket upper bounds."""
+
+    BOUNDS = [0.05 * 1.25 ** i for i in range(36)]
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+
+    def quantile(self, q):
+        with self.lock:
+            rank = q * self.count
+            seen = 0
+            for i, n in enumerate(self.counts):
+                seen += n
+                if n and seen >= rank:
+                    return self.BOUNDS[i] if i < len(self.BOUNDS) else math.inf
+        return None
+
+    def prometheus(self, name, labels):
+        with self.lock:
+            lines, cumulative = [], 0
+            for bound, n in zip(self.BOUNDS, self.counts):
+                cumulative += n
+                lines.append(f'{name}_bucket{{{labels},le="{bound:.3f}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+            lines.append(f"{name}_sum{{{labels}}} {self.total}")
+            lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+class ChatProvider:
+    """One chat backend: builds its HTTP request, reads its reply and keeps a latency histogram."""
+
+    name = None
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+
+    def configured(self):
+        return True
+
+    def request(self, messages, max_tokens, temperature):
+        """(url, headers, json body) for an OpenAI-style message list."""
+        raise NotImplementedError
+
+    def reply(self, body, messages):
+        """(content, usage) from the decoded response body."""
+        raise NotImplementedError
+
+    def cost(self, usage):
+        raise NotImplementedError
+
+    def hedge_delay(self):
+        """Seconds to wait for this provider before asking the next one: its p90 once known."""
+        if self.latency.count < AI_HEDGE_MIN_SAMPLES:
+            return AI_HEDGE_DEFAULT_DELAY
+        return self.latency.quantile(0.9)
+
+    def complete(self, messages, max_tokens, temperature=0.3, timeout=60):
+        url, headers, data = self.request(messages, max_tokens, temperature)
+        logging.debug("%s payload: %s", self.name, LazyJson(data))
+        start = time.monotonic()
+        try:
+            response = http_session().post(url, headers=headers, json=data, timeout=timeout)
+            logging.info("%s HTTP status: %s", self.name, response.status_code)
+            logging.debug("%s raw response: %.1000s", self.name, response.text)
+            response.raise_for_status()
+            return self.reply(response.json(), messages)
+        finally:
+            # Failures and timeouts count too: the time they took is a lower bound on
+            # how long an answer would have taken, so leaving them out biases p90 low
+            self.latency.record(time.monotonic() - start)
+
+class OpenAIProvider(ChatProvider):
+    """POST /v1/chat/completions on OPENAI_CHAT_URL."""
+
+    name = "openai"
+
+    def configured(self):
+        return bool(OPENAI_API_KEY)
+
+    def request(self, messages, max_tokens, temperature):
+        headers = {
+            "Authorization": f"Bearer {OPENAI_API_KEY}",
+            "Content-Type": "application/json"
+        }
+        data = {
+            "model": OPENAI_MODEL,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
         }
+        return OPENAI_CHAT_URL, headers, data
 
-def get_claude_analysis(metrics_str):
-    """Get analysis from Claude."""
-    # Similar implementation for Claude API
-    # Add your Claude API implementation here
-    pass
+    def reply(self, body, messages):
+        content = body["choices"][0]["message"]["content"]
+        usage = body.get("usage") or {"prompt_tokens": sum(estimate_tokens(m["content"]) for m in messages),
+                                      "completion_tokens": estimate_tokens(content)}
+        return content, usage
 
-def analyze_training(stdscr):
-    """Main training analysis loop with AI integration."""
-    curses.curs_set(0)
-    stdscr.clear()
-    
-    # Initialize windows
-    height, width = stdscr.getmaxyx()
-    center_box = curses.newwin(INFO_BOX_HEIGHT, INFO_BOX_WIDTH, 2, (width - INFO_BOX_WIDTH) // 2)
-    right_box = curses.newwin(INFO_BOX_HEIGHT, INFO_BOX_WIDTH, 2, width - INFO_BOX_WIDTH - 2)
-    
-    last_analysis_epoch = 0
-    ai_analysis = None
-    
+    def cost(self, usage):
+        return (usage.get("prompt_tokens", 0) / 1000 * AI_PRICE_PER_1K_PROMPT
+                + usage.get("completion_tokens", 0) / 1000 * AI_PRICE_PER_1K_COMPLETION)
+
+class AnthropicProvider(ChatProvider):
+    """POST /v1/messages on ANTHROPIC_MESSAGES_URL; system messages go to the top-level system field."""
+
+    name = "anthropic"
+
+    def configured(self):
+        return bool(ANTHROPIC_API_KEY) and ANTHROPIC_API_KEY != "YOUR_ANTHROPIC_API_KEY"
+
+    def request(self, messages, max_tokens, temperature):
+        headers = {
+            "x-api-key": ANTHROPIC_API_KEY,
+            "anthropic-version": "2023-06-01",
+            "content-type": "application/json"
+        }
+        data = {
+            "model": ANTHROPIC_MODEL,
+            "messages": [m for m in messages if m["role"] != "system"],
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+        if system:
+            data["system"] = system
+        return ANTHROPIC_MESSAGES_URL, headers, data
+
+    def reply(self, body, messages):
+        content = "".join(block.get("text", "") for block in body["content"] if block.get("type") == "text")
+        usage = body.get("usage") or {}
+        return content, {"prompt_tokens": usage.get("input_tokens", sum(estimate_tokens(m["content"]) for m in messages)),
+                         "completion_tokens": usage.get("output_tokens", estimate_tokens(content))}
+
+    def cost(self, usage):
+        return (usage.get("prompt_tokens", 0) / 1000 * ANTHROPIC_PRICE_PER_1K_PROMPT
+                + usage.get("completion_tokens", 0) / 1000 * ANTHROPIC_PRICE_PER_1K_COMPLETION)
+
+AI_PROVIDERS = {"openai": OpenAIProvider(), "anthropic": AnthropicProvider()}
+
+def ai_providers():
+    """Configured providers, the preferred one (USE_CHATGPT) first; OpenAI (keyless) when none is."""
+    order = ["openai", "anthropic"] if USE_CHATGPT else ["anthropic", "openai"]
+    providers = [AI_PROVIDERS[name] for name in order if AI_PROVIDERS[name].configured()]
+    return providers or [AI_PROVIDERS["openai"]]
+
+def render_provider_latency():
+    """Per-provider latency histograms in Prometheus text format (for PrometheusExporter)."""
+    name = "fishwell_ai_provider_latency_seconds"
+    lines = [f"# HELP {name} Chat request latency per AI provider", f"# TYPE {name} histogram"]
+    for provider in AI_PROVIDERS.values():
+        if provider.latency.count:
+            lines.extend(provider.latency.prometheus(name, f'provider="{provider.name}"'))
+    return "\n".join(lines) + "\n" if len(lines) > 2 else ""
+
+_hedge_pool = None
+_hedge_pool_lock = threading.Lock()
+
+def hedge_pool():
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = DaemonThreadPool(AI_HEDGE_WORKERS, "fishwell-hedge")
+        return _hedge_pool
+
+def chat_completion(messages, max_tokens, temperature=0.3, timeout=60, validate=None, providers=None):
+    """Chat completion from the first provider to give a valid answer. Returns (content, usage).
+
+    usage is the winner's token count (or an estimate when it sends none) plus
+    "provider", "hedged" and "cost_usd". validate(content) may raise to reject an
+    answer that does not fit the expected schema; the other providers are then
+    waited for or asked instead. Raises when none answers within timeout.
+    """
+    providers = list(providers or ai_providers())
+    if not AI_HEDGE:
+        providers = providers[:1]
+    start = time.monotonic()
+    deadline = start + timeout
+
+    def attempt(provider):
+        content, usage = provider.complete(messages, max_tokens, temperature, max(1.0, deadline - time.monotonic()))
+        if validate:
+            validate(content)
+        return content, usage
+
+    if len(providers) == 1:
+        content, usage = attempt(providers[0])
+        return content, dict(usage, provider=providers[0].name, hedged=False, cost_usd=providers[0].cost(usage))
+    pool = hedge_pool()
+    waiting = providers
+    pending = {}
+    errors = []
+    launched = 0
+    next_hedge = start
     while True:
-        # Parse current results
-        metrics = parse_results(RESULTS_FILE)
-        # Check for empty metrics
-        if not metrics["epoch"] or not metrics["map"] or not metrics["loss"] or not metrics["precision"] or not metrics["recall"]:
-            center_box.clear()
-            center_box.box()
-            center_box.addstr(2, 2, "No results yet or results.txt is empty.")
-            center_box.refresh()
-            right_box.clear()
-            right_box.box()
-            right_box.addstr(2, 2, "AI Analysis:")
-            right_box.refresh()
-            time.sleep(1)
+        now = time.monotonic()
+        if waiting and (not pending or now >= next_hedge):
+            provider, waiting = waiting[0], waiting[1:]
+            if pending:
+                logging.info("Hedging: no answer after %.1fs, asking %s too", now - start, provider.name)
+            pending[pool.submit(attempt, provider)] = provider
+            launched += 1
+            next_hedge = now + provider.hedge_delay()
             continue
-        current_epoch = metrics["epoch"][-1]
-        # Get AI analysis every ANALYSIS_INTERVAL epochs
-        if current_epoch - last_analysis_epoch >= ANALYSIS_INTERVAL:
-            ai_analysis = get_ai_analysis(metrics)
-            last_analysis_epoch = current_epoch
-            # Backup weights if AI suggests
-            if ai_analysis.get("should_backup_weights", False):
-                backup_best_weight()
-        # Update center box with current metrics
-        center_box.clear()
-        center_box.box()
-        center_box.addstr(1, 2, f"Epoch: {current_epoch}")
-        center_box.addstr(2, 2, f"mAP: {metrics['map'][-1]:.4f}")
-        center_box.addstr(3, 2, f"Loss: {metrics['loss'][-1]:.4f}")
-        center_box.addstr(4, 2, f"Precision: {metrics['precision'][-1]:.4f}")
-        center_box.addstr(5, 2, f"Recall: {metrics['recall'][-1]:.4f}")
-        center_box.refresh()
-        # Update right box with AI insights
-        right_box.clear()
-        right_box.box()
-        right_box.addstr(1, 2, "AI Analysis:")
-        if ai_analysis:
-            right_box.addstr(2, 2, f"Risk: {ai_analysis['overfitting_risk']}")
-            right_box.addstr(3, 2, f"Stability: {ai_analysis['training_stability']}")
-            for i, trend in enumerate(ai_analysis['key_trends'][:2]):
-                right_box.addstr(4 + i, 2, f"• {trend}")
-        right_box.refresh()
-        time.sleep(1)
-
-def loading_spinner_and_ai(run_name):
-    import itertools
-    import threading
-    import queue
-    import curses
-    import signal
-    
-    # Flag to control the spinner thread
-    spinner_running = threading.Event()
-    spinner_running.set()
-    
-    def spinner_curses(stdscr, status_queue):
-        curses.curs_set(0)
-        stdscr.nodelay(True)
-        h, w = stdscr.getmaxyx()
-        spinner = itertools.cycle(['|', '/', '-', '\\'])
-        status = "Asking A.I."
-        
-        while spinner_running.is_set():
+        if not pending or now >= deadline:
+            break
+        wait = min(deadline, next_hedge) - now if waiting else deadline - now
+        done, _ = concurrent.futures.wait(pending, timeout=max(0.0, wait),
+                                          return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            provider = pending.pop(future)
             try:
-                stdscr.clear()
-                msg = "Loading..."
-                spin = next(spinner)
-                stdscr.addstr(h//2-2, (w-len(msg))//2, msg, curses.A_BOLD)
-                stdscr.addstr(h//2, (w-1)//2, spin, curses.A_BOLD)
-                stdscr.addstr(h//2+2, (w-len(status))//2, status)
-                stdscr.refresh()
-                
-                try:
-                    new_status = status_queue.get_nowait()
-                    if isinstance(new_status, str):
-                        if new_status == 'done':
-                            break
-                        status = new_status
-                    elif isinstance(new_status, tuple) and new_status[0] == 'result':
-                        # Store result but keep showing spinner
-                        continue
-                except queue.Empty:
-                    pass
-                
-                time.sleep(0.1)
-            except (curses.error, KeyboardInterrupt):
-                break
+                content, usage = future.result()
+            except Exception as e:
+                logging.warning("%s failed: %s", provider.name, e)
+                errors.append(f"{provider.name}: {e}")
+                continue
+            for other, loser in pending.items():
+                other.cancel()  # only stops requests that have not started; the rest are ignored
+                logging.info("Abandoning %s: %s answered first", loser.name, provider.name)
+            return content, dict(usage, provider=provider.name, hedged=launched > 1, cost_usd=provider.cost(usage))
+    for future in pending:
+        future.cancel()
+    raise RuntimeError("; ".join(errors) or f"no answer within {timeout}s")
+
+def validate_analysis(content):
+    """Raise ValueError unless content is a single-run analysis shaped as ANALYSIS_INSTRUCTIONS asks."""
+    analysis = json.loads(strip_code_fences(content))
+    if not isinstance(analysis, dict) or not isinstance(analysis.get("summary"), str):
+        raise ValueError("answer is not an analysis with a summary")
+    for key in ("risks", "trends", "recommendations", "metrics"):
+        if not isinstance(analysis.get(key, []), list):
+            raise ValueError(f"{key} is not a list")
+    if not isinstance(analysis.get("isoverfitted", False), bool):
+        raise ValueError("isoverfitted is not a boolean")
+
+def strip_code_fences(content):
+    """Drop the ```json ... ``` wrapper models like to add around JSON."""
+    content = content.strip()
+    if content.startswith("```json"):
+        content = content.split("```json", 1)[1]
+    if content.endswith("```"):
+        content = content.rsplit("```", 1)[0]
+    return content.strip()
+
+def parse_analysis(content):
+    """The model's JSON answer as a dict, without markdown fences and with every expected field present."""
+    logging.debug("Chat API parsed content: %s", content)
+    analysis = json.loads(strip_code_fences(content))
+    for key, default in ANALYSIS_DEFAULTS.items():
+        if key not in analysis:
+            analysis[key] = default
+    return analysis
+
+# --- Delta prompts ---
+# A live run is analysed every few epochs, and resending the whole history each time
+# makes every call bigger than the last. DeltaAnalysis sends the fixed instructions,
+# the previous analysis and only the epochs added since it, with a full resync every
+# AI_RESYNC_EVERY calls so the model never drifts too far from the real history.
 
-    def fetch_ai_first_response(status_queue, run_name):
+DELTA_COLUMNS = ["epoch", "map", "precision", "recall", "loss", "box_loss", "cls_loss"]
+
+def metrics_table(stats, start=0):
+    """Rows start: of the history as a compact whitespace table with a header line."""
+    lines = [" ".join(DELTA_COLUMNS)]
+    for i in range(start, len(stats['epoch'])):
+        lines.append(" ".join(str(stats[key][i]) if key == "epoch" else f"{stats[key][i]:.4f}"
+                              for key in DELTA_COLUMNS))
+    return "\n".join(lines)
+
+def run_context(stats):
+    """Whole-run facts that a delta alone would lose: progress, best mAP and the local verdicts."""
+    best = max(range(len(stats['map'])), key=stats['map'].__getitem__)
+    return (f"Epochs done: {len(stats['epoch'])}. Best mAP@.5 {stats['map'][best]:.4f} at epoch "
+            f"{stats['epoch'][best]}. Local overfitting detector: {detect_overfitting(stats['map'])}. "
+            f"mAP trend: {analyze_trend(stats['map'])[0]}.")
+
+class DeltaAnalysis:
+    """Incremental analysis of one run: remembers what the model has already seen.
+
+    Only a successful answer moves the state forward, so after a failure the next
+    call simply carries a longer delta.
+    """
+
+    def __init__(self, resync_every=AI_RESYNC_EVERY):
+        self.resync_every = resync_every
+        self.previous = None        # last good analysis, as sent back to the model
+        self.sent_epochs = 0        # rows of the history it covers
+        self.last_sent_epoch = None
+        self.calls_since_resync = 0
+
+    def needs_resync(self, stats):
+        """True when the next call must carry the whole history."""
+        n = len(stats['epoch'])
+        return (self.previous is None
+                or self.calls_since_resync >= self.resync_every - 1
+                or n < self.sent_epochs
+                # results.txt was rewritten (restart, --resume from an earlier checkpoint)
+                or stats['epoch'][self.sent_epochs - 1] != self.last_sent_epoch)
+
+    def messages(self, stats):
+        """(chat messages, full) for the next call."""
+        epoch = stats['epoch'][-1]
+        full = self.needs_resync(stats)
+        if full:
+            body = (f"The model is currently at epoch {epoch}. {run_context(stats)}\n\n"
+                    f"Full metrics history:\n{metrics_table(stats)}")
+        else:
+            body = (f"The model is currently at epoch {epoch}. {run_context(stats)}\n\n"
+                    f"Your previous analysis (through epoch {self.last_sent_epoch}):\n"
+                    f"{json.dumps(self.previous, ensure_ascii=False, separators=(',', ':'))}\n\n"
+                    f"New epochs since then:\n{metrics_table(stats, self.sent_epochs)}")
+        return [{"role": "system", "content": ANALYSIS_INSTRUCTIONS}, {"role": "user", "content": body}], full
+
+    def analyze(self, stats):
+        """Same contract as get_ai_analysis(): an analysis dict, with usage, or an error dict."""
+        if not stats or not stats['epoch']:
+            return analysis_error("No epochs to analyse yet")
+        messages, full = self.messages(stats)
         try:
-            # Prepare metrics for the selected run
-            set_paths(run_name)
-            stats = parse_results(RESULTS_FILE)
-            status_queue.put("Asking A.I.")
-            
-            response = get_ai_analysis(stats)
-            status_queue.put("Analyzing training data...")
-            status_queue.put(('result', response))
-            status_queue.put("Done!")
+            content, usage = chat_completion(messages, max_tokens=900, validate=validate_analysis)
+            analysis = parse_analysis(content)
         except Exception as e:
-            status_queue.put(f"Error: {e}")
-            status_queue.put(('result', None))
-        finally:
-            status_queue.put('done')
-            spinner_running.clear()
+            logging.error("Failed to get delta analysis: %s", e)
+            return analysis_error(f"Failed to get ChatGPT analysis: {e}")
+        logging.info("%s analysis at epoch %s: %d prompt bytes", "Full" if full else "Delta",
+                     stats['epoch'][-1], sum(len(m["content"]) for m in messages))
+        self.previous = {key: analysis[key] for key in ANALYSIS_DEFAULTS}
+        self.sent_epochs = len(stats['epoch'])
+        self.last_sent_epoch = stats['epoch'][-1]
+        self.calls_since_resync = 0 if full else self.calls_since_resync + 1
+        analysis["usage"] = usage
+        analysis["delta"] = not full
+        return analysis
 
-    # Use a thread to fetch AI while spinner runs
-    status_queue = queue.Queue()
-    ai_result = [None]
-    
-    def ai_thread():
-        fetch_ai_first_response(status_queue, run_name)
-    
-    t = threading.Thread(target=ai_thread)
-    t.daemon = True  # Make thread daemon so it exits when main thread exits
-    t.start()
-    
+# --- Batched and concurrent analysis of many runs ---
+AI_BATCH_SIZE = 8          # runs packed into one request in batch mode
+AI_MAX_CONCURRENCY = 4     # requests in flight at once
+AI_RUN_DEADLINE = 90       # seconds a run (concurrent mode) or a batch request may take
+AI_SUMMARY_TAIL = 10       # most recent epochs per run in a compact summary
+
+BATCH_PROMPT = """You are reviewing several YOLOv7 training runs at once. Each run below is a compact summary: epoch counts, best mAP@.5 and its epoch, the local overfitting detector, the trend label and the last few values of mAP, precision, recall and loss.
+
+For EVERY run id, give the same fields a single-run analysis has, wrapping lines at 48 characters or less and using emojis/icons:
+- summary: 2-3 sentences on the run's status; urgent if it is overfitting
+- risks, trends, recommendations, metrics: 2-4 short items each
+- isoverfitted: true only if validation metrics have been falling for many epochs while training keeps improving
+
+Answer with JSON only, no markdown or code blocks, shaped exactly like:
+{"runs": {"<run id>": {"summary": "...", "risks": ["..."], "trends": ["..."], "recommendations": ["..."], "metrics": ["..."], "isoverfitted": false}}}
+
+Runs:
+"""
+
+def compact_run_summary(stats, tail=AI_SUMMARY_TAIL):
+    """The few numbers that matter about a run, for packing many runs into one prompt."""
+    best = max(range(len(stats['map'])), key=stats['map'].__getitem__)
+    return {
+        "epochs_done": len(stats['epoch']),
+        "last_epoch": stats['epoch'][-1],
+        "best_map": round(stats['map'][best], 4),
+        "best_epoch": stats['epoch'][best],
+        "overfitting_detector": detect_overfitting(stats['map']),
+        "trend": analyze_trend(stats['map'])[0],
+        "recent": {key: [round(v, 4) for v in stats[key][-tail:]] for key in ["map", "precision", "recall", "loss"]},
+    }
+
+def map_with_deadline(func, items, max_concurrency, deadline, name="fishwell-analysis"):
+    """{item: func(item)} with at most max_concurrency calls at a time on a DaemonThreadPool.
+
+    An item's deadline starts when its call does. A call that raises maps to the
+    exception; one that misses its deadline maps to a TimeoutError and is left to
+    finish in its daemon thread, never delaying exit.
+    """
+    results = {}
+    if not items:
+        return results
+    started = {}
+
+    def call(item):
+        started[item] = time.monotonic()
+        return func(item)
+
+    pool = DaemonThreadPool(min(max_concurrency, len(items)), name)
     try:
-        curses.wrapper(spinner_curses, status_queue)
-    except KeyboardInterrupt:
-        spinner_running.clear()
-        print("\nOperation cancelled by user.")
-        return None
-    except Exception as e:
-        logging.error(f"Spinner error: {e}")
-        spinner_running.clear()
-    
-    # Get the result with timeout
+        pending = {pool.submit(call, item): item for item in items}
+        while pending:
+            now = time.monotonic()
+            running_deadlines = [started[item] + deadline for item in pending.values() if item in started]
+            timeout = max(0.0, min(running_deadlines) - now) if running_deadlines else deadline
+            done, _ = concurrent.futures.wait(pending, timeout=timeout,
+                                              return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                try:
+                    results[item] = future.result()
+                except Exception as e:
+                    results[item] = e
+            now = time.monotonic()
+            for future, item in list(pending.items()):
+                if item in started and now - started[item] >= deadline:
+                    del pending[future]
+                    results[item] = TimeoutError(f"No answer within {deadline}s")
+    finally:
+        pool.shutdown(cancel_futures=True)
+    return results
+
+def analyze_runs_batched(run_stats, batch_size=AI_BATCH_SIZE, max_concurrency=AI_MAX_CONCURRENCY,
+                         deadline=AI_RUN_DEADLINE):
+    """Analyse many runs with one request per batch_size runs (batches go out concurrently).
+
+    Returns {run: analysis}; each analysis carries its share of the batch's usage and
+    latency, and runs the model left out of its answer, or whose batch missed its
+    deadline, get an error result.
+    """
+    runs = [run for run, stats in run_stats.items() if stats['epoch']]
+    batches = [tuple(runs[i:i + batch_size]) for i in range(0, len(runs), batch_size)]
+
+    def analyze_batch(batch):
+        payload = {run: compact_run_summary(run_stats[run]) for run in batch}
+        prompt = BATCH_PROMPT + json.dumps(payload, separators=(",", ":"))
+        start = time.monotonic()
+        content, usage = chat_completion([{"role": "user", "content": prompt}],
+                                         max_tokens=min(4000, 400 * len(batch)), timeout=deadline)
+        answer = json.loads(strip_code_fences(content))
+        per_run = answer.get("runs", answer)
+        latency = time.monotonic() - start
+        share = {key: value // len(batch) for key, value in usage.items() if key.endswith("_tokens")}
+        results = {}
+        for run in batch:
+            if isinstance(per_run.get(run), dict):
+                # The model's own keys first: a "usage" or "latency" in its answer must not win
+                results[run] = {**ANALYSIS_DEFAULTS, **per_run[run]}
+                results[run]["usage"] = share
+                results[run]["latency"] = latency
+            else:
+                results[run] = analysis_error("Run missing from the batched answer")
+        return results
+
+    outcomes = map_with_deadline(analyze_batch, batches, max_concurrency, deadline)
+    results = {}
+    for batch in batches:
+        batch_results = outcomes[batch]
+        if isinstance(batch_results, Exception):
+            logging.error("Batched analysis of %s failed: %s", list(batch), batch_results)
+            batch_results = {run: analysis_error(f"Batched analysis failed: {batch_results}") for run in batch}
+        results.update(batch_results)
+    return results
+
+def analyze_runs_concurrently(run_stats, analyze=None, max_concurrency=AI_MAX_CONCURRENCY, deadline=AI_RUN_DEADLINE):
+    """Analyse many runs with one independent request each, at most max_concurrency at a time.
+
+    A run's deadline starts when its request does; a run that misses it gets an error
+    result (the request itself finishes in a daemon thread and is dropped, never
+    delaying exit).
+    """
+    analyze = analyze or get_ai_analysis
+    runs = [run for run, stats in run_stats.items() if stats['epoch']]
+
+    def call(run):
+        start = time.monotonic()
+        analysis = analyze(run_stats[run])
+        analysis["latency"] = time.monotonic() - start
+        return analysis
+
+    outcomes = map_with_deadline(call, runs, max_concurrency, deadline)
+    results = {}
+    for run in runs:
+        analysis = outcomes[run]
+        if isinstance(analysis, TimeoutError):
+            analysis = analysis_error(str(analysis))
+        elif isinstance(analysis, Exception):
+            analysis = analysis_error(f"Analysis failed: {analysis}")
+        results[run] = analysis
+    return results
+
+def analyze_runs(run_stats, mode="batch", **options):
+    """Analyse several runs at once: mode "batch" packs them into shared requests,
+    "concurrent" sends one request per run through a bounded pool."""
+    if mode == "batch":
+        return analyze_runs_batched(run_stats, **options)
+    if mode == "concurrent":
+        return analyze_runs_concurrently(run_stats, **options)
+    raise ValueError(f"unknown analysis mode: {mode}")
+
+def get_claude_analysis(metrics_str):
+    """Get analysis from Claude only, sending the whole metrics history."""
+    return get_chatgpt_analysis(metrics_str, providers=[AI_PROVIDERS["anthropic"]])
+
+ADVICE_PROMPT = "Give me {count} different funny, ML-themed life advice for a machine learning engineer, related to model training, overfitting, or debugging. Make them fit the context of someone training YOLOv7 or deep learning models in a terminal aquarium UI. 2-3 lines each, with emojis. Answer with a JSON array of strings only, no markdown or code blocks."
+
+def get_life_advice(count=1):
+    """Ask ChatGPT for count short, funny ML-themed life advice (blocking). Returns a list of strings."""
+    content, _ = chat_completion([{"role": "user", "content": ADVICE_PROMPT.format(count=count)}],
+                                 max_tokens=100 * count, temperature=0.7, timeout=30)
     try:
-        while True:
-            try:
-                item = status_queue.get(timeout=1.0)  # 1 second timeout
-                if isinstance(item, tuple) and item[0] == 'result':
-                    ai_result[0] = item[1]
-                    break
-            except queue.Empty:
-                if not t.is_alive():
-                    break
-    except KeyboardInterrupt:
-        spinner_running.clear()
-        print("\nOperation cancelled by user.")
-        return None
-    
-    return ai_result[0]
+        advice = json.loads(strip_code_fences(content))
+    except ValueError:
+        advice = None
+    if not isinstance(advice, list):
+        return [content.strip()]  # the model ignored the format: still one usable piece
+    return [str(a).strip() for a in advice if str(a).strip()]
 
-def overfit_prompt(stdscr):
-    curses.curs_set(0)
-    stdscr.nodelay(True)
-    h, w = stdscr.getmaxyx()
-    msg = "🚨 Overfitting detected! Back up model? (y/n)"
-    logging.info("Showing overfit prompt")
-    stdscr.addstr(h//2, (w-len(msg))//2, msg, curses.A_BOLD)
-    stdscr.refresh()
-    start = time.time()
-    
-    while True:
+# --- Life advice pool ---
+ADVICE_POOL_FILE = "fishwell_advice.json"  # in RUNS_BASE_PATH, shared by every run
+ADVICE_POOL_SIZE = 8           # pieces fetched per refill request
+ADVICE_POOL_LOW_WATER = 3      # refill when fewer than this are left
+ADVICE_MAX_AGE = 7 * 24 * 3600  # seconds before an unused piece is thrown away
+ADVICE_REFILL_INTERVAL = 60    # seconds between refill requests, successful or not
+
+class AdvicePool:
+    """Pre-generated life advice, so [L] answers from memory instead of waiting on the API.
+
+    Entries are [created, text] pairs, persisted as JSON between sessions; each is
+    shown once and expires after max_age. take() runs on the UI thread and never
+    touches the disk; load(), save() and refill() are blocking.
+    """
+
+    def __init__(self, path, size=ADVICE_POOL_SIZE, low_water=ADVICE_POOL_LOW_WATER, max_age=ADVICE_MAX_AGE,
+                 min_interval=ADVICE_REFILL_INTERVAL, fetch=get_life_advice):
+        self.path = path
+        self.size = size
+        self.low_water = low_water
+        self.max_age = max_age
+        self.min_interval = min_interval
+        self.fetch = fetch
+        self.items = []
+        self.seen = set()  # shown by this instance; not brought back by reloading a shared file
+        self.lock = threading.Lock()
+        self.last_refill = None  # monotonic time of the last refill request
+        self.dirty = False
+
+    def load(self):
         try:
-            key = stdscr.getch()
-            logging.debug(f"Key pressed: {key}")
-            if key != -1:  # Only process if a key was pressed
-                if key in [ord('y'), ord('Y')]:
-                    logging.info("User chose to backup")
-                    backup_dir = WEIGHTS_DIR
-                    if not os.path.exists(backup_dir):
-                        os.makedirs(backup_dir)
-                    latest_weight = BEST_PT if os.path.exists(BEST_PT) else None
-                    if latest_weight:
-                        backup_path = os.path.join(backup_dir, f"backup_{int(time.time())}.pt")
-                        shutil.copy2(latest_weight, backup_path)
-                        confirm = f"✅ Weights backed up to {backup_path}"
-                        logging.info(f"Backup successful: {backup_path}")
-                    else:
-                        confirm = "❌ No weight file found to backup."
-                        logging.warning("No weight file found for backup")
-                    stdscr.clear()
-                    stdscr.addstr(h//2, (w-len(confirm))//2, confirm, curses.A_BOLD)
-                    stdscr.refresh()
-                    time.sleep(2)
-                    return True
-                elif key in [ord('n'), ord('N')]:
-                    logging.info("User chose not to backup")
-                    return False
-            elif time.time() - start > 120:
-                logging.info("Auto-backup triggered after timeout")
-                backup_dir = WEIGHTS_DIR
-                if not os.path.exists(backup_dir):
-                    os.makedirs(backup_dir)
-                latest_weight = BEST_PT if os.path.exists(BEST_PT) else None
-                if latest_weight:
-                    backup_path = os.path.join(backup_dir, f"backup_{int(time.time())}.pt")
-                    shutil.copy2(latest_weight, backup_path)
-                    confirm = f"⏰ Auto-backup: Weights saved to {backup_path}"
-                    logging.info(f"Auto-backup successful: {backup_path}")
-                else:
-                    confirm = "❌ No weight file found to backup."
-                    logging.warning("No weight file found for auto-backup")
-                stdscr.clear()
-                stdscr.addstr(h//2, (w-len(confirm))//2, confirm, curses.A_BOLD)
-                stdscr.refresh()
-                time.sleep(2)
-                return True
-            time.sleep(0.1)
-        except KeyboardInterrupt:
-            logging.info("KeyboardInterrupt in overfit prompt")
-            return False
-        except Exception as e:
-            logging.error(f"Error in overfit prompt: {e}")
-            return False
+            with open(self.path) as f:
+                items = [[float(created), str(text)] for created, text in json.load(f)]
+        except (OSError, ValueError, TypeError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logging.warning("Ignoring advice pool %s: %s", self.path, e)
+            return
+        with self.lock:
+            self.items = [item for item in items if item[1] not in self.seen] + self.items
+            self.dirty = self.expire()
+
+    def save(self):
+        with self.lock:
+            items = list(self.items)
+            self.dirty = False
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(items, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning("Could not save the advice pool to %s: %s", self.path, e)
+
+    def expire(self, now=None):
+        """Drop pieces older than max_age (lock held). True if any were dropped."""
+        cutoff = (now or time.time()) - self.max_age
+        fresh = [item for item in self.items if item[0] >= cutoff]
+        dropped = len(fresh) != len(self.items)
+        self.items = fresh
+        return dropped
+
+    def take(self):
+        """The oldest unexpired piece of advice, or None when the pool is empty."""
+        with self.lock:
+            self.expire()
+            if not self.items:
+                return None
+            self.dirty = True
+            text = self.items.pop(0)[1]
+            self.seen.add(text)
+            return text
+
+    def low(self):
+        return len(self.items) < self.low_water
+
+    def refill_wait(self):
+        """Seconds until the rate limit allows the next refill request."""
+        if self.last_refill is None:
+            return 0.0
+        return max(0.0, self.last_refill + self.min_interval - time.monotonic())
+
+    def refill(self):
+        """Fetch up to size pieces (blocking) and persist the pool. Returns how many were added."""
+        self.last_refill = time.monotonic()
+        advice = self.fetch(self.size)
+        now = time.time()
+        with self.lock:
+            self.items.extend([now, text] for text in advice)
+            self.dirty = True
+        self.save()
+        logging.info("Advice pool refilled with %d pieces (%d available)", len(advice), len(self.items))
+        return len(advice)
+
+async def app_main(stdscr):
+    """The whole curses session on one event loop: run picker, then the aquarium."""
+    # Load (or compile) the sprite sheet while the user is still looking at the menu
+    warm_art = run_blocking(load_sprite_sheet)
+    runs = find_all_training_runs()
+    run_name = await main_menu_screen(stdscr, runs)
+    if not run_name:
+        return None
+    set_paths(run_name)
+    await warm_art
+    if METRICS_PORT is not None:
+        try:
+            start_metrics_server(METRICS_PORT)
+        except OSError as e:
+            logging.error("Could not start metrics endpoint on port %s: %s", METRICS_PORT, e)
+    logging.info("Starting aquarium UI")
+    await AquariumApp(stdscr).run()
+    return run_name
+
+def run_command(argv):
+    """Command-line subcommands (backup catalog, metrics warehouse, replay, analysis). Returns the exit code."""
+    global OPENAI_CHAT_URL
+    import argparse
+    parser = argparse.ArgumentParser(prog=os.path.basename(sys.argv[0]),
+                                     description="Backup catalog and metrics warehouse commands. "
+                                                 "Without a command the aquarium starts.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("backups", help="list catalogued snapshots")
+    list_parser.add_argument("--run", help="only this run")
+    restore_parser = commands.add_parser("restore", help="copy a catalogued snapshot back out")
+    which = restore_parser.add_mutually_exclusive_group(required=True)
+    which.add_argument("--best", action="store_true", help="the snapshot with the highest mAP")
+    which.add_argument("--before-epoch", type=int, metavar="N", help="the newest snapshot taken before epoch N")
+    restore_parser.add_argument("--run", help="only this run (required with --before-epoch)")
+    restore_parser.add_argument("--to", help="destination file (default: <run>/weights/restored_e<epoch>.pt)")
+    commands.add_parser("rebuild-catalog", help="rescan every run's weights and recreate the catalog")
+    checkpoint_parser = commands.add_parser("checkpoint", help="epoch and best_fitness stored in .pt files")
+    checkpoint_parser.add_argument("paths", nargs="+", help="checkpoints, e.g. runs/train/exp/weights/*.pt")
+    commands.add_parser("ingest", help="add new epochs of every run to the metrics warehouse")
+    analyze_parser = commands.add_parser("analyze", help="AI analysis of several runs at once")
+    analyze_parser.add_argument("runs", nargs="*", help="run names (default: every run)")
+    analyze_parser.add_argument("--mode", choices=["batch", "concurrent"], default="batch",
+                                help="batch: several runs per request; concurrent: one request per run")
+    analyze_parser.add_argument("--batch-size", type=int, default=AI_BATCH_SIZE)
+    analyze_parser.add_argument("--concurrency", type=int, default=AI_MAX_CONCURRENCY)
+    analyze_parser.add_argument("--deadline", type=float, default=AI_RUN_DEADLINE, help="seconds per run or batch")
+    analyze_parser.add_argument("--endpoint", help="OpenAI-compatible chat completions URL (e.g. a local stub)")
+    replay_parser = commands.add_parser("replay", help="feed a finished results.txt through the aquarium and "
+                                                       "report throughput and latency")
+    replay_parser.add_argument("results", help="path to a finished run's results.txt")
+    replay_parser.add_argument("--speed", type=float, default=REPLAY_SPEED, help="epochs per second (default: %(default)s)")
+    replay_parser.add_argument("--ai-latency", type=float, default=REPLAY_AI_LATENCY,
+                               help="seconds the stub AI provider takes per analysis (default: %(default)s)")
+    replay_parser.add_argument("--hold", action="store_true", help="keep the aquarium open after the replay ([Q] quits)")
+    replay_parser.add_argument("--keep", action="store_true", help="keep the temporary run directory")
+    report_parser = commands.add_parser("report", help="cross-run summary from the metrics warehouse")
+    report_parser.add_argument("--plateau-before", type=int, default=100, metavar="EPOCH",
+                               help="list runs that stopped improving before this epoch (default: 100)")
+    args = parser.parse_args(argv)
+
+    if args.command == "analyze":
+        if args.endpoint:
+            OPENAI_CHAT_URL = args.endpoint
+        runs = args.runs or find_all_training_runs()
+        run_stats = load_runs(runs)
+        options = {"max_concurrency": args.concurrency, "deadline": args.deadline}
+        if args.mode == "batch":
+            options["batch_size"] = args.batch_size
+        start = time.perf_counter()
+        results = analyze_runs(run_stats, args.mode, **options)
+        elapsed = time.perf_counter() - start
+        for run in runs:
+            analysis = results.get(run)
+            if analysis is None:
+                print(f"{run:<20} no epochs yet")
+            elif analysis.get("error"):
+                print(f"{run:<20} ❌ {analysis['error']}")
+            else:
+                flag = "🚨 overfitting" if analysis.get("isoverfitted") else "✅"
+                print(f"{run:<20} {flag} {' '.join(str(analysis['summary']).split())}")
+        tokens = sum(a.get("usage", {}).get("prompt_tokens", 0) + a.get("usage", {}).get("completion_tokens", 0)
+                     for a in results.values())
+        print(f"\n{len(results)} runs analysed ({args.mode}) in {elapsed:.2f}s, ~{tokens} tokens")
+        return 0
+    if args.command == "checkpoint":
+        for path in args.paths:
+            start = time.perf_counter()
+            meta = read_checkpoint_meta(path)
+            elapsed = (time.perf_counter() - start) * 1000
+            if meta is None:
+                print(f"{path}: not a readable checkpoint")
+            else:
+                print(f"{path}: epoch {meta['epoch']}, best_fitness {meta['best_fitness']} "
+                      f"({os.path.getsize(path) / 1e6:.0f} MB file, {elapsed:.1f} ms)")
+        return 0
+    if args.command == "replay":
+        return run_replay(args.results, args.speed, args.ai_latency, args.hold, args.keep)
+    if args.command in ("ingest", "report"):
+        warehouse = metrics_warehouse()
+        start = time.perf_counter()
+        added = warehouse.ingest()
+        print(f"Ingested {sum(added.values())} new epochs from {len(added)} runs "
+              f"in {time.perf_counter() - start:.2f}s -> {warehouse.path}")
+        if args.command == "report":
+            print("\nBest mAP per dataset:")
+            for row in warehouse.best_per_dataset():
+                print(f"  {row['dataset'] or '?':<20} {row['best_map']:.4f}  ({row['run']})")
+            print(f"\nPlateaued before epoch {args.plateau_before} "
+                  f"(no new best for {PLATEAU_PATIENCE}+ epochs):")
+            for row in warehouse.plateaued_before(args.plateau_before):
+                print(f"  {row['run']:<20} peak {row['best_map']:.4f} at epoch {row['peak_epoch']}, "
+                      f"ran to {row['last_epoch']}")
+            peaks = sorted(row["peak_epoch"] for row in warehouse.summary() if row["peak_epoch"] is not None)
+            if peaks:
+                mid = len(peaks) // 2
+                median = peaks[mid] if len(peaks) % 2 else (peaks[mid - 1] + peaks[mid]) / 2
+                print(f"\nMedian epochs to peak: {median} over {len(peaks)} runs")
+        return 0
+
+    catalog = backup_catalog()
+    if args.command == "rebuild-catalog":
+        start = time.perf_counter()
+        count = catalog.rebuild()
+        print(f"Catalogued {count} snapshots in {time.perf_counter() - start:.2f}s -> {catalog.path}")
+        return 0
+    if args.command == "backups":
+        for row in catalog.entries(args.run):
+            best_map = f"{row['best_map']:.4f}" if row["best_map"] is not None else "-"
+            print(f"{row['run']:<16} e{row['epoch'] if row['epoch'] is not None else '?':<5} "
+                  f"best mAP {best_map:<7} {row['reason']:<8} "
+                  f"{datetime.fromtimestamp(row['created']):%Y-%m-%d %H:%M} {row['size'] / 2**20:8.1f} MiB  "
+                  f"{row['path']}")
+        return 0
+    if args.before_epoch is not None and not args.run:
+        parser.error("--before-epoch needs --run")
+    row = catalog.best(args.run) if args.best else catalog.before_epoch(args.run, args.before_epoch)
+    if row is None:
+        print("No matching snapshot in the catalog.")
+        return 1
+    name = f"restored_e{row['epoch']}.pt" if row["epoch"] is not None else f"restored_{row['created']}.pt"
+    dest = args.to or os.path.join(os.path.expanduser(RUNS_BASE_PATH), row["run"], "weights", name)
+    restore_snapshot(row, dest)
+    print(f"Restored {row['path']} (epoch {row['epoch']}, best mAP {row['best_map']}) -> {dest}")
+    return 0
 
 def main():
+    setup_logging()
+    if len(sys.argv) > 1:
+        sys.exit(run_command(sys.argv[1:]))
     # Clear terminal
     clear_terminal()
     try:
-        # Use the new curses UI for everything
-        runs = find_all_training_runs()
-        run_name = curses_main_menu(runs)  # This ends curses before returning
+        run_name = curses.wrapper(lambda stdscr: asyncio.run(app_main(stdscr)))
         if not run_name:
             print(center_text(f"\n{Colors.RED}No training run selected. Exiting...{Colors.RESET}"))
-            return
-        # Show loading spinner and get first AI reply
-        ai_first_reply = loading_spinner_and_ai(run_name)
-        if ai_first_reply is None:  # User cancelled
-            print(center_text(f"\n{Colors.YELLOW}Operation cancelled by user. Exiting...{Colors.RESET}"))
-            return
-        set_paths(run_name)
-        # No more blocking overfitting prompt here!
-        # Clear terminal again to remove lingering y/n prompt
-        clear_terminal()
-        print(Colors.RESET, end='')
-        # Start the aquarium/analysis UI with a fresh curses screen
-        try:
-            logging.info("Starting aquarium UI")
-            curses.wrapper(aquarium)
-        except KeyboardInterrupt:
-            print("\nOperation cancelled by user.")
-            logging.info("Aquarium UI cancelled by user")
-            return
-        except Exception as e:
-            logging.error(f"Aquarium UI error: {e}")
-            print(f"\nError in aquarium UI: {e}")
-            print("Please check the logs for more details.")
     except KeyboardInterrupt:
         print("\nOperation cancelled by user.")
         logging.info("Main operation cancelled by user")
         return
     except Exception as e:
-        logging.error(f"Main error: {e}")
+        logging.error("Main error: %s", e)
         print(f"\nAn error occurred: {e}")
         print("Please check the logs for more details.")
 